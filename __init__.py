@@ -1,6 +1,67 @@
-from .gmt.gmt_reader import read_gmt
-from .gmt.gmt_writer import write_gmt, write_gmt_to_file
-from .gmt.structure.enums.gmt_enum import (GMTCurveChannel, GMTCurveFormat,
-                                           GMTCurveType, GMTVersion, GMTVectorVersion)
-from .gmt.structure.gmt import (GMT, GMTAnimation, GMTBone, GMTCurve,
-                                GMTKeyframe)
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Module of each public name, relative to this package. Modules are only imported when one of their names is first
+# accessed (PEP 562), so importing the package itself is cheap, e.g. for process pool workers
+__LAZY_ATTRIBUTES = {
+    'GMTCache': '.gmt.gmt_cache',
+    'GMTOptimizeReport': '.gmt.gmt_optimizer',
+    'optimize_gmt': '.gmt.gmt_optimizer',
+    'GMTPatcher': '.gmt.gmt_patcher',
+    'GMTAnimationInfo': '.gmt.gmt_probe',
+    'GMTInfo': '.gmt.gmt_probe',
+    'probe_gmt': '.gmt.gmt_probe',
+    'read_gmt': '.gmt.gmt_reader',
+    'GMTSkeleton': '.gmt.gmt_skeleton',
+    'write_gmt': '.gmt.gmt_writer',
+    'write_gmt_to_file': '.gmt.gmt_writer',
+    'GMTWriteProgress': '.gmt.structure.br.br_gmt',
+    'GMTCurveChannel': '.gmt.structure.enums.gmt_enum',
+    'GMTCurveFormat': '.gmt.structure.enums.gmt_enum',
+    'GMTCurveType': '.gmt.structure.enums.gmt_enum',
+    'GMTVersion': '.gmt.structure.enums.gmt_enum',
+    'GMTVectorVersion': '.gmt.structure.enums.gmt_enum',
+    'GMT': '.gmt.structure.gmt',
+    'GMTAnimation': '.gmt.structure.gmt',
+    'GMTBone': '.gmt.structure.gmt',
+    'GMTCurve': '.gmt.structure.gmt',
+    'GMTKeyframe': '.gmt.structure.gmt',
+}
+
+# Subpackages that can be accessed as attributes without importing them first
+__LAZY_SUBMODULES = ('gmt',)
+
+__all__ = list(__LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from .gmt.gmt_cache import GMTCache
+    from .gmt.gmt_optimizer import GMTOptimizeReport, optimize_gmt
+    from .gmt.gmt_patcher import GMTPatcher
+    from .gmt.gmt_probe import GMTAnimationInfo, GMTInfo, probe_gmt
+    from .gmt.gmt_reader import read_gmt
+    from .gmt.gmt_skeleton import GMTSkeleton
+    from .gmt.gmt_writer import write_gmt, write_gmt_to_file
+    from .gmt.structure.br.br_gmt import GMTWriteProgress
+    from .gmt.structure.enums.gmt_enum import (GMTCurveChannel, GMTCurveFormat,
+                                               GMTCurveType, GMTVersion, GMTVectorVersion)
+    from .gmt.structure.gmt import (GMT, GMTAnimation, GMTBone, GMTCurve,
+                                    GMTKeyframe)
+
+
+def __getattr__(name: str):
+    if name in __LAZY_SUBMODULES:
+        return import_module(f'.{name}', __name__)
+
+    module = __LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(import_module(module, __name__), name)
+
+    # Later accesses find the name directly, without going through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,274 @@
+"""Deterministic generators of synthetic GMT, CMT and IFA objects for the benchmarks.
+
+The same arguments always produce the same objects, so results can be compared between commits.
+The generators require NumPy. CMT frames use mathutils vectors if mathutils is available.
+"""
+
+import struct
+from math import pi
+from typing import List
+
+import numpy as np
+
+from ..gmt.gmt_writer import write_gmt
+from ..gmt.structure.br.br_gmt import BrGMT
+from ..gmt.structure.cmt import CMT, CMTAnimation, CMTFrame
+from ..gmt.structure.enums.cmt_enum import CMTVersion
+from ..gmt.structure.enums.gmt_enum import (GMTCurveChannel, GMTCurveFormat, GMTCurveType, GMTVectorVersion,
+                                            GMTVersion, OEDEFaceTarget)
+from ..gmt.structure.gmt import GMT, GMTAnimation, GMTBone, GMTCurve
+from ..gmt.structure.ifa import IFA, IFABone
+from ..gmt.util import MappedBinaryReader
+from ..gmt.util.vector_math import to_vector
+
+# Channel of the curve written for each format
+LOCATION_FORMATS = {
+    GMTCurveFormat.LOC_XYZ: GMTCurveChannel.ALL,
+    GMTCurveFormat.LOC_CHANNEL: GMTCurveChannel.Y,
+}
+
+ROTATION_FORMATS = {
+    GMTCurveFormat.ROT_XYZW_SHORT: GMTCurveChannel.ALL,
+    GMTCurveFormat.ROT_XW_SHORT: GMTCurveChannel.XW,
+    GMTCurveFormat.ROT_YW_SHORT: GMTCurveChannel.YW,
+    GMTCurveFormat.ROT_ZW_SHORT: GMTCurveChannel.ZW,
+    GMTCurveFormat.ROT_QUAT_XYZ_INT: GMTCurveChannel.ALL,
+}
+
+# The writer never produces these formats. Their curves are written as location curves with the same data size,
+# which are then patched to the float rotation format by encode_gmt
+FLOAT_ROTATION_FORMATS = {
+    GMTCurveFormat.ROT_QUAT_XYZ_FLOAT: GMTCurveChannel.ALL,
+    GMTCurveFormat.ROT_XW_FLOAT: GMTCurveChannel.XW,
+    GMTCurveFormat.ROT_YW_FLOAT: GMTCurveChannel.YW,
+    GMTCurveFormat.ROT_ZW_FLOAT: GMTCurveChannel.ZW,
+}
+
+PATTERN_FORMATS = {
+    GMTCurveFormat.PATTERN_HAND: GMTCurveType.PATTERN_HAND,
+    GMTCurveFormat.PATTERN_UNK: GMTCurveType.PATTERN_UNK,
+}
+
+# IntFlag iteration skips values that are not powers of two, so the names are taken from the members
+FACE_TARGETS = list(OEDEFaceTarget.__members__)
+
+GMT_CURVE_SIZE = 0x10
+
+
+def gmt_formats(version: GMTVersion) -> List[GMTCurveFormat]:
+    """Returns the curve formats that can be generated for a GMT version."""
+    formats = list(LOCATION_FORMATS) + list(ROTATION_FORMATS) + list(FLOAT_ROTATION_FORMATS) + list(PATTERN_FORMATS)
+
+    if GMTVectorVersion.from_GMTVersion(version) != GMTVectorVersion.DRAGON_VECTOR:
+        formats.remove(GMTCurveFormat.ROT_QUAT_XYZ_INT)
+
+    return formats
+
+
+def build_gmt(version: GMTVersion, bones: int, frames: int, curve_format=GMTCurveFormat.ROT_XYZW_SHORT, animations=1) -> GMT:
+    """Builds a GMT where every bone has a curve in the given format.
+    Bones also get a full location curve and a full rotation curve, unless that is the type being tested. Bones tested
+    with a float rotation format only have that curve, see FLOAT_ROTATION_FORMATS.
+    :param version: Version of the GMT
+    :param bones: Number of bones in each animation
+    :param frames: Number of frames in each animation, with a keyframe on every frame
+    :param curve_format: Format of the curve being tested. Use encode_gmt to write the GMT with that format
+    :param animations: Number of animations
+    :return: The GMT object
+    """
+    gmt = GMT('benchmark', version)
+    frame_array = __frame_array(frames)
+
+    for a in range(animations):
+        anm = GMTAnimation(f'benchmark_{a:03}', 30.0, frames - 1)
+
+        for b in range(bones):
+            bone = GMTBone('center_c_n' if b == 0 else f'bone_{b:03}_c_n')
+            phase = a * 0.37 + b * 0.11
+
+            if curve_format in FLOAT_ROTATION_FORMATS:
+                bone.curves = [__float_rotation_carrier(frame_array, phase, FLOAT_ROTATION_FORMATS[curve_format])]
+                anm.bones[bone.name] = bone
+                continue
+
+            location_channel = LOCATION_FORMATS.get(curve_format, GMTCurveChannel.ALL)
+            rotation_channel = ROTATION_FORMATS.get(curve_format, GMTCurveChannel.ALL)
+
+            curves = [
+                __curve(GMTCurveType.LOCATION, location_channel, frame_array, __location_values(frame_array, phase, location_channel)),
+                __curve(GMTCurveType.ROTATION, rotation_channel, frame_array, __rotation_values(frame_array, phase, rotation_channel)),
+            ]
+
+            if curve_format in PATTERN_FORMATS:
+                curves.append(__pattern_curve(PATTERN_FORMATS[curve_format], frame_array, b))
+
+            bone.curves = curves
+            anm.bones[bone.name] = bone
+
+        gmt.animation_list.append(anm)
+
+    return gmt
+
+
+def build_face_gmt(version: GMTVersion, targets: int, frames: int, animations=1) -> GMT:
+    """Builds a face GMT, with one bone per face target and a face pattern curve on the root bone.
+    :param version: Version of the GMT
+    :param targets: Number of face target bones, up to the number of FACE_TARGETS
+    :param frames: Number of frames in each animation
+    :param animations: Number of animations. Face GMTs usually have many short ones
+    :return: The GMT object
+    """
+    gmt = GMT('face', version)
+    gmt.is_face_gmt = True
+    frame_array = __frame_array(frames)
+
+    for a in range(animations):
+        anm = GMTAnimation(f'f{a:03}', 30.0, frames - 1)
+
+        root = GMTBone('face_c_n')
+        root.curves = [__pattern_curve(GMTCurveType.PATTERN_FACE, frame_array, a)]
+        anm.bones[root.name] = root
+
+        for t, name in enumerate(FACE_TARGETS[:targets]):
+            bone = GMTBone(name)
+            phase = a * 0.37 + t * 0.11
+
+            bone.curves = [
+                __curve(GMTCurveType.LOCATION, GMTCurveChannel.X, frame_array,
+                        __location_values(frame_array, phase, GMTCurveChannel.X) * 0.01),
+                __curve(GMTCurveType.ROTATION, GMTCurveChannel.ALL, frame_array,
+                        __rotation_values(frame_array, phase, GMTCurveChannel.ALL)),
+            ]
+            anm.bones[bone.name] = bone
+
+        gmt.animation_list.append(anm)
+
+    return gmt
+
+
+def encode_gmt(gmt: GMT, curve_format=GMTCurveFormat.ROT_XYZW_SHORT) -> bytearray:
+    """Writes a GMT built by build_gmt, so that its tested curves use the given format."""
+    buffer = write_gmt(gmt, compress_rotations=curve_format == GMTCurveFormat.ROT_QUAT_XYZ_INT)
+
+    if curve_format not in FLOAT_ROTATION_FORMATS:
+        return buffer
+
+    with MappedBinaryReader(buffer) as br:
+        br_gmt: BrGMT = br.read_struct(BrGMT, None, True)
+
+    # Only the carrier curves are location curves
+    channel_type = FLOAT_ROTATION_FORMATS[curve_format] << 16 | GMTCurveType.ROTATION
+    for i, br_curve in enumerate(br_gmt.curves):
+        if br_curve.type == GMTCurveType.LOCATION:
+            struct.pack_into('>II', buffer, br_gmt.header.curves_offset + i * GMT_CURVE_SIZE + 8, int(curve_format), int(channel_type))
+
+    return buffer
+
+
+def build_cmt(version: CMTVersion, frames: int, animations=1, clip_range=False) -> CMT:
+    """Builds a CMT with a camera orbiting around a moving focus point.
+    :param version: Version of the CMT, which decides the frame format it is written with
+    :param frames: Number of frames in each animation
+    :param animations: Number of animations
+    :param clip_range: If True, every frame has a clip range
+    :return: The CMT object
+    """
+    cmt = CMT(version)
+
+    for a in range(animations):
+        anm = CMTAnimation(30.0)
+        t = np.linspace(0.0, 2 * pi, frames) + a * 0.37
+
+        locations = np.column_stack((3.0 * np.cos(t), 1.5 + 0.2 * np.sin(3 * t), 3.0 * np.sin(t))).tolist()
+        focus_points = np.column_stack((0.2 * np.sin(t), np.full(frames, 1.4), 0.2 * np.cos(t))).tolist()
+        fovs = (0.6 + 0.1 * np.sin(2 * t)).tolist()
+        rolls = (0.05 * np.sin(t)).tolist()
+
+        for f in range(frames):
+            frame = CMTFrame(to_vector(locations[f]), fovs[f])
+            frame.focus_point = to_vector(focus_points[f])
+            frame.roll = rolls[f]
+
+            if clip_range:
+                frame.clip_range = (0.1, 1000.0 + f)
+
+            anm.frames.append(frame)
+
+        cmt.animation_list.append(anm)
+
+    return cmt
+
+
+def build_ifa(bones: int) -> IFA:
+    """Builds an IFA with a skeleton of the given size, where each bone is parented to one of the previous bones."""
+    bone_list = list()
+
+    for b in range(bones):
+        name = 'center_c_n' if b == 0 else f'bone_{b:03}_c_n'
+        parent = '' if b == 0 else bone_list[(b - 1) // 2].name
+
+        angle = (b % 7) * 0.1
+        bone_list.append(IFABone(name, parent, (0.0, 0.1 * (b % 5), 0.05 * (b % 3)), (0.0, float(np.sin(angle)), 0.0, float(np.cos(angle)))))
+
+    return IFA(bone_list)
+
+
+def __frame_array(frames: int) -> 'np.ndarray':
+    # Shared by all curves, like the frames of curves read from a file
+    frame_array = np.arange(frames, dtype=np.uint16)
+    frame_array.flags.writeable = False
+    return frame_array
+
+
+def __curve(type: GMTCurveType, channel: GMTCurveChannel, frames: 'np.ndarray', values: 'np.ndarray') -> GMTCurve:
+    curve = GMTCurve(type, channel)
+    curve.set_arrays(frames, values)
+    return curve
+
+
+def __location_values(frames: 'np.ndarray', phase: float, channel: GMTCurveChannel) -> 'np.ndarray':
+    t = frames * (2 * pi / max(len(frames) - 1, 1)) + phase
+    values = np.column_stack((np.sin(t), 0.5 + 0.1 * np.cos(2 * t), 0.3 * np.sin(3 * t)))
+
+    if channel == GMTCurveChannel.ALL:
+        return values
+
+    return values[:, [GMTCurveChannel.X, GMTCurveChannel.Y, GMTCurveChannel.Z].index(channel)][:, np.newaxis]
+
+
+def __rotation_values(frames: 'np.ndarray', phase: float, channel: GMTCurveChannel) -> 'np.ndarray':
+    """Returns unit quaternions with a positive W, rotating around a fixed axis, or (axis, W) pairs for partial channels."""
+    t = frames * (2 * pi / max(len(frames) - 1, 1)) + phase
+    half_angle = 0.5 * np.sin(t)
+
+    if channel != GMTCurveChannel.ALL:
+        return np.column_stack((np.sin(half_angle), np.cos(half_angle)))
+
+    axis = np.array((np.sin(phase), np.cos(phase), 0.5))
+    axis /= np.linalg.norm(axis)
+
+    return np.column_stack((np.outer(np.sin(half_angle), axis), np.cos(half_angle)))
+
+
+def __float_rotation_carrier(frames: 'np.ndarray', phase: float, channel: GMTCurveChannel) -> GMTCurve:
+    """Returns a location curve with the same data as a float rotation curve. XYZ quaternions are written as LOC_XYZ,
+    and (axis, W) pairs as LOC_CHANNEL with two components.
+    """
+    values = __rotation_values(frames, phase, channel)
+
+    if channel == GMTCurveChannel.ALL:
+        return __curve(GMTCurveType.LOCATION, GMTCurveChannel.ALL, frames, values[:, :3])
+
+    return __curve(GMTCurveType.LOCATION, GMTCurveChannel.X, frames, values)
+
+
+def __pattern_curve(type: GMTCurveType, frames: 'np.ndarray', seed: int) -> GMTCurve:
+    # Patterns switch every 10 frames
+    pattern = ((frames // 10 + seed) % 5).astype(np.int64)
+
+    if type == GMTCurveType.PATTERN_HAND:
+        return __curve(type, GMTCurveChannel.LEFT_HAND, frames, np.column_stack((pattern, pattern[::-1])))
+
+    channel = GMTCurveChannel.FACE if type == GMTCurveType.PATTERN_FACE else GMTCurveChannel.ALL
+    return __curve(type, channel, frames, pattern[:, np.newaxis])
+
@@ -0,0 +1,101 @@
+"""Measures the memory used by the object model for a large cutscene GMT and CMT.
+
+The slotted classes are compared with subclasses that add back a per-instance __dict__,
+which is how the object model was laid out before it used __slots__.
+
+Run from the directory containing the package:
+    python -m gmt_lib.benchmarks.object_memory [--bones 150] [--frames 3000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Callable
+
+from ..gmt.structure.cmt import CMT, CMTAnimation, CMTFrame
+from ..gmt.structure.enums.gmt_enum import GMTCurveType, GMTVersion
+from ..gmt.structure.gmt import GMT, GMTAnimation, GMTBone, GMTCurve, GMTKeyframe
+from ..gmt.util.vector_math import to_vector
+
+
+class DictGMTKeyframe(GMTKeyframe):
+    pass
+
+
+class DictCMTFrame(CMTFrame):
+    pass
+
+
+def build_gmt(bones: int, frames: int, keyframe_cls=GMTKeyframe) -> GMT:
+    gmt = GMT('cutscene', GMTVersion.YAKUZA5)
+    anm = GMTAnimation('cutscene', 30.0, frames - 1)
+
+    for i in range(bones):
+        bone = GMTBone(f'bone_{i}')
+
+        location = GMTCurve(GMTCurveType.LOCATION)
+        location.keyframes = [keyframe_cls(f, (f * 0.1, i * 0.1, 0.0)) for f in range(frames)]
+
+        rotation = GMTCurve(GMTCurveType.ROTATION)
+        rotation.keyframes = [keyframe_cls(f, (0.0, f * 0.001, 0.0, 1.0)) for f in range(frames)]
+
+        bone.curves = [location, rotation]
+        anm.bones[bone.name] = bone
+
+    gmt.animation_list.append(anm)
+    return gmt
+
+
+def build_cmt(frames: int, frame_cls=CMTFrame) -> CMT:
+    cmt = CMT()
+    anm = CMTAnimation(30.0)
+
+    for f in range(frames):
+        frame = frame_cls(to_vector((f * 0.1, 1.5, 0.0)), 0.8)
+        frame.focus_point = to_vector((0.0, 1.5, 5.0))
+        frame.roll = 0.0
+        anm.frames.append(frame)
+
+    cmt.animation_list.append(anm)
+    return cmt
+
+
+def measure(build: Callable[[], object]) -> int:
+    """Returns the size in bytes of the object returned by build, as the memory still allocated after calling it."""
+    gc.collect()
+    tracemalloc.start()
+
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bones', type=int, default=150, help='Number of bones in the GMT')
+    parser.add_argument('--frames', type=int, default=3000, help='Number of frames in the GMT and the CMT')
+    args = parser.parse_args()
+
+    keyframes = args.bones * args.frames * 2
+    cases = [
+        (f'GMT, {keyframes} keyframes', keyframes,
+         lambda: build_gmt(args.bones, args.frames, DictGMTKeyframe),
+         lambda: build_gmt(args.bones, args.frames)),
+        (f'CMT, {args.frames} frames', args.frames,
+         lambda: build_cmt(args.frames, DictCMTFrame),
+         lambda: build_cmt(args.frames)),
+    ]
+
+    for name, count, build_dict, build_slots in cases:
+        dict_size = measure(build_dict)
+        slots_size = measure(build_slots)
+
+        print(f'{name}: {dict_size / 2**20:.1f} MiB with __dict__, {slots_size / 2**20:.1f} MiB with __slots__ '
+              f'({(dict_size - slots_size) / count:.0f} bytes saved per object, {slots_size / dict_size:.0%} of the size)')
+
+
+if __name__ == '__main__':
+    main()
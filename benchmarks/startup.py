@@ -0,0 +1,177 @@
+"""Measures how long a new process takes to import the library and to do its first read.
+
+Every run of a case is a fresh interpreter, which is what a batch worker or a process pool pays on startup.
+The public names of the package are loaded on first access, so import only measures the package itself, and
+import/all loads every public name, which is what importing the package cost before it was lazy.
+The import/eager_mathutils case imports mathutils before the library, which is what importing the library cost when
+CMT frames always used mathutils. It is skipped when mathutils is not available.
+
+With --importtime, the modules that took the longest to import in each case are listed, from python -X importtime.
+
+Run from the directory containing the package:
+    python -m gmt_lib.benchmarks.startup [--repeat 20] [--filter import] [--importtime 10] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+from ..gmt.gmt_writer import write_cmt, write_gmt
+from ..gmt.structure.enums.cmt_enum import CMTVersion
+from ..gmt.structure.enums.gmt_enum import GMTCurveFormat, GMTVersion
+from .generators import build_cmt, build_gmt
+from .suite import environment
+
+# Runs the statement of a case and prints the time it took, and which modules it loaded
+CHILD_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], '<case>', 'exec'), {'gmt_path': sys.argv[2], 'cmt_path': sys.argv[3]})
+elapsed = time.perf_counter() - start
+print(json.dumps({'time': elapsed, 'modules': len(sys.modules), 'mathutils': 'mathutils' in sys.modules}))
+'''
+
+IMPORT_MATHUTILS = '''try:
+    import mathutils
+except ImportError:
+    # The bpy module from PyPI provides mathutils, but only once bpy is imported
+    import bpy
+    import mathutils
+'''
+
+
+class StartupResult:
+    case: str
+
+    # Wall time of the whole process, including the interpreter's own startup
+    process_best: float
+    process_median: float
+
+    # Time spent running the statement of the case
+    best: float
+    median: float
+
+    modules: int
+    mathutils: bool
+
+    def __init__(self, case: str, process_best: float, process_median: float, best: float, median: float,
+                 modules: int, mathutils: bool):
+        self.case = case
+        self.process_best = process_best
+        self.process_median = process_median
+        self.best = best
+        self.median = median
+        self.modules = modules
+        self.mathutils = mathutils
+
+    def __str__(self):
+        return (f'{self.case:<28} statement best: {self.best * 1000:8.2f} ms, median: {self.median * 1000:8.2f} ms, '
+                f'process median: {self.process_median * 1000:8.2f} ms, modules: {self.modules:4}'
+                + (', mathutils loaded' if self.mathutils else ''))
+
+
+def startup_cases(package: str) -> List[Tuple[str, str]]:
+    """Returns the (name, statement) of each case."""
+    return [
+        ('interpreter', 'pass'),
+        ('import', f'import {package}'),
+        ('import/probe', f'from {package} import probe_gmt'),
+        ('import/reader', f'from {package} import read_gmt'),
+        ('import/all', f'from {package} import *'),
+        ('import/eager_mathutils', f'{IMPORT_MATHUTILS}from {package} import *'),
+        ('first_read/gmt', f'from {package}.gmt.gmt_reader import read_gmt\nread_gmt(gmt_path)'),
+        ('first_read/cmt', f'from {package}.gmt.gmt_reader import read_cmt\nread_cmt(cmt_path)'),
+    ]
+
+
+def run_child(statement: str, paths: Tuple[str, str], *options: str) -> subprocess.CompletedProcess:
+    # The package is imported the same way as in this process, from the directory containing it
+    cwd = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    return subprocess.run([sys.executable, *options, '-c', CHILD_SCRIPT, statement, *paths], cwd=cwd,
+                          capture_output=True, text=True)
+
+
+def run_startup_case(name: str, statement: str, paths: Tuple[str, str], repeat: int) -> Optional[StartupResult]:
+    """Runs a case in repeat new processes. Returns None if the statement fails, e.g. when mathutils is not available."""
+    process_times = list()
+    runs: List[Dict] = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = run_child(statement, paths)
+        process_times.append(time.perf_counter() - start)
+
+        if proc.returncode != 0:
+            return None
+
+        runs.append(json.loads(proc.stdout.splitlines()[-1]))
+
+    times = list(map(lambda x: x['time'], runs))
+    return StartupResult(name, min(process_times), median(process_times), min(times), median(times),
+                         runs[-1]['modules'], runs[-1]['mathutils'])
+
+
+def slowest_imports(statement: str, paths: Tuple[str, str], count: int) -> List[Tuple[str, int, int]]:
+    """Runs a case with -X importtime, and returns the (module, self, cumulative) times in microseconds of the count
+    modules with the longest self times.
+    """
+    imports = list()
+    for line in run_child(statement, paths, '-X', 'importtime').stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_time, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(self_time), int(cumulative)))
+
+    return sorted(imports, key=lambda x: x[1], reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='Number of processes started for each case')
+    parser.add_argument('--filter', default='', help='Only run the cases with names containing this text')
+    parser.add_argument('--importtime', type=int, default=0, metavar='COUNT',
+                        help='List the COUNT modules with the longest import times of each case')
+    parser.add_argument('--output', help='Path of the JSON file to write the results to')
+    args = parser.parse_args()
+
+    package = __package__.rsplit('.', 1)[0]
+
+    results: List[StartupResult] = list()
+    with tempfile.TemporaryDirectory() as directory:
+        # Small files, so that the first read cases mostly measure the imports they trigger
+        paths = (os.path.join(directory, 'bench.gmt'), os.path.join(directory, 'bench.cmt'))
+        with open(paths[0], 'wb') as f:
+            f.write(write_gmt(build_gmt(GMTVersion.YAKUZA5, 5, 30, GMTCurveFormat.ROT_XYZW_SHORT)))
+        with open(paths[1], 'wb') as f:
+            f.write(write_cmt(build_cmt(CMTVersion.YAKUZA5, 30)))
+
+        for name, statement in startup_cases(package):
+            if args.filter not in name:
+                continue
+
+            result = run_startup_case(name, statement, paths, args.repeat)
+            if result is None:
+                print(f'{name:<28} skipped, the statement failed')
+                continue
+
+            print(result)
+            results.append(result)
+
+            if args.importtime:
+                for module, self_time, cumulative in slowest_imports(statement, paths, args.importtime):
+                    print(f'    {module:<48} self: {self_time / 1000:8.2f} ms, cumulative: {cumulative / 1000:8.2f} ms')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'repeat': args.repeat, 'results': list(map(vars, results))}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""Times reading, writing and round-tripping synthetic GMT, CMT and IFA files, and tracks the peak memory of each operation.
+
+The files are built by the generators in benchmarks/generators.py, so every run measures the same data.
+Results are written as JSON, and can be compared with the results of another commit using --compare.
+
+Run from the directory containing the package:
+    python -m gmt_lib.benchmarks.suite [--preset quick|default|full] [--filter gmt/DE2] [--output results.json]
+    python -m gmt_lib.benchmarks.suite --output new.json --compare old.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from statistics import median
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..gmt.gmt_reader import read_cmt, read_gmt, read_ifa
+from ..gmt.gmt_writer import write_cmt, write_gmt, write_ifa
+from ..gmt.structure.enums.cmt_enum import CMTVersion
+from ..gmt.structure.enums.gmt_enum import GMTCurveFormat, GMTVersion
+from .generators import *
+
+# (bones, frames) of the size sweep. The largest size is a 500 bone cutscene with 20k frames
+PRESET_SIZES = {
+    'quick': [(1, 10), (20, 300)],
+    'default': [(1, 10), (50, 300), (150, 3000)],
+    'full': [(1, 10), (50, 300), (150, 3000), (500, 20_000)],
+}
+
+# (bones, frames) of the GMT format matrix, and the frame count of the CMT format matrix
+PRESET_MATRIX = {
+    'quick': (10, 60),
+    'default': (20, 300),
+    'full': (50, 300),
+}
+
+PRESET_REPEAT = {
+    'quick': 3,
+    'default': 5,
+    'full': 3,
+}
+
+
+class BenchmarkCase:
+    """A synthetic file and the operations timed on it. build returns the object, and encode writes it to bytes."""
+
+    name: str
+    build: Callable[[], Any]
+    encode: Callable[[Any], bytes]
+    read: Callable[[bytes], Any]
+    write: Callable[[Any], bytes]
+    keyframes: int
+
+    def __init__(self, name, build, encode, read, write, keyframes):
+        self.name = name
+        self.build = build
+        self.encode = encode
+        self.read = read
+        self.write = write
+        self.keyframes = keyframes
+
+
+class BenchmarkResult:
+    case: str
+    operation: str
+    file_size: int
+    keyframes: int
+    best: float
+    median: float
+    peak_memory: int
+
+    def __init__(self, case, operation, file_size, keyframes, best, median, peak_memory):
+        self.case = case
+        self.operation = operation
+        self.file_size = file_size
+        self.keyframes = keyframes
+        self.best = best
+        self.median = median
+        self.peak_memory = peak_memory
+
+    def __str__(self) -> str:
+        return (f'{self.case:<40} {self.operation:<10} best: {self.best * 1000:10.2f} ms, median: {self.median * 1000:10.2f} ms, '
+                f'peak: {self.peak_memory / 2**20:8.2f} MiB')
+
+
+def gmt_case(name: str, build: Callable[[], Any], curve_format: GMTCurveFormat, keyframes: int) -> BenchmarkCase:
+    compress_rotations = curve_format == GMTCurveFormat.ROT_QUAT_XYZ_INT
+    return BenchmarkCase(name, build, lambda x: encode_gmt(x, curve_format), read_gmt,
+                         lambda x: write_gmt(x, compress_rotations), keyframes)
+
+
+def iter_cases(preset: str) -> Iterator[BenchmarkCase]:
+    """Yields the cases of a preset. Objects are only built when a case is run."""
+    bones, frames = PRESET_MATRIX[preset]
+
+    # Every curve format of every version. Iterating a flag enum skips members with multiple bits set, so use __members__
+    for version in GMTVersion.__members__.values():
+        for curve_format in gmt_formats(version):
+            yield gmt_case(f'gmt/{version.name}/{curve_format.name}',
+                           lambda v=version, f=curve_format: build_gmt(v, bones, frames, f),
+                           curve_format, bones * frames * 2)
+
+    # Sizes seen in actual files
+    for size_bones, size_frames in PRESET_SIZES[preset]:
+        for version, curve_format in [(GMTVersion.YAKUZA5, GMTCurveFormat.ROT_XYZW_SHORT),
+                                      (GMTVersion.DE2, GMTCurveFormat.ROT_QUAT_XYZ_INT)]:
+            yield gmt_case(f'gmt/size/{version.name}/{size_bones}x{size_frames}',
+                           lambda v=version, b=size_bones, n=size_frames, f=curve_format: build_gmt(v, b, n, f),
+                           curve_format, size_bones * size_frames * 2)
+
+    # Face GMTs have many short animations
+    face_animations = 10 if preset == 'quick' else 100
+    for version in [GMTVersion.YAKUZA5, GMTVersion.ISHIN, GMTVersion.DE2]:
+        yield gmt_case(f'gmt/face/{version.name}',
+                       lambda v=version: build_face_gmt(v, len(FACE_TARGETS), 30, face_animations),
+                       GMTCurveFormat.ROT_XYZW_SHORT, face_animations * (len(FACE_TARGETS) * 2 + 1) * 30)
+
+    # Every frame format of every version, with and without clip ranges
+    for version in CMTVersion.__members__.values():
+        for clip_range in [False, True]:
+            yield BenchmarkCase(f'cmt/{version.name}' + ('/clip_range' if clip_range else ''),
+                                lambda v=version, c=clip_range: build_cmt(v, frames, clip_range=c),
+                                write_cmt, read_cmt, write_cmt, frames)
+
+    for size_frames in sorted(set(map(lambda x: x[1], PRESET_SIZES[preset]))):
+        yield BenchmarkCase(f'cmt/size/{size_frames}', lambda n=size_frames: build_cmt(CMTVersion.YAKUZA5, n),
+                            write_cmt, read_cmt, write_cmt, size_frames)
+
+    for size_bones in sorted(set(map(lambda x: x[0], PRESET_SIZES[preset]))):
+        yield BenchmarkCase(f'ifa/{size_bones}', lambda b=size_bones: build_ifa(b), write_ifa, read_ifa, write_ifa, size_bones)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Calls func repeat times and returns the best and median times in seconds.
+    The peak memory is measured in an extra call, as tracing allocations slows down the timed calls.
+    """
+    times = list()
+    for _ in range(repeat):
+        gc.collect()
+
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'best': min(times), 'median': median(times), 'peak_memory': peak_memory}
+
+
+def run_case(case: BenchmarkCase, repeat: int) -> List[BenchmarkResult]:
+    obj = case.build()
+    data = bytes(case.encode(obj))
+
+    operations = [
+        ('write', lambda: case.write(obj)),
+        ('read', lambda: case.read(data)),
+        ('round_trip', lambda: case.write(case.read(data))),
+    ]
+
+    return list(map(lambda x: BenchmarkResult(case.name, x[0], len(data), case.keyframes, **measure(x[1], repeat)), operations))
+
+
+def environment() -> Dict[str, Any]:
+    """Returns the details of the machine and commit the benchmarks ran on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__), capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def compare(results: List[BenchmarkResult], baseline_path: str, threshold: float) -> int:
+    """Prints the median time of each result relative to a previous run, and returns the number of regressions,
+    which are results slower than the baseline by more than the threshold.
+    """
+    with open(baseline_path) as f:
+        baseline = dict(map(lambda x: ((x['case'], x['operation']), x), json.load(f)['results']))
+
+    regressions = 0
+    for result in results:
+        old = baseline.get((result.case, result.operation))
+        if old is None:
+            continue
+
+        ratio = result.median / old['median']
+        memory_ratio = result.peak_memory / max(old['peak_memory'], 1)
+        regressed = ratio > 1.0 + threshold
+        regressions += regressed
+
+        print(f'{"!" if regressed else " "} {result.case:<40} {result.operation:<10} time: {ratio:6.2f}x, memory: {memory_ratio:6.2f}x')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=list(PRESET_SIZES), default='default', help='Sizes of the generated files')
+    parser.add_argument('--filter', default='', help='Only run the cases with names containing this text')
+    parser.add_argument('--repeat', type=int, help='Number of timed calls of each operation, defaults to the preset\'s')
+    parser.add_argument('--output', help='Path of the JSON file to write the results to')
+    parser.add_argument('--compare', help='Path of a JSON file from a previous run to compare the results with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown of the median time that counts as a regression when comparing')
+    args = parser.parse_args()
+
+    repeat = args.repeat or PRESET_REPEAT[args.preset]
+
+    results: List[BenchmarkResult] = list()
+    for case in iter_cases(args.preset):
+        if args.filter not in case.name:
+            continue
+
+        for result in run_case(case, repeat):
+            print(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'preset': args.preset, 'repeat': repeat,
+                       'results': list(map(vars, results))}, f, indent=2)
+
+    regressions: Optional[int] = None
+    if args.compare:
+        print()
+        regressions = compare(results, args.compare, args.threshold)
+        print(f'{regressions} regression(s) above {args.threshold:.0%}')
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
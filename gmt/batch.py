@@ -0,0 +1,235 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
+
+from .gmt_reader import read_cmt, read_gmt, read_ifa
+from .gmt_writer import (write_cmt_to_file, write_gmt_to_file,
+                         write_ifa_to_file)
+from .structure.enums.cmt_enum import CMTVersion
+from .structure.enums.gmt_enum import GMTVersion
+
+FILE_EXTENSIONS = ('.gmt', '.cmt', '.ifa')
+
+
+class BatchResult:
+    path: str
+    ok: bool
+    result: Any
+    error: Optional[str]
+    elapsed: float
+
+    def __init__(self, path, ok, result=None, error=None, elapsed=0.0):
+        self.path = path
+        self.ok = ok
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    def __str__(self) -> str:
+        status = 'OK' if self.ok else 'FAILED'
+        detail = self.result if self.ok else self.error.strip().splitlines()[-1]
+        return f'[{status}] {self.path} ({self.elapsed * 1000:.1f} ms): {detail}'
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+def find_files(source: str, extensions=FILE_EXTENSIONS) -> List[str]:
+    """Returns a sorted list of files with the given extensions.
+    :param source: Path to a directory (searched recursively), or a glob pattern
+    :param extensions: Tuple of lowercase file extensions to include
+    :return: List of file paths
+    """
+
+    if os.path.isdir(source):
+        pattern = os.path.join(source, '**', '*')
+    else:
+        pattern = source
+
+    return sorted(p for p in glob.glob(pattern, recursive=True)
+                  if os.path.isfile(p) and os.path.splitext(p)[1].lower() in extensions)
+
+
+def find_root(source: str) -> str:
+    """Returns the directory that the files found by find_files are relative to.
+    :param source: Path to a directory, or a glob pattern
+    :return: The directory itself, or the longest directory of the pattern that does not contain wildcards
+    """
+
+    if os.path.isdir(source):
+        return source
+
+    parts = list()
+    for part in os.path.dirname(source).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+
+    return os.sep.join(parts) or os.curdir
+
+
+def run_batch(files: Union[str, Iterable[str]], transform: Callable[[str], Any], workers: Optional[int] = None,
+              chunk_size=16, threads=False) -> Iterator[BatchResult]:
+    """Runs a transform on each file using a process pool, and yields the results as they complete.
+    Exceptions raised by the transform are captured in the result, and do not stop the other files from being processed.
+    If a whole chunk fails, e.g. because its worker process died, every file of the chunk gets a failed result.
+    :param files: Directory or glob pattern (see find_files), or an iterable of file paths
+    :param transform: Function that takes a file path and returns a picklable result. Must be picklable itself,
+    so it should be defined at module level (functools.partial objects of such functions also work)
+    :param workers: Number of worker processes. None uses the CPU count, and 0 runs everything in the current process
+    :param chunk_size: Number of files sent to a worker at a time. Must be at least 1
+    :param threads: If True, a thread pool is used instead of a process pool. Threads only overlap while waiting on I/O,
+    but they start instantly and the transform and its results do not need to be picklable
+    :return: Iterator of BatchResult, in completion order
+    """
+
+    if chunk_size < 1:
+        raise ValueError(f'chunk_size must be at least 1, not {chunk_size}')
+
+    if isinstance(files, str):
+        files = find_files(files)
+
+    files = list(files)
+    chunks = [files[i: i + chunk_size] for i in range(0, len(files), chunk_size)]
+
+    if workers == 0:
+        for chunk in chunks:
+            yield from _run_chunk(transform, chunk)
+        return
+
+    executor_cls = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor_cls(max_workers=workers) as executor:
+        futures = {executor.submit(_run_chunk, transform, chunk): chunk for chunk in chunks}
+
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception:
+                # The chunk failed outside of the transform, e.g. a worker process died or a result could not be pickled
+                error = traceback.format_exc()
+                results = list(map(lambda x: BatchResult(x, False, error=error), futures[future]))
+
+            yield from results
+
+
+def _run_chunk(transform: Callable[[str], Any], paths: List[str]) -> List[BatchResult]:
+    results = list()
+
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            result = BatchResult(path, True, result=transform(path))
+        except Exception:
+            result = BatchResult(path, False, error=traceback.format_exc())
+
+        result.elapsed = time.perf_counter() - start
+        results.append(result)
+
+    return results
+
+
+# Transforms
+def read_file(path: str):
+    """Reads a GMT, CMT or IFA file depending on its extension."""
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.gmt':
+        return read_gmt(path)
+    elif ext == '.cmt':
+        return read_cmt(path)
+    elif ext == '.ifa':
+        return read_ifa(path)
+
+    raise Exception(f'Unknown file extension: {ext}')
+
+
+def validate(path: str) -> str:
+    """Fully reads a file and returns a short summary. Fails if the file cannot be parsed."""
+    obj = read_file(path)
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.gmt':
+        obj.materialize()
+        return f'{GMTVersion(obj.version).name}, {len(obj.animation_list)} animation(s)'
+    elif ext == '.cmt':
+        return f'{CMTVersion(obj.version).name}, {len(obj.animation_list)} animation(s)'
+
+    return f'{len(obj.bone_list)} bone(s)'
+
+
+def reencode(path: str, output_dir: str, version: Optional[str] = None, compress_rotations=False,
+             source_root: Optional[str] = None) -> str:
+    """Reads a file and writes it again to output_dir, optionally converting it to another version.
+    :param source_root: Directory that path is relative to (see find_root). Its subdirectories are recreated in output_dir,
+    so that files with the same name in different subdirectories do not overwrite each other. If not given, the file is
+    written directly to output_dir
+    :param version: Name of a GMTVersion or CMTVersion member. Not supported for IFA files
+    :param compress_rotations: See write_gmt
+    :return: Path to the written file
+    """
+    obj = read_file(path)
+    ext = os.path.splitext(path)[1].lower()
+    out_path = os.path.join(output_dir, os.path.relpath(path, source_root or os.path.dirname(path)))
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    if ext == '.gmt':
+        if version:
+            obj.version = GMTVersion[version]
+
+        write_gmt_to_file(obj, out_path, compress_rotations)
+    elif ext == '.cmt':
+        if version:
+            obj.version = CMTVersion[version]
+
+        write_cmt_to_file(obj, out_path)
+    else:
+        if version:
+            raise Exception('IFA files do not have a version')
+
+        write_ifa_to_file(obj, out_path)
+
+    return out_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Validate or convert directories of GMT/CMT/IFA files in parallel.')
+    parser.add_argument('source', help='directory (searched recursively) or glob pattern')
+    parser.add_argument('-o', '--output', help='output directory. If not given, files are only validated')
+    parser.add_argument('-v', '--version', help='target GMTVersion/CMTVersion name (e.g. DE2, YAKUZA5)')
+    parser.add_argument('-c', '--compress-rotations', action='store_true',
+                        help='write GMT rotations as ROT_QUAT_XYZ_INT (Dragon Engine versions only)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count, 0: no worker processes)')
+    parser.add_argument('--chunk-size', type=int, default=16, help='files per worker task (default: 16)')
+    parser.add_argument('--threads', action='store_true',
+                        help='use worker threads instead of processes, for I/O-bound batches (e.g. network drives)')
+    args = parser.parse_args(argv)
+
+    if args.output:
+        transform = partial(reencode, output_dir=args.output, version=args.version,
+                            compress_rotations=args.compress_rotations, source_root=find_root(args.source))
+    else:
+        transform = validate
+
+    failed = total = 0
+    start = time.perf_counter()
+
+    for result in run_batch(args.source, transform, args.workers, args.chunk_size, args.threads):
+        total += 1
+        failed += not result.ok
+        print(result)
+
+    print(f'{total - failed}/{total} file(s) succeeded in {time.perf_counter() - start:.2f} s')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .gmt_reader import read_gmt
+from .structure.enums.gmt_enum import *
+from .structure.gmt import *
+from .util import *
+
+# Version of the cache entries. Has to be increased whenever the reader or the entry layout changes what a cached GMT
+# contains, so entries written by other versions of the library are never used
+CACHE_VERSION = 1
+
+CACHE_EXTENSION = '.npz'
+
+
+class GMTCacheEntry:
+    """Decoded contents of a GMT, as a JSON-compatible description of its structure and a list of read-only arrays.
+    Curves refer to their frame and value arrays by their index in the list. Frame arrays are shared by curves with
+    the same frames, like in the reader.
+    """
+
+    meta: Dict[str, Any]
+    arrays: List['np.ndarray']
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+
+        for array in arrays:
+            array.flags.writeable = False
+
+    @classmethod
+    def from_gmt(cls, gmt: GMT, copy=True) -> 'GMTCacheEntry':
+        """Creates an entry from the curves of a GMT object.
+        If copy is False, the curve arrays are used as they are and made read-only, so the GMT should not be used after.
+        """
+        arrays = list()
+        frame_indices: Dict[int, int] = dict()
+
+        def add_frames(frames: 'np.ndarray') -> int:
+            index = frame_indices.get(id(frames))
+            if index is None:
+                index = frame_indices[id(frames)] = len(arrays)
+                arrays.append(frames)
+
+            return index
+
+        animations = list()
+        for anm in gmt.animation_list:
+            bones = list()
+            for bone in anm.bones.values():
+                curves = list()
+                for curve in bone.curves_view:
+                    frames, values = curve.get_arrays()
+
+                    curves.append([int(curve.type), int(curve.channel), add_frames(frames), len(arrays)])
+                    arrays.append(values)
+
+                bones.append({'name': bone.name, 'curves': curves})
+
+            animations.append({'name': anm.name, 'frame_rate': anm.frame_rate, 'end_frame': anm.end_frame, 'bones': bones})
+
+        meta = {
+            'name': gmt.name,
+            'version': int(gmt.version),
+            'is_face_gmt': gmt.is_face_gmt,
+            'animations': animations,
+        }
+
+        return cls(meta, list(map(np.array, arrays)) if copy else arrays)
+
+    def to_gmt(self) -> GMT:
+        """Builds a new GMT object. The curves use the entry's arrays without copying them."""
+        gmt = GMT(self.meta['name'], GMTVersion(self.meta['version']))
+        gmt.is_face_gmt = self.meta['is_face_gmt']
+
+        for anm_meta in self.meta['animations']:
+            anm = GMTAnimation(anm_meta['name'], anm_meta['frame_rate'], anm_meta['end_frame'])
+
+            for bone_meta in anm_meta['bones']:
+                bone = GMTBone(bone_meta['name'])
+                curves = list()
+
+                for curve_type, channel, frames_index, values_index in bone_meta['curves']:
+                    curve = GMTCurve(GMTCurveType(curve_type), GMTCurveChannel(channel))
+                    curve.set_arrays(self.arrays[frames_index], self.arrays[values_index])
+                    curves.append(curve)
+
+                bone.curves = curves
+                anm.bones[bone.name] = bone
+
+            gmt.animation_list.append(anm)
+
+        return gmt
+
+    def nbytes(self) -> int:
+        return sum(map(lambda x: x.nbytes, self.arrays))
+
+    def save(self, path: str):
+        """Writes the entry as an uncompressed .npz file. The file is written to a temporary file first and then moved
+        into place, so other processes never see a partially written entry.
+        """
+        directory = os.path.dirname(path)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                meta = np.frombuffer(json.dumps(self.meta).encode('utf-8'), dtype=np.uint8)
+                np.savez(f, meta=meta, **{f'a{i}': array for i, array in enumerate(self.arrays)})
+
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'GMTCacheEntry':
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+            arrays = list(map(lambda i: npz[f'a{i}'], range(len(npz.files) - 1)))
+
+        return cls(meta, arrays)
+
+
+class GMTCache:
+    """Cache of decoded GMT files, keyed by a hash of the file contents and CACHE_VERSION.
+    Entries are kept in memory, and optionally in a directory that can be shared by several processes. Both are limited
+    in size, and the least recently used entries are evicted first.
+    Each hit returns a new GMT object without parsing the file. Its curves share read-only arrays with the cache, so
+    curves should be modified by setting new keyframes or arrays rather than in place. Requires NumPy.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size=1 << 30, max_memory=256 << 20):
+        """Creates a cache.
+        :param directory: Directory to store entries in. If None, entries are only kept in memory
+        :param max_size: Max total size in bytes of the entries in the directory
+        :param max_memory: Max total size in bytes of the arrays of the entries kept in memory
+        """
+        if not HAS_NUMPY:
+            raise Exception('GMTCache requires NumPy')
+
+        self.directory = directory
+        self.max_size = max_size
+        self.max_memory = max_memory
+
+        self.hits = 0
+        self.misses = 0
+
+        self.__memory: 'OrderedDict[str, GMTCacheEntry]' = OrderedDict()
+        self.__memory_size = 0
+        self.__lock = threading.Lock()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def read_gmt(self, file: Union[str, bytearray]) -> GMT:
+        """Reads a GMT file like read_gmt, returning the cached result if the same file was read before.
+        :param file: Path to file as a string, or bytes-like object containing the file
+        :return: The GMT object
+        """
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                file = f.read()
+
+        key = self.key(file)
+
+        entry = self.get(key)
+        if entry is not None:
+            return entry.to_gmt()
+
+        entry = GMTCacheEntry.from_gmt(read_gmt(file), copy=False)
+        self.put(key, entry)
+
+        return entry.to_gmt()
+
+    @staticmethod
+    def key(file: bytes) -> str:
+        """Returns the cache key of the contents of a file."""
+        return f'{hashlib.blake2b(file, digest_size=20).hexdigest()}_v{CACHE_VERSION}'
+
+    def get(self, key: str) -> Optional[GMTCacheEntry]:
+        """Returns the entry with the given key from memory, or from the directory, or None if it is not cached."""
+        with self.__lock:
+            entry = self.__memory.get(key)
+            if entry is not None:
+                self.__memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self.__load(key)
+
+        with self.__lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.__remember(key, entry)
+
+        return entry
+
+    def put(self, key: str, entry: GMTCacheEntry):
+        """Adds an entry to the cache, and evicts the least recently used entries if the cache is over its size limits."""
+        with self.__lock:
+            self.__remember(key, entry)
+
+        if self.directory is not None:
+            entry.save(self.__path(key))
+            self.__evict_files()
+
+    def clear(self):
+        """Removes all entries from memory and from the directory."""
+        with self.__lock:
+            self.__memory.clear()
+            self.__memory_size = 0
+
+        if self.directory is not None:
+            for path, _, _ in self.__list_files():
+                self.__remove(path)
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    def __load(self, key: str) -> Optional[GMTCacheEntry]:
+        if self.directory is None:
+            return None
+
+        path = self.__path(key)
+        try:
+            entry = GMTCacheEntry.load(path)
+        except (OSError, ValueError, KeyError):
+            # Missing, evicted by another process in the meantime, or unreadable
+            return None
+
+        # The modification time is used as the last access time for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry
+
+    def __remember(self, key: str, entry: GMTCacheEntry):
+        """Adds an entry to the memory cache and evicts old entries. Must be called with the lock held."""
+        if key not in self.__memory:
+            self.__memory_size += entry.nbytes()
+
+        self.__memory[key] = entry
+        self.__memory.move_to_end(key)
+
+        while self.__memory_size > self.max_memory and len(self.__memory) > 1:
+            _, evicted = self.__memory.popitem(last=False)
+            self.__memory_size -= evicted.nbytes()
+
+    def __list_files(self) -> List[Tuple[str, float, int]]:
+        """Returns the path, modification time and size of each entry in the directory."""
+        files = list()
+        for name in os.listdir(self.directory):
+            if not name.endswith(CACHE_EXTENSION):
+                continue
+
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            files.append((path, stat.st_mtime, stat.st_size))
+
+        return files
+
+    def __evict_files(self):
+        files = sorted(self.__list_files(), key=lambda x: x[1])
+        total_size = sum(map(lambda x: x[2], files))
+
+        for path, _, size in files[:-1]:
+            if total_size <= self.max_size:
+                break
+
+            self.__remove(path)
+            total_size -= size
+
+    @staticmethod
+    def __remove(path: str):
+        # Another process may have removed the same file already
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,223 @@
+from typing import Callable, List, Tuple
+
+from .structure.br.br_gmt import *
+from .structure.gmt import *
+from .util import *
+from .util.interpolation import lerp, normalize, slerp
+
+# Components of a full value that a partial channel keeps, in the order they are stored
+LOCATION_CHANNELS = [
+    (GMTCurveChannel.X, (0,)),
+    (GMTCurveChannel.Y, (1,)),
+    (GMTCurveChannel.Z, (2,)),
+]
+
+ROTATION_CHANNELS = [
+    (GMTCurveChannel.XW, (0, 3)),
+    (GMTCurveChannel.YW, (1, 3)),
+    (GMTCurveChannel.ZW, (2, 3)),
+]
+
+
+class GMTOptimizeReport:
+    keyframes_before: int
+    keyframes_after: int
+    constant_curves: int
+    channel_curves: int
+    data_size_before: int
+    data_size_after: int
+    file_size_before: int
+    file_size_after: int
+    max_location_error: float
+    max_rotation_error: float
+
+    def __init__(self):
+        self.keyframes_before = self.keyframes_after = 0
+        self.constant_curves = self.channel_curves = 0
+        self.data_size_before = self.data_size_after = 0
+        self.file_size_before = self.file_size_after = 0
+        self.max_location_error = self.max_rotation_error = 0.0
+
+    @property
+    def size_saved(self) -> int:
+        return self.file_size_before - self.file_size_after
+
+    def __repr__(self) -> str:
+        return (f'keyframes: {self.keyframes_before} -> {self.keyframes_after}, constant_curves: {self.constant_curves}, '
+                f'channel_curves: {self.channel_curves}, data_size: {self.data_size_before} -> {self.data_size_after}, '
+                f'file_size: {self.file_size_before} -> {self.file_size_after}, '
+                f'max_location_error: {self.max_location_error:.6g}, max_rotation_error: {self.max_rotation_error:.6g}')
+
+
+def optimize_gmt(gmt: GMT, location_tolerance=0.0001, rotation_tolerance=0.0005, reduce_channels=True) -> GMTOptimizeReport:
+    """Removes redundant keyframes from the location and rotation curves of a GMT object, in place.
+    Keyframes are removed as long as interpolating between the remaining ones stays within the tolerance at every
+    original keyframe. Constant curves are collapsed to a single keyframe. Pattern curves are not modified.
+    Errors are measured on the float values, before they are quantized by the format they are written in.
+    :param gmt: The GMT object
+    :param location_tolerance: Max distance between an original and an optimized location
+    :param rotation_tolerance: Max angle in radians between an original and an optimized rotation
+    :param reduce_channels: If True, curves where only one axis moves (within the tolerance) are converted to partial
+    channels (GMTCurveChannel.X, GMTCurveChannel.XW, etc.), which are written with the smaller channel formats
+    :return: A GMTOptimizeReport with the keyframe counts, the size saved, and the max errors. Requires NumPy
+    """
+
+    report = GMTOptimizeReport()
+    report.file_size_before, report.data_size_before = __get_sizes(gmt)
+
+    for anm in gmt.animation_list:
+        end_frame = anm.get_end_frame()
+        restore_ends = list()
+
+        for bone in anm.bones.values():
+            for curve in bone.curves_view:
+                report.keyframes_before += curve.keyframe_count()
+
+                restore_end = None
+                if curve.type == GMTCurveType.LOCATION:
+                    restore_end = __optimize_curve(curve, location_tolerance, reduce_channels, LOCATION_CHANNELS,
+                                                   __location_error, lerp, report)
+                elif curve.type == GMTCurveType.ROTATION:
+                    restore_end = __optimize_curve(curve, rotation_tolerance, reduce_channels, ROTATION_CHANNELS,
+                                                   __rotation_error, slerp, report)
+
+                report.keyframes_after += curve.keyframe_count()
+
+                if restore_end is not None:
+                    restore_ends.append(restore_end)
+
+        # The end frame of an animation comes from its curves, so removing the last keyframe of every curve would make
+        # the animation shorter. Restore the last keyframe of one curve in that case (the first keyframe is always kept)
+        if anm.get_end_frame() != end_frame:
+            next(x[1] for x in restore_ends if x[0] == end_frame)()
+            report.keyframes_after += 1
+
+    report.file_size_after, report.data_size_after = __get_sizes(gmt)
+
+    return report
+
+
+def __get_sizes(gmt: GMT) -> Tuple[int, int]:
+    """Returns the written file size and the size of the animation data and graph data."""
+    br_gmt = BrGMT()
+    file_size = br_gmt.prepare(gmt)
+
+    return (file_size, br_gmt.anm_data_size + br_gmt.graph_data_size)
+
+
+def __location_error(values: 'np.ndarray', targets: 'np.ndarray') -> 'np.ndarray':
+    return np.linalg.norm(values - targets, axis=-1)
+
+
+def __rotation_error(values: 'np.ndarray', targets: 'np.ndarray') -> 'np.ndarray':
+    dot = np.abs(np.sum(normalize(values) * normalize(targets), axis=-1))
+
+    return 2.0 * np.arccos(np.clip(dot, 0.0, 1.0))
+
+
+def __optimize_curve(curve: GMTCurve, tolerance: float, reduce_channels: bool, channels: List[Tuple[GMTCurveChannel, Tuple[int]]],
+                     get_error: Callable, interpolate: Callable, report: GMTOptimizeReport):
+    """Optimizes a single curve. If its last keyframe was removed, returns the frame of that keyframe
+    and a function that restores it.
+    """
+    count = curve.keyframe_count()
+    if count < 2:
+        return None
+
+    frames, values = curve.get_arrays()
+    frames = np.asarray(frames, dtype=np.uint16)
+
+    # Work with all components, so that errors are measured the same way for every channel
+    targets = curve.get_sample_keyframes(frames.astype(np.float64))[0].astype(np.float64)
+    candidates, channel, columns = targets, curve.channel, None
+
+    if reduce_channels and curve.channel == GMTCurveChannel.ALL:
+        for option, option_columns in channels:
+            projected = np.zeros_like(targets)
+            projected[:, option_columns] = targets[:, option_columns]
+
+            # Rotations are normalized after dropping the other axes, so they stay valid quaternions
+            if curve.type == GMTCurveType.ROTATION:
+                projected = normalize(projected)
+
+            if get_error(projected, targets).max() <= tolerance:
+                candidates, channel, columns = projected, option, option_columns
+                break
+
+    if get_error(np.broadcast_to(candidates[0], targets.shape), targets).max() <= tolerance:
+        kept = np.zeros(count, dtype=bool)
+        kept[0] = True
+        report.constant_curves += 1
+    else:
+        kept = __reduce_keyframes(frames, candidates, targets, tolerance, get_error, interpolate)
+
+    if channel != curve.channel:
+        report.channel_curves += 1
+    elif channel != GMTCurveChannel.ALL:
+        columns = dict(channels)[channel]
+
+    # Store only the components of the channel
+    stored = candidates if columns is None else candidates[:, columns]
+    stored = stored.astype(values.dtype if values.dtype.kind == 'f' else np.float32)
+
+    curve.channel = channel
+    curve.set_arrays(frames[kept], stored[kept])
+
+    error = get_error(curve.sample(frames.astype(np.float64)), targets)
+    max_error = np.max(error[np.isfinite(error)], initial=0.0)
+    if curve.type == GMTCurveType.LOCATION:
+        report.max_location_error = max(report.max_location_error, float(max_error))
+    else:
+        report.max_rotation_error = max(report.max_rotation_error, float(max_error))
+
+    def restore_end():
+        kept[-1] = True
+        curve.set_arrays(frames[kept], stored[kept])
+
+    return None if kept[-1] else (int(frames[-1]), restore_end)
+
+
+def __reduce_keyframes(frames: 'np.ndarray', values: 'np.ndarray', targets: 'np.ndarray', tolerance: float,
+                       get_error: Callable, interpolate: Callable) -> 'np.ndarray':
+    """Returns a mask of the keyframes to keep, by splitting the curve at the keyframe with the largest error
+    until interpolating between the kept keyframes is within the tolerance of every target.
+    All segments at the same depth are split at once.
+    """
+    kept = np.zeros(len(frames), dtype=bool)
+    kept[0] = kept[-1] = True
+
+    frames = frames.astype(np.float64)
+    starts, ends = np.array([0]), np.array([len(frames) - 1])
+
+    while len(starts):
+        lengths = ends - starts - 1
+        has_inner = lengths > 0
+        starts, ends, lengths = starts[has_inner], ends[has_inner], lengths[has_inner]
+
+        if not len(starts):
+            break
+
+        # Keyframes inside each segment, flattened, along with the segment they belong to
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        inner = starts[segment] + 1 + np.arange(lengths.sum()) - offsets[segment]
+        start, end = starts[segment], ends[segment]
+
+        t = (frames[inner] - frames[start]) / (frames[end] - frames[start])
+        error = get_error(interpolate(values[start], values[end], t), targets[inner])
+
+        # Keyframes with invalid values can only be reproduced by keeping them
+        error[np.isnan(error)] = np.inf
+
+        # Split each segment at its first keyframe with the largest error, if that error is too large
+        segment_max = np.maximum.reduceat(error, offsets)
+        first_max = np.unique(segment[error == segment_max[segment]], return_index=True)[1]
+        splits = inner[np.flatnonzero(error == segment_max[segment])[first_max]]
+
+        split = segment_max > tolerance
+        splits, starts, ends = splits[split], starts[split], ends[split]
+
+        kept[splits] = True
+        starts, ends = np.concatenate((starts, splits)), np.concatenate((splits, ends))
+
+    return kept
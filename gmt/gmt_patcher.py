@@ -0,0 +1,280 @@
+import struct
+from typing import List, Union
+
+from .structure.br.br_gmt import *
+from .structure.br.br_rgg import BrRGGString
+from .structure.gmt import *
+from .util import *
+
+# Offsets of the header fields that can change when patching
+HEADER_DATA_SIZE = 0x0C
+HEADER_GRAPHS_COUNT = 0x38
+HEADER_GRAPHS_OFFSET = 0x3C
+HEADER_GRAPH_DATA_SIZE = 0x40
+
+# Offsets of the animation fields that can change when patching
+ANIMATION_START_FRAME = 0x00
+ANIMATION_END_FRAME = 0x04
+ANIMATION_GRAPHS_COUNT = 0x28
+ANIMATION_DATA_SIZE = 0x2C
+ANIMATION_GRAPH_DATA_SIZE = 0x34
+
+GMT_ANIMATION_SIZE = 0x40
+GMT_CURVE_SIZE = 0x10
+RGG_STRING_SIZE = 0x20
+
+
+class GMTPatcher:
+    """Edits an existing GMT file without reading or re-encoding all of it.
+    Only the tables are parsed when opening the file. Replaced curves are encoded and written over their old animation
+    data if it fits, or appended to the end of the file otherwise. The animation data of all other curves is kept as is.
+    Sections that grow (new animation data and new graphs) are appended after the existing data, and the offsets of
+    the header, the animations and the curves are updated to point to them.
+    """
+
+    def __init__(self, file: Union[str, bytearray]):
+        """Opens a GMT file for patching.
+        :param file: Path to file as a string, or bytes-like object containing the file. The object is not modified
+        """
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                self.buffer = bytearray(f.read())
+        else:
+            self.buffer = bytearray(file)
+
+        with MappedBinaryReader(self.buffer) as br:
+            self.br_gmt: BrGMT = br.read_struct(BrGMT, None, True)
+
+        # Tables that are modified by patching
+        self.br_gmt.curves = list(self.br_gmt.curves)
+        self.br_gmt.strings = list(self.br_gmt.strings)
+
+        header: BrGMTHeader = self.br_gmt.header
+        self.endianness = header.endianness
+        self.version = header.version
+
+        # End of the file without padding, where new data is appended
+        self.data_size = header.data_size
+        del self.buffer[self.data_size:]
+
+        self.graph_data_end = header.graph_data_offset + header.graph_data_size
+        self.graph_offsets = list(map(lambda i: self.__read_uint32(header.graphs_offset + i * 4), range(header.graphs_count)))
+
+        # Same as GMT.vector_version, the old vector version is detected by the scale bone
+        self.vector_version = GMTVectorVersion.from_GMTVersion(self.version)
+        if self.vector_version != GMTVectorVersion.NO_VECTOR and len(self.br_gmt.animations) != 0:
+            self.vector_version = GMTVectorVersion.OLD_VECTOR if 'scale' in self.bone_names(0) \
+                else GMTVectorVersion.DRAGON_VECTOR
+
+    def animation_names(self) -> List[str]:
+        """Returns the names of the animations in the file."""
+        return list(map(lambda x: self.br_gmt.strings[x.name_index].data, self.br_gmt.animations))
+
+    def bone_names(self, animation: Union[int, str]) -> List[str]:
+        """Returns the names of the bones of an animation, given its index or name."""
+        br_anm: BrGMTAnimation = self.br_gmt.animations[self.__get_animation_index(animation)]
+        group: BrGMTGroup = self.br_gmt.bone_groups[br_anm.bone_group_index]
+
+        return list(map(lambda x: x.data, self.br_gmt.strings[group.index: group.index + group.count]))
+
+    def get_curve(self, animation: Union[int, str], bone: str, curve_type: GMTCurveType, index=0) -> GMTCurve:
+        """Decodes a single curve of the file.
+        :param animation: Index or name of the animation
+        :param bone: Name of the bone
+        :param curve_type: Type of the curve
+        :param index: Index of the curve among the curves of the same type in the bone, for pattern curves
+        :return: The GMTCurve
+        """
+        br_curve: BrGMTCurve = self.br_gmt.curves[self.__get_curve_index(animation, bone, curve_type, index)]
+
+        curve = GMTCurve(br_curve.type, br_curve.channel)
+        with MappedBinaryReader(self.buffer, self.endianness) as br:
+            values = br_curve.read_values(br)
+
+        if HAS_NUMPY:
+            curve.set_arrays(np.array(br_curve.graph.values, dtype=np.uint16), values)
+        else:
+            curve.keyframes = list(map(GMTKeyframe, br_curve.graph.values, values))
+
+        return curve
+
+    def replace_curve(self, animation: Union[int, str], bone: str, curve: GMTCurve, index=0, compress_rotations=False):
+        """Replaces the keyframes of a curve with the keyframes of the given curve, which must have the same type.
+        Only this curve is encoded. Its frames reuse one of the animation's graphs if possible.
+        :param animation: Index or name of the animation
+        :param bone: Name of the bone
+        :param curve: The new curve
+        :param index: Index of the curve among the curves of the same type in the bone, for pattern curves
+        :param compress_rotations: See write_gmt
+        """
+        anm_index = self.__get_animation_index(animation)
+        curve_index = self.__get_curve_index(anm_index, bone, curve.type, index)
+
+        br_anm: BrGMTAnimation = self.br_gmt.animations[anm_index]
+        old_curve: BrGMTCurve = self.br_gmt.curves[curve_index]
+
+        # Graphs are reused from the same animation, and new graphs are added after the existing ones
+        graph_table = BrGMTGraphTable()
+        graph_table.load(self.br_gmt.graphs, range(br_anm.graphs_index, br_anm.graphs_index + br_anm.graphs_count))
+
+        br_curve = BrGMTCurve()
+        br_curve.prepare(curve, graph_table, 0, self.version, self.vector_version, compress_rotations)
+
+        with BinaryReader(endianness=self.endianness) as br:
+            br_curve.write_values(br)
+            data = br.buffer()
+
+        # Write over the old data if nothing else uses it and the new data fits, otherwise append the new data
+        offset = old_curve.animation_data_offset
+        if data and (sum(map(lambda x: x.animation_data_offset == offset, self.br_gmt.curves)) > 1 or
+                     len(data) > self.__get_free_size(offset)):
+            offset = self.__append(data)
+        else:
+            self.buffer[offset: offset + len(data)] = data
+
+        br_curve.animation_data_offset = offset
+
+        # Add the graph if it is new
+        if br_curve.graph_index == len(self.br_gmt.graphs):
+            self.graph_offsets.append(self.__append(graph_table.graphs[-1], 4))
+            self.graph_data_end = max(self.graph_data_end, self.data_size)
+            self.br_gmt.graphs.append(graph_table.graphs[-1])
+
+        br_curve.graph = self.br_gmt.graphs[br_curve.graph_index]
+        br_curve.version, br_curve.endianness = self.version, self.endianness
+        self.br_gmt.curves[curve_index] = br_curve
+
+        with BinaryReader(endianness=self.endianness) as br:
+            br.write_struct(br_curve)
+            curve_offset = self.br_gmt.header.curves_offset + curve_index * GMT_CURVE_SIZE
+            self.buffer[curve_offset: curve_offset + GMT_CURVE_SIZE] = br.buffer()
+
+        self.__update_animation(anm_index, br_curve, offset, len(data))
+
+    def rename_animation(self, animation: Union[int, str], name: str):
+        """Renames an animation, given its index or name. Names are limited to 30 bytes."""
+        br_anm: BrGMTAnimation = self.br_gmt.animations[self.__get_animation_index(animation)]
+
+        string = BrRGGString(name)
+        self.br_gmt.strings[br_anm.name_index] = string
+
+        with BinaryReader(endianness=self.endianness) as br:
+            br.write_struct(string)
+            offset = self.br_gmt.header.strings_offset + br_anm.name_index * RGG_STRING_SIZE
+            self.buffer[offset: offset + RGG_STRING_SIZE] = br.buffer()
+
+    def to_bytes(self) -> bytearray:
+        """Returns the patched file as a bytearray."""
+        buffer = bytearray(self.buffer)
+        header: BrGMTHeader = self.br_gmt.header
+        fmt = '>I' if self.endianness else '<I'
+
+        # The graph offsets table is moved to the end of the file if graphs were added
+        graphs_offset = header.graphs_offset
+        if len(self.graph_offsets) != header.graphs_count:
+            buffer.extend(bytes(aligned_size(len(buffer), 0x20) - len(buffer)))
+            graphs_offset = len(buffer)
+            buffer.extend(struct.pack(f'{fmt[0]}{len(self.graph_offsets)}I', *self.graph_offsets))
+
+        struct.pack_into(fmt, buffer, HEADER_DATA_SIZE, len(buffer))
+        struct.pack_into(fmt, buffer, HEADER_GRAPHS_COUNT, len(self.graph_offsets))
+        struct.pack_into(fmt, buffer, HEADER_GRAPHS_OFFSET, graphs_offset)
+        struct.pack_into(fmt, buffer, HEADER_GRAPH_DATA_SIZE, self.graph_data_end - header.graph_data_offset)
+
+        buffer.extend(bytes(aligned_size(len(buffer), 0x1000) - len(buffer)))
+
+        return buffer
+
+    def save(self, path: str):
+        """Writes the patched file.
+        :param path: Path to target file as a string
+        """
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    def __get_animation_index(self, animation: Union[int, str]) -> int:
+        if isinstance(animation, int):
+            return animation
+
+        names = self.animation_names()
+        if animation not in names:
+            raise Exception(f'Animation not found: {animation}')
+
+        return names.index(animation)
+
+    def __get_curve_index(self, animation: Union[int, str], bone: str, curve_type: GMTCurveType, index: int) -> int:
+        anm_index = self.__get_animation_index(animation)
+        bone_names = self.bone_names(anm_index)
+
+        if bone not in bone_names:
+            raise Exception(f'Bone not found in animation {anm_index}: {bone}')
+
+        br_anm: BrGMTAnimation = self.br_gmt.animations[anm_index]
+        group: BrGMTGroup = self.br_gmt.curve_groups[br_anm.curve_groups_index + bone_names.index(bone)]
+
+        curve_indices = [i for i in range(group.index, group.index + group.count) if self.br_gmt.curves[i].type == curve_type]
+        if index >= len(curve_indices):
+            raise Exception(f'Curve not found for bone {bone}: {GMTCurveType(curve_type).name} {index}')
+
+        return curve_indices[index]
+
+    def __get_free_size(self, offset: int) -> int:
+        """Returns the size available at the given offset before the next section or animation data."""
+        header: BrGMTHeader = self.br_gmt.header
+        starts = [
+            self.data_size, header.animations_offset, header.graphs_offset, header.graph_data_offset,
+            header.strings_offset, header.bone_groups_offset, header.curve_groups_offset, header.curves_offset,
+        ]
+        starts.extend(map(lambda x: x.animation_data_offset, self.br_gmt.curves))
+        starts.extend(self.graph_offsets)
+
+        return min(filter(lambda x: x > offset, starts), default=self.data_size) - offset
+
+    def __append(self, data: Union[bytes, BrGMTGraph], alignment=0x20) -> int:
+        """Appends data or a graph to the end of the file, and returns its offset."""
+        if isinstance(data, BrGMTGraph):
+            with BinaryReader(endianness=self.endianness) as br:
+                br.write_struct(data, self.endianness)
+                data = br.buffer()
+
+        offset = aligned_size(self.data_size, alignment)
+        self.buffer.extend(bytes(offset - self.data_size))
+        self.buffer.extend(data)
+        self.data_size = len(self.buffer)
+
+        return offset
+
+    def __update_animation(self, anm_index: int, br_curve: BrGMTCurve, data_offset: int, data_size: int):
+        """Updates the frame range, graph range and animation data range of an animation after one of its curves changed.
+        The ranges are extended to cover the new data, as sections appended to the file are not next to the old ones.
+        """
+        br_anm: BrGMTAnimation = self.br_gmt.animations[anm_index]
+        curves = self.br_gmt.curves[self.__get_curves_start(anm_index): self.__get_curves_start(anm_index) + br_anm.curves_count]
+
+        frames = list(filter(len, map(lambda x: x.graph.values, curves)))
+        br_anm.start_frame = min(map(lambda x: x[0], frames), default=0)
+        br_anm.end_frame = max(map(lambda x: x[-1], frames), default=0)
+
+        if not br_anm.graphs_index <= br_curve.graph_index < br_anm.graphs_index + br_anm.graphs_count:
+            br_anm.graphs_count = br_curve.graph_index + 1 - br_anm.graphs_index
+
+            graph_data_end = self.graph_offsets[br_curve.graph_index] + br_curve.graph.size()
+            br_anm.graph_data_size = max(br_anm.graph_data_size, graph_data_end - br_anm.graph_data_offset)
+
+        data_end = data_offset + data_size
+        br_anm.animation_data_size = max(br_anm.animation_data_size, data_end - br_anm.animation_data_offset)
+
+        fmt = '>I' if self.endianness else '<I'
+        offset = self.br_gmt.header.animations_offset + anm_index * GMT_ANIMATION_SIZE
+        struct.pack_into(fmt, self.buffer, offset + ANIMATION_START_FRAME, br_anm.start_frame)
+        struct.pack_into(fmt, self.buffer, offset + ANIMATION_END_FRAME, br_anm.end_frame)
+        struct.pack_into(fmt, self.buffer, offset + ANIMATION_GRAPHS_COUNT, br_anm.graphs_count)
+        struct.pack_into(fmt, self.buffer, offset + ANIMATION_DATA_SIZE, br_anm.animation_data_size)
+        struct.pack_into(fmt, self.buffer, offset + ANIMATION_GRAPH_DATA_SIZE, br_anm.graph_data_size)
+
+    def __get_curves_start(self, anm_index: int) -> int:
+        br_anm: BrGMTAnimation = self.br_gmt.animations[anm_index]
+        return self.br_gmt.curve_groups[br_anm.curve_groups_index].index if br_anm.curve_groups_count else 0
+
+    def __read_uint32(self, offset: int) -> int:
+        return struct.unpack_from('>I' if self.endianness else '<I', self.buffer, offset)[0]
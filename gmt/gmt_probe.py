@@ -0,0 +1,180 @@
+from io import BytesIO
+from typing import BinaryIO, List, Union
+
+from .structure.br.br_cmt import *
+from .structure.br.br_gmt import *
+from .structure.br.br_ifa import *
+from .structure.enums.cmt_enum import *
+from .structure.enums.gmt_enum import *
+from .util import *
+
+GMT_HEADER_SIZE = 0x80
+GMT_ANIMATION_SIZE = 0x40
+RGG_STRING_SIZE = 0x20
+GMT_GROUP_SIZE = 0x4
+
+CMT_HEADER_SIZE = 0x20
+CMT_ANIMATION_SIZE = 0x10
+
+IFA_HEADER_SIZE = 0x20
+IFA_BONE_SIZE = 0x70
+
+
+class GMTAnimationInfo:
+    name: str
+    frame_rate: float
+    start_frame: int
+    end_frame: int
+    bone_names: List[str]
+
+    def __init__(self, name, frame_rate, start_frame, end_frame, bone_names):
+        self.name = name
+        self.frame_rate = frame_rate
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.bone_names = bone_names
+
+    def __repr__(self) -> str:
+        return f'name: {self.name}, frame_rate: {self.frame_rate}, frames: {self.start_frame}-{self.end_frame}, len(bone_names): {len(self.bone_names)}'
+
+
+class GMTInfo:
+    name: str
+    version: GMTVersion
+    is_face_gmt: bool
+    animations: List[GMTAnimationInfo]
+
+    def __init__(self, name, version, is_face_gmt, animations):
+        self.name = name
+        self.version = version
+        self.is_face_gmt = is_face_gmt
+        self.animations = animations
+
+    def __repr__(self) -> str:
+        return f'name: "{self.name}", version: {GMTVersion(self.version).name}, animations: {self.animations}'
+
+
+class CMTAnimationInfo:
+    frame_rate: float
+    frame_count: int
+    format: CMTFormat
+
+    def __init__(self, frame_rate, frame_count, format):
+        self.frame_rate = frame_rate
+        self.frame_count = frame_count
+        self.format = format
+
+    def __repr__(self) -> str:
+        return f'frame_rate: {self.frame_rate}, frame_count: {self.frame_count}, format: {self.format!r}'
+
+
+class CMTInfo:
+    version: CMTVersion
+    animations: List[CMTAnimationInfo]
+
+    def __init__(self, version, animations):
+        self.version = version
+        self.animations = animations
+
+    def __repr__(self) -> str:
+        return f'version: {CMTVersion(self.version).name}, animations: {self.animations}'
+
+
+class IFAInfo:
+    bone_names: List[str]
+    parent_names: List[str]
+
+    def __init__(self, bone_names, parent_names):
+        self.bone_names = bone_names
+        self.parent_names = parent_names
+
+    def __repr__(self) -> str:
+        return f'len(bone_names): {len(self.bone_names)}'
+
+
+def probe_gmt(file: Union[str, bytearray]) -> GMTInfo:
+    """Reads only the header and tables of a GMT file, without parsing any curves or animation data.
+    :param file: Path to file as a string, or bytes-like object containing the file
+    :return: A GMTInfo object with the name, version and the animations of the file
+    """
+
+    with __open(file) as f:
+        header: BrGMTHeader = __read_at(f, 0, GMT_HEADER_SIZE, Endian.BIG).read_struct(BrGMTHeader)
+        endianness = header.endianness
+
+        br = __read_at(f, header.animations_offset, GMT_ANIMATION_SIZE * header.animations_count, endianness)
+        animations = br.read_struct(BrGMTAnimation, header.animations_count)
+
+        br = __read_at(f, header.strings_offset, RGG_STRING_SIZE * header.strings_count, endianness)
+        strings = br.read_struct(BrRGGString, header.strings_count)
+
+        br = __read_at(f, header.bone_groups_offset, GMT_GROUP_SIZE * header.bone_groups_count, endianness)
+        bone_groups = br.read_struct(BrGMTGroup, header.bone_groups_count, None)
+
+    anm_infos = list()
+    for anm in animations:
+        anm: BrGMTAnimation
+        bone_group: BrGMTGroup = bone_groups[anm.bone_group_index]
+        bone_names = list(map(lambda x: x.data, strings[bone_group.index: bone_group.index + bone_group.count]))
+
+        anm_infos.append(GMTAnimationInfo(strings[anm.name_index].data, anm.frame_rate,
+                                          anm.start_frame, anm.end_frame, bone_names))
+
+    return GMTInfo(header.file_name.data, header.version, header.flags[0:2] == (0x7, 0x21), anm_infos)
+
+
+def probe_cmt(file: Union[str, bytearray]) -> CMTInfo:
+    """Reads only the header and the animation table of a CMT file, without parsing any frames.
+    :param file: Path to file as a string, or bytes-like object containing the file
+    :return: A CMTInfo object with the version and the animations of the file
+    """
+
+    with __open(file) as f:
+        header: BrCMTHeader = __read_at(f, 0, CMT_HEADER_SIZE, Endian.BIG).read_struct(BrCMTHeader)
+        br = __read_at(f, CMT_HEADER_SIZE, CMT_ANIMATION_SIZE * header.animations_count, header.endianness)
+
+    anm_infos = list()
+    for _ in range(header.animations_count):
+        frame_rate = br.read_float()
+        frame_count = br.read_uint32()
+        br.read_uint32()  # animation_data_offset
+        anm_infos.append(CMTAnimationInfo(frame_rate, frame_count, CMTFormat(br.read_uint32())))
+
+    return CMTInfo(header.version, anm_infos)
+
+
+def probe_ifa(file: Union[str, bytearray]) -> IFAInfo:
+    """Reads only the header and the bone names of an IFA file.
+    :param file: Path to file as a string, or bytes-like object containing the file
+    :return: An IFAInfo object with the bone and parent names of the file
+    """
+
+    with __open(file) as f:
+        header: BrIFAHeader = __read_at(f, 0, IFA_HEADER_SIZE, Endian.BIG).read_struct(BrIFAHeader)
+        br = __read_at(f, IFA_HEADER_SIZE, IFA_BONE_SIZE * header.bone_count, header.endianness)
+
+    bone_names, parent_names = list(), list()
+    for _ in range(header.bone_count):
+        bone_names.append(br.read_struct(BrRGGString).data)
+        parent_names.append(br.read_struct(BrRGGString).data)
+        br.seek(IFA_BONE_SIZE - (RGG_STRING_SIZE * 2), Whence.CUR)
+
+    return IFAInfo(bone_names, parent_names)
+
+
+def __open(file: Union[str, bytearray]) -> BinaryIO:
+    if isinstance(file, str):
+        # Most probes only need a few small reads, so avoid a large read-ahead buffer
+        return open(file, 'rb', buffering=0)
+
+    return BytesIO(file)
+
+
+def __read_at(f: BinaryIO, offset: int, size: int, endianness: Endian) -> BinaryReader:
+    f.seek(offset)
+    data = f.read(size)
+
+    if len(data) != size:
+        raise Exception(f'Unexpected end of file: Expected {size} bytes at {hex(offset)}, got {len(data)}')
+
+    return BinaryReader(data, endianness)
@@ -1,50 +1,110 @@
-from typing import Union
+"""Functions for reading GMT, CMT and IFA files.
+
+All state of a read is local to the call, apart from the names decoded through the shared RGG_STRINGS table, which is
+thread-safe. The read functions can be called from several threads at once (e.g. from a ThreadPoolExecutor), so that
+batch loads overlap their file I/O. Curves of lazily read GMTs can also be decoded from any thread.
+"""
+
+from itertools import repeat
+from mmap import ACCESS_READ, mmap
+from typing import Any, Callable, Iterable, Union
 
 from .structure.br.br_cmt import *
 from .structure.br.br_gmt import *
 from .structure.br.br_ifa import *
 from .structure.cmt import *
+from .structure.cmt_codec import CMTFrameArrays
 from .structure.gmt import *
 from .structure.ifa import *
 from .util import *
+from .util.vector_math import vector_type
 
 
-def read_gmt(file: Union[str, bytearray]) -> GMT:
+def read_gmt(file: Union[str, bytearray], use_mmap=False, copy_values=True, lazy=False, animations: Iterable[Union[int, str]] = None,
+             bones: Iterable[str] = None, curve_types: Iterable[GMTCurveType] = None) -> GMT:
     """Reads a GMT file and returns a GMT object.
     :param file: Path to file as a string, or bytes-like object containing the file
+    :param use_mmap: If True and file is a path, the file is memory-mapped and parsed in place instead of being read into memory
+    :param copy_values: If False and use_mmap is True, curve values that do not need conversion are kept as read-only views
+    into the mapped file. The file then stays mapped until the GMT is closed, preferably by using it as a context manager
+    :param lazy: If True, only the header and tables are parsed, and the values of each curve are decoded the first time
+    they are accessed. Use GMT.materialize() to decode everything at once
+    :param animations: If given, only the animations with these indices or names are read
+    :param bones: If given, only the bones with these names are read
+    :param curve_types: If given, only the curves of these types are read
+    The animation data of the curves that are not selected is skipped without being decoded
     :return: The GMT object
     """
 
-    if isinstance(file, str):
+    mapped_file = None
+    if isinstance(file, str) and use_mmap:
+        mapped_file = buffer = __map_file(file)
+    elif isinstance(file, str):
         with open(file, 'rb') as f:
-            file_bytes = f.read()
+            buffer = f.read()
     else:
-        file_bytes = file
+        # Lazy curves read from the buffer later, so it should not be modified by the caller in the meantime
+        buffer = bytes(file) if lazy and not isinstance(file, bytes) else file
+
+    keep_views = mapped_file is not None and not copy_values
 
-    with BinaryReader(file_bytes) as br:
-        br_gmt: BrGMT = br.read_struct(BrGMT)
+    with MappedBinaryReader(buffer, keep_views=keep_views) as br:
+        br_gmt: BrGMT = br.read_struct(BrGMT, None, lazy, animations, bones, curve_types)
 
     gmt = GMT(br_gmt.header.file_name.data, br_gmt.header.version)
+
+    if mapped_file is not None:
+        if keep_views or lazy:
+            gmt.mapped_file = mapped_file
+        else:
+            mapped_file.close()
+
     gmt.is_face_gmt = br_gmt.header.flags[0:2] == (0x7, 0x21)
 
     # Get bone names from groups
     bone_names: List[List[str]] = list(
         map(lambda x: br_gmt.strings[x.index: x.index + x.count], br_gmt.bone_groups))
 
-    for br_anm in br_gmt.animations:
+    # Frame arrays are shared between all curves using the same graph
+    graph_frames: Dict[int, 'np.ndarray'] = dict()
+
+    bones = None if bones is None else set(bones)
+    curve_types = None if curve_types is None else set(curve_types)
+
+    for br_anm in map(lambda x: br_gmt.animations[x], br_gmt.selected_animations):
         br_anm: BrGMTAnimation
 
         anm = GMTAnimation(br_gmt.strings[br_anm.name_index].data, br_anm.frame_rate, br_anm.end_frame)
         anm_bone_names = bone_names[br_anm.bone_group_index]  # Get bone names for this animation
 
         for i, br_group in enumerate(br_gmt.curve_groups[br_anm.curve_groups_index: br_anm.curve_groups_index + br_anm.curve_groups_count]):
+            if bones is not None and anm_bone_names[i].data not in bones:
+                continue
+
             bone = GMTBone(anm_bone_names[i].data)
             curves = list()
 
             for br_curve in br_gmt.curves[br_group.index: br_group.index + br_group.count]:
                 br_curve: BrGMTCurve
+                if curve_types is not None and br_curve.type not in curve_types:
+                    continue
+
                 curve = GMTCurve(br_curve.type, br_curve.channel)
-                curve.keyframes = list(map(lambda k, v: GMTKeyframe(k, v), br_curve.graph.values, br_curve.values))
+
+                if HAS_NUMPY:
+                    frames = graph_frames.get(br_curve.graph_index)
+                    if frames is None:
+                        frames = graph_frames[br_curve.graph_index] = np.array(br_curve.graph.values, dtype=np.uint16)
+                        frames.flags.writeable = False
+                else:
+                    frames = br_curve.graph.values
+
+                if lazy:
+                    curve.set_lazy(frames, __lazy_values(br_curve, buffer, keep_views))
+                elif HAS_NUMPY:
+                    curve.set_arrays(frames, br_curve.values)
+                else:
+                    curve.keyframes = list(map(lambda k, v: GMTKeyframe(k, v), frames, br_curve.values))
 
                 curves.append(curve)
 
@@ -56,20 +116,25 @@ def read_gmt(file: Union[str, bytearray]) -> GMT:
     return gmt
 
 
-def read_cmt(file: Union[str, bytearray]) -> CMT:
+def read_cmt(file: Union[str, bytearray], use_mmap=False) -> CMT:
     """Reads a CMT file and returns a CMT object.
     :param file: Path to file as a string, or bytes-like object containing the file
+    :param use_mmap: If True and file is a path, the file is memory-mapped and parsed in place instead of being read into memory
     :return: The CMT object
     """
 
-    if isinstance(file, str):
-        with open(file, 'rb') as f:
-            file_bytes = f.read()
+    if isinstance(file, str) and use_mmap:
+        with __map_file(file) as mapped_file, MappedBinaryReader(mapped_file) as br:
+            br_cmt: BrCMT = br.read_struct(BrCMT)
     else:
-        file_bytes = file
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                file_bytes = f.read()
+        else:
+            file_bytes = file
 
-    with BinaryReader(file_bytes) as br:
-        br_cmt: BrCMT = br.read_struct(BrCMT)
+        with BinaryReader(file_bytes) as br:
+            br_cmt: BrCMT = br.read_struct(BrCMT)
 
     cmt = CMT(br_cmt.header.version)
 
@@ -77,24 +142,26 @@ def read_cmt(file: Union[str, bytearray]) -> CMT:
         br_anm: BrCMTAnimation
 
         anm = CMTAnimation(br_anm.frame_rate)
-        anm.frames = list(map(lambda x: CMTFrame(Vector(x.location), x.fov), br_anm.frames))
-
-        if br_anm.frame_count:
-            if isinstance(br_anm.frames[0], BrCMTFrameRotFloat):
-                list(map(lambda x, y: x.from_dist_rotation(1.0, Quaternion(
-                    (y.rotation[3],) + y.rotation[:3])), anm.frames, br_anm.frames))
-            elif isinstance(br_anm.frames[0], BrCMTFrameDistRotShort):
-                list(map(lambda x, y: x.from_dist_rotation(y.distance, Quaternion(
-                    (y.rotation[3],) + y.rotation[:3])), anm.frames, br_anm.frames))
-            elif isinstance(br_anm.frames[0], BrCMTFrameDistRotXYZ):
-                list(map(lambda x, y: x.from_dist_rotation(y.distance, Quaternion(
-                    (y.rotation[3],) + y.rotation[:3])), anm.frames, br_anm.frames))
-            elif isinstance(br_anm.frames[0], BrCMTFrameFocRoll):
-                for frame, br_frame in zip(anm.frames, br_anm.frames):
-                    frame.focus_point = Vector(br_frame.focus_point)
-                    frame.roll = br_frame.roll
-
-        if CMTFormat.CLIP_RANGE in br_anm.format:
+
+        if HAS_NUMPY and br_anm.frame_count:
+            # Convert all frames at once, and create the frame objects at the end
+            anm.frames = __cmt_frame_arrays(br_anm).to_frames()
+            cmt.animation_list.append(anm)
+            continue
+
+        vector = vector_type()
+        anm.frames = list(map(lambda x, y: CMTFrame(vector(x), y), br_anm.locations, br_anm.fovs))
+
+        if br_anm.focus_points is not None:
+            for frame, focus_point, roll in zip(anm.frames, br_anm.focus_points, br_anm.rolls):
+                frame.focus_point = vector(focus_point)
+                frame.roll = roll
+        else:
+            # ROT_FLOAT frames do not have a distance
+            distances = br_anm.distances if br_anm.distances is not None else repeat(1.0)
+            list(map(lambda x, d, r: x.from_dist_rotation(d, (r[3],) + r[:3]), anm.frames, distances, br_anm.rotations))
+
+        if br_anm.clip_ranges is not None:
             for frame, clip_range in zip(anm.frames, br_anm.clip_ranges):
                 frame.clip_range = clip_range
 
@@ -103,19 +170,44 @@ def read_cmt(file: Union[str, bytearray]) -> CMT:
     return cmt
 
 
-def read_ifa(file: Union[str, bytearray]) -> IFA:
+def read_ifa(file: Union[str, bytearray], use_mmap=False) -> IFA:
     """Reads an IFA file and returns an IFA object.
     :param file: Path to file as a string, or bytes-like object containing the file
+    :param use_mmap: If True and file is a path, the file is memory-mapped and parsed in place instead of being read into memory
     :return: The IFA object
     """
 
-    if isinstance(file, str):
-        with open(file, 'rb') as f:
-            file_bytes = f.read()
+    if isinstance(file, str) and use_mmap:
+        with __map_file(file) as mapped_file, MappedBinaryReader(mapped_file) as br:
+            br_ifa: BrIFA = br.read_struct(BrIFA)
     else:
-        file_bytes = file
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                file_bytes = f.read()
+        else:
+            file_bytes = file
 
-    with BinaryReader(file_bytes) as br:
-        br_ifa: BrIFA = br.read_struct(BrIFA)
+        with BinaryReader(file_bytes) as br:
+            br_ifa: BrIFA = br.read_struct(BrIFA)
 
     return IFA(list(map(lambda x: IFABone(x.name.data, x.parent_name.data, x.location, x.rotation), br_ifa.bones)))
+
+
+def __map_file(path: str) -> mmap:
+    with open(path, 'rb') as f:
+        return mmap(f.fileno(), 0, access=ACCESS_READ)
+
+
+def __cmt_frame_arrays(br_anm: BrCMTAnimation) -> CMTFrameArrays:
+    if br_anm.focus_points is not None:
+        return CMTFrameArrays(br_anm.locations, br_anm.fovs, br_anm.focus_points, br_anm.rolls, br_anm.clip_ranges)
+
+    # ROT_FLOAT frames do not have a distance
+    distances = br_anm.distances if br_anm.distances is not None else np.ones(br_anm.frame_count)
+
+    return CMTFrameArrays.from_dist_rotations(br_anm.locations, br_anm.fovs, distances, br_anm.rotations, br_anm.clip_ranges)
+
+
+def __lazy_values(br_curve: BrGMTCurve, buffer, keep_views: bool) -> Callable[[], Any]:
+    # Each load uses its own reader, so curves can be decoded independently of each other
+    return lambda: br_curve.read_values(MappedBinaryReader(buffer, br_curve.endianness, keep_views=keep_views))
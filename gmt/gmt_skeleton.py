@@ -0,0 +1,176 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .structure.enums.gmt_enum import *
+from .structure.gmt import *
+from .structure.ifa import *
+from .util import *
+from .util.quaternion import quat_multiply, quat_rotate, quat_to_matrix
+
+
+class GMTSkeleton:
+    """Bone hierarchy used to compute world space transforms of GMT animations.
+    Bones are sorted so that parents always come before their children, and are grouped into levels by their depth in
+    the hierarchy. Each level is computed for all frames at once, so the number of steps only depends on the depth.
+    Requires NumPy.
+    """
+
+    names: List[str]
+
+    # Index of the parent of each bone, or -1 for root bones
+    parents: 'np.ndarray'
+
+    # Rest transforms, used by bones that do not have a curve in the animation
+    locations: 'np.ndarray'
+    rotations: 'np.ndarray'
+
+    # Indices of the bones at each depth, starting with the root bones
+    levels: List['np.ndarray']
+
+    def __init__(self, names: Sequence[str], parent_names: Sequence[Optional[str]], locations: Sequence[Tuple[float]] = None,
+                 rotations: Sequence[Tuple[float]] = None):
+        """Creates a skeleton from a flat list of bones, in any order.
+        :param names: Names of the bones
+        :param parent_names: Name of the parent of each bone. Bones with an empty or unknown parent are root bones
+        :param locations: Local rest location of each bone. Defaults to (0, 0, 0)
+        :param rotations: Local rest rotation of each bone. Defaults to (0, 0, 0, 1)
+        """
+        count = len(names)
+        indices = dict(map(reversed, enumerate(names)))
+
+        if len(indices) != count:
+            raise Exception('Bone names in a skeleton must be unique')
+
+        parents = list(map(lambda x: indices.get(x, -1) if x else -1, parent_names))
+        depths = self.__get_depths(parents)
+
+        # Stable sort by depth, so that parents come first and siblings keep their order
+        order = sorted(range(count), key=lambda x: depths[x])
+        new_index = dict(map(reversed, enumerate(order)))
+
+        self.names = list(map(lambda x: names[x], order))
+        self.parents = np.array(list(map(lambda x: new_index.get(parents[x], -1), order)), dtype=np.int64)
+
+        self.locations = np.zeros((count, 3)) if locations is None else np.array(locations, dtype=np.float64).reshape(count, 3)[order]
+        self.rotations = np.tile((0.0, 0.0, 0.0, 1.0), (count, 1)) if rotations is None else \
+            np.array(rotations, dtype=np.float64).reshape(count, 4)[order]
+
+        sorted_depths = np.array(list(map(lambda x: depths[x], order)), dtype=np.int64)
+        self.levels = list(map(lambda x: np.flatnonzero(sorted_depths == x), range(max(depths, default=-1) + 1)))
+
+        self.__indices = dict(map(reversed, enumerate(self.names)))
+
+    @classmethod
+    def from_ifa(cls, ifa: IFA) -> 'GMTSkeleton':
+        """Creates a skeleton with the hierarchy and rest pose of an IFA."""
+        bones = ifa.bone_list
+        return cls(list(map(lambda x: x.name, bones)), list(map(lambda x: x.parent_name, bones)),
+                   list(map(lambda x: x.location[:3], bones)), list(map(lambda x: x.rotation[:4], bones)))
+
+    @classmethod
+    def from_animation(cls, anm: GMTAnimation, parents: Dict[str, str] = None) -> 'GMTSkeleton':
+        """Creates a default skeleton with the bones of an animation, for when there is no IFA.
+        :param anm: The animation
+        :param parents: Parent name of each bone. Bones that are not in the dict are root bones
+        :return: The skeleton, with an identity rest pose
+        """
+        parents = parents or dict()
+        names = list(anm.bones)
+        return cls(names, list(map(parents.get, names)))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def index(self, name: str) -> int:
+        """Returns the index of a bone in the arrays returned by compute."""
+        return self.__indices[name]
+
+    def compute(self, anm: GMTAnimation, frames: Union[range, Sequence[float], 'np.ndarray'] = None,
+                method: str = None) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Computes the world space transforms of every bone of the skeleton for each frame of an animation.
+        The values of the location and rotation curves replace the rest location and rotation of their bones.
+        Bones of the animation that are not in the skeleton are ignored.
+        :param anm: The animation
+        :param frames: Frames to compute, which can be fractional. Defaults to every frame of the animation
+        :param method: Interpolation method, see GMTCurve.sample
+        :return: World locations with shape (F, N, 3) and world rotations with shape (F, N, 4), with bones in the
+        order of names
+        """
+        if frames is None:
+            start_frame, end_frame = anm.get_frame_range()
+            frames = range(start_frame, end_frame + 1)
+
+        frames = np.asarray(frames, dtype=np.float64)
+
+        local_locations = self.__sample(anm, frames, GMTCurveType.LOCATION, self.locations, method)
+        local_rotations = self.__sample(anm, frames, GMTCurveType.ROTATION, self.rotations, method)
+
+        return self.compute_local(local_locations, local_rotations)
+
+    def compute_local(self, local_locations: 'np.ndarray', local_rotations: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+        """Computes world space transforms from local transforms with shapes (F, N, 3) and (F, N, 4)."""
+        world_locations = np.empty_like(local_locations)
+        world_rotations = np.empty_like(local_rotations)
+
+        for depth, level in enumerate(self.levels):
+            if depth == 0:
+                world_locations[:, level] = local_locations[:, level]
+                world_rotations[:, level] = local_rotations[:, level]
+                continue
+
+            parents = self.parents[level]
+            parent_rotations = world_rotations[:, parents]
+
+            world_rotations[:, level] = quat_multiply(parent_rotations, local_rotations[:, level])
+            world_locations[:, level] = world_locations[:, parents] + quat_rotate(parent_rotations, local_locations[:, level])
+
+        return (world_locations, world_rotations)
+
+    @staticmethod
+    def to_matrices(locations: 'np.ndarray', rotations: 'np.ndarray') -> 'np.ndarray':
+        """Converts arrays of locations and rotations with shapes (..., 3) and (..., 4) to 4x4 transform matrices."""
+        matrices = np.zeros(locations.shape[:-1] + (4, 4))
+        matrices[..., :3, :3] = quat_to_matrix(rotations)
+        matrices[..., :3, 3] = locations
+        matrices[..., 3, 3] = 1.0
+
+        return matrices
+
+    def __sample(self, anm: GMTAnimation, frames: 'np.ndarray', curve_type: GMTCurveType, rest: 'np.ndarray',
+                 method: Optional[str]) -> 'np.ndarray':
+        """Samples the curves of one type for all bones, using the rest values for bones without a curve."""
+        values = np.repeat(rest[np.newaxis], len(frames), axis=0)
+
+        animated = list()
+        for i, name in enumerate(self.names):
+            bone = anm.bones.get(name)
+            curve = None if bone is None else bone.location if curve_type == GMTCurveType.LOCATION else bone.rotation
+
+            if curve is not None and curve.keyframe_count():
+                animated.append(i)
+
+        if animated:
+            values[:, animated] = anm.sample(frames, curve_type, list(map(lambda x: self.names[x], animated)), method)
+
+        return values
+
+    @staticmethod
+    def __get_depths(parents: List[int]) -> List[int]:
+        depths = [-1] * len(parents)
+
+        for i in range(len(parents)):
+            # Walk up until a bone with a known depth, then fill in the depths on the way back
+            chain = list()
+            bone = i
+            while bone != -1 and depths[bone] == -1:
+                if bone in chain:
+                    raise Exception(f'Bone hierarchy has a cycle at bone index {bone}')
+
+                chain.append(bone)
+                bone = parents[bone]
+
+            depth = -1 if bone == -1 else depths[bone]
+            for bone in reversed(chain):
+                depth += 1
+                depths[bone] = depth
+
+        return depths
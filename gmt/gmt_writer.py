@@ -1,3 +1,6 @@
+import logging
+from typing import Any, Callable, Optional
+
 from .structure.br.br_cmt import *
 from .structure.br.br_gmt import *
 from .structure.br.br_ifa import *
@@ -6,26 +9,68 @@ from .structure.gmt import *
 from .structure.ifa import *
 from .util import *
 
+logger = logging.getLogger(__name__)
+
 
-def write_gmt(gmt: GMT) -> bytearray:
+def write_gmt(gmt: GMT, compress_rotations=False, quantization_errors: Dict[Tuple[str, str, int], float] = None,
+              progress: Callable[[GMTWriteProgress], Any] = None, share_graphs=False, graph_stats: Dict[str, int] = None) -> bytearray:
     """Writes a GMT object to a buffer and returns the buffer as a bytearray
     :param gmt: The GMT object
+    :param compress_rotations: If True, full rotation curves are quantized to ROT_QUAT_XYZ_INT. Only applies to Dragon
+    Engine files (see GMT.vector_version), and requires NumPy
+    :param quantization_errors: Optional dict that will be filled with the max angular error in radians of each
+    quantized rotation curve, keyed by (animation name, bone name, index of the curve in the bone's curves)
+    :param progress: Optional callback that receives a GMTWriteProgress after each bone and each animation is written.
+    The same events are also logged to this module's logger at DEBUG level
+    :param share_graphs: If True, curves with the same frames share a single graph across all animations, instead of
+    only within each animation. This makes files with many similar animations smaller
+    :param graph_stats: Optional dict that will be filled with graph sharing statistics: the number of 'curves' and
+    'graphs', how many 'shared_curves' reuse an existing graph, and the 'saved_bytes' of graph data
     :return: Bytearray containing the written GMT file
     """
 
-    with BinaryReader() as br:
-        br.write_struct(BrGMT(), gmt)
-        return br.buffer()
+    br_gmt = BrGMT()
+    buffer = bytearray(br_gmt.prepare(gmt, compress_rotations, share_graphs))
+
+    if graph_stats is not None:
+        graph_stats.update(br_gmt.graph_table.stats())
+
+    # The size is known in advance, so each section is copied directly into its place in the buffer
+    view = memoryview(buffer)
+    pos = 0
+
+    def write(data: bytes):
+        nonlocal pos
+        view[pos: pos + len(data)] = data
+        pos += len(data)
+
+    br_gmt.stream(write, quantization_errors, __progress_hook(progress))
+    view.release()
 
+    return buffer
 
-def write_gmt_to_file(gmt: GMT, path: str) -> None:
+
+def write_gmt_to_file(gmt: GMT, path: str, compress_rotations=False, quantization_errors: Dict[Tuple[str, str, int], float] = None,
+                      progress: Callable[[GMTWriteProgress], Any] = None, share_graphs=False, graph_stats: Dict[str, int] = None) -> None:
     """Writes a GMT object to a file
     :param gmt: The GMT object
     :param path: Path to target file as a string
+    :param compress_rotations: See write_gmt
+    :param quantization_errors: See write_gmt
+    :param progress: See write_gmt
+    :param share_graphs: See write_gmt
+    :param graph_stats: See write_gmt
     """
 
+    br_gmt = BrGMT()
+    br_gmt.prepare(gmt, compress_rotations, share_graphs)
+
+    if graph_stats is not None:
+        graph_stats.update(br_gmt.graph_table.stats())
+
+    # Sections are written to the file as soon as they are encoded, without building the whole file in memory
     with open(path, 'wb') as f:
-        f.write(write_gmt(gmt))
+        br_gmt.stream(f.write, quantization_errors, __progress_hook(progress))
 
 
 def write_cmt(cmt: CMT) -> bytearray:
@@ -68,3 +113,16 @@ def write_ifa_to_file(ifa: IFA, path: str) -> None:
 
     with open(path, 'wb') as f:
         f.write(write_ifa(ifa))
+
+
+def __progress_hook(progress: Callable[[GMTWriteProgress], Any]) -> Optional[Callable[[GMTWriteProgress], Any]]:
+    # Events are only created when someone is listening, so the write path stays free of any output by default
+    if not logger.isEnabledFor(logging.DEBUG):
+        return progress
+
+    def hook(event: GMTWriteProgress):
+        logger.debug('Writing %r', event)
+        if progress is not None:
+            progress(event)
+
+    return hook
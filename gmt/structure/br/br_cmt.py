@@ -1,5 +1,10 @@
+import struct
+from math import sqrt
+from typing import Dict, List, Optional, Tuple
+
 from ...util import *
 from ..cmt import CMT, CMTAnimation, CMTFrame
+from ..cmt_codec import CMTFrameArrays
 from ..enums.cmt_enum import *
 from .br_gmt_anm_data import *
 
@@ -7,7 +12,7 @@ from .br_gmt_anm_data import *
 class BrCMT(BrStruct):
     def __br_read__(self, br: BinaryReader):
         self.header = br.read_struct(BrCMTHeader)
-        self.animations = br.read_struct(BrCMTAnimation, self.header.animations_count)
+        self.animations = br.read_struct(BrCMTAnimation, self.header.animations_count, self.header.endianness)
 
     def __br_write__(self, br: BinaryReader, cmt: CMT):
         anm_data_br = BinaryReader(endianness=Endian.BIG)
@@ -43,7 +48,7 @@ class BrCMT(BrStruct):
             br.write_float(anm.frame_rate)
             br.write_uint32(len(anm.frames))
             br.write_uint32(header_size + br_anm.anm_data_offset)
-            br.write_uint32(br_anm.anm_data_format)
+            br.write_uint32(int(br_anm.anm_data_format))
 
         br.extend(anm_data_br.buffer())
 
@@ -75,7 +80,19 @@ class BrCMTHeader(BrStruct):
 
 
 class BrCMTAnimation(BrStruct):
-    def __br_read__(self, br: BinaryReader):
+    frame_struct: type
+
+    # Frames as columns, which are arrays if NumPy is available, or lists of floats and tuples otherwise.
+    # Rotations are (x, y, z, w). Only the columns of the frame format are set, the others are None
+    locations: List[Tuple[float]]
+    fovs: List[float]
+    distances: Optional[List[float]]
+    rotations: Optional[List[Tuple[float]]]
+    focus_points: Optional[List[Tuple[float]]]
+    rolls: Optional[List[float]]
+    clip_ranges: Optional[List[Tuple[float]]]
+
+    def __br_read__(self, br: BinaryReader, endianness=Endian.BIG):
         self.frame_rate = br.read_float()
         self.frame_count = br.read_uint32()
         self.animation_data_offset = br.read_uint32()
@@ -83,21 +100,49 @@ class BrCMTAnimation(BrStruct):
 
         target_format = (self.format & 0xFFFF)
         if target_format == CMTFormat.ROT_FLOAT:
-            br_frame_struct = BrCMTFrameRotFloat
+            self.frame_struct = BrCMTFrameRotFloat
         elif target_format == CMTFormat.DIST_ROT_SHORT:
-            br_frame_struct = BrCMTFrameDistRotShort
+            self.frame_struct = BrCMTFrameDistRotShort
         elif target_format == CMTFormat.DIST_ROT_XYZ:
-            br_frame_struct = BrCMTFrameDistRotXYZ
+            self.frame_struct = BrCMTFrameDistRotXYZ
         elif target_format == CMTFormat.FOC_ROLL:
-            br_frame_struct = BrCMTFrameFocRoll
+            self.frame_struct = BrCMTFrameFocRoll
         else:
             raise Exception(f'Unexpected CMTFormat: {self.format}')
 
         with br.seek_to(self.animation_data_offset):
-            self.frames = br.read_struct(br_frame_struct, self.frame_count)
+            # The frame table has a fixed stride, so it is decoded all at once instead of frame by frame
+            columns = read_columns(br, self.frame_struct.FIELDS, self.frame_count, endianness)
 
+            self.clip_ranges = None
             if CMTFormat.CLIP_RANGE in self.format:
-                self.clip_ranges = list(map(lambda _: br.read_float(2), range(self.frame_count)))
+                self.clip_ranges = read_columns(br, CLIP_RANGE_FIELDS, self.frame_count, endianness)['clip_range']
+
+        self.locations = columns['location']
+        self.fovs = columns['fov']
+        self.distances = columns.get('distance')
+        self.rotations = columns.get('rotation')
+        self.focus_points = columns.get('focus_point')
+        self.rolls = columns.get('roll')
+
+        if self.frame_struct == BrCMTFrameDistRotShort:
+            self.rotations = self.rotations / 16_384 if HAS_NUMPY else \
+                list(map(lambda x: tuple(map(lambda v: v / 16_384, x)), self.rotations))
+        elif self.frame_struct == BrCMTFrameDistRotXYZ:
+            self.rotations = self.__complete_quat_xyz(self.rotations)
+
+    @staticmethod
+    def __complete_quat_xyz(xyz):
+        """Adds the w component to (x, y, z) quaternion columns, like read_quat_xyz_float."""
+        if HAS_NUMPY:
+            w = 1.0 - (xyz[:, 0] ** 2 + xyz[:, 1] ** 2 + xyz[:, 2] ** 2)
+            return np.column_stack((xyz, np.sqrt(np.maximum(w, 0.0))))
+
+        def complete(q):
+            w = 1.0 - sum(map(lambda a: a ** 2, q))
+            return (*q, (sqrt(w) if w > 0 else 0))
+
+        return list(map(complete, xyz))
 
     def __br_write__(self, br: 'BinaryReader', anm: CMTAnimation, version: CMTVersion):
         self.anm_data_offset = br.pos()
@@ -115,19 +160,52 @@ class BrCMTAnimation(BrStruct):
             self.anm_data_format = CMTFormat.FOC_ROLL
             br_cmt_frame_cls = BrCMTFrameFocRoll
 
-        for frame in anm.frames:
-            br.write_struct(br_cmt_frame_cls(), frame)
+        if HAS_NUMPY and len(anm.frames):
+            # Convert all frames at once instead of using the frame structs
+            arrays = CMTFrameArrays.from_animation(anm)
+            br.write_bytes(self.__encode_frames(arrays, br_cmt_frame_cls).tobytes())
+        else:
+            for frame in anm.frames:
+                br.write_struct(br_cmt_frame_cls(), frame)
 
         if anm.has_clip_range():
             self.anm_data_format |= CMTFormat.CLIP_RANGE
             list(map(lambda x: br.write_float(x.clip_range or (0.1, 10000)), anm.frames))
             br.align(0x10)
 
+    @staticmethod
+    def __encode_frames(arrays: CMTFrameArrays, br_cmt_frame_cls: type) -> 'np.ndarray':
+        """Encodes the frames to a structured array with the same layout as the frame structs.
+        CMT animation data is always written in big endian.
+        """
+        frames = np.zeros(len(arrays), dtype=fields_dtype(br_cmt_frame_cls.FIELDS, Endian.BIG))
+        frames['location'] = arrays.locations
+        frames['fov'] = arrays.fovs
+
+        if br_cmt_frame_cls == BrCMTFrameFocRoll:
+            frames['focus_point'] = arrays.focus_points
+            frames['roll'] = arrays.rolls
+            return frames
+
+        distances, rotations = arrays.to_dist_rotations()
+
+        if br_cmt_frame_cls == BrCMTFrameRotFloat:
+            frames['rotation'] = rotations
+        elif br_cmt_frame_cls == BrCMTFrameDistRotShort:
+            frames['distance'] = distances
+            # Truncate towards zero like write_quat_scaled does
+            frames['rotation'] = np.trunc(rotations * 16_384)
+        else:
+            frames['distance'] = distances
+            frames['rotation'] = rotations[:, :3]
+
+        return frames
+
 
 class BrCMTFrame(BrStruct):
-    def __br_read__(self, br: BinaryReader):
-        self.location = br.read_float(3)
-        self.fov = br.read_float()
+    # Layout of the struct as (name, type, count) fields, in NumPy type codes without the byte order.
+    # Frames are only read through these fields (see read_columns), and the structs themselves are used for writing
+    FIELDS = [('location', 'f4', 3), ('fov', 'f4', 1)]
 
     def __br_write__(self, br: 'BinaryReader', frame: CMTFrame):
         br.write_float(frame.location[:])
@@ -135,10 +213,7 @@ class BrCMTFrame(BrStruct):
 
 
 class BrCMTFrameRotFloat(BrCMTFrame):
-    def __br_read__(self, br: BinaryReader):
-        super().__br_read__(br)
-
-        self.rotation = br.read_float(4)
+    FIELDS = BrCMTFrame.FIELDS + [('rotation', 'f4', 4)]
 
     def __br_write__(self, br: 'BinaryReader', frame: CMTFrame):
         super().__br_write__(br, frame)
@@ -148,12 +223,7 @@ class BrCMTFrameRotFloat(BrCMTFrame):
 
 
 class BrCMTFrameDistRotShort(BrCMTFrame):
-    def __br_read__(self, br: BinaryReader):
-        super().__br_read__(br)
-
-        self.distance = br.read_float()
-        br.read_uint32()  # Padding
-        self.rotation = read_quat_scaled(br, 1)[0]
+    FIELDS = BrCMTFrame.FIELDS + [('distance', 'f4', 1), ('padding', 'u4', 1), ('rotation', 'i2', 4)]
 
     def __br_write__(self, br: 'BinaryReader', frame: CMTFrame):
         super().__br_write__(br, frame)
@@ -165,11 +235,7 @@ class BrCMTFrameDistRotShort(BrCMTFrame):
 
 
 class BrCMTFrameDistRotXYZ(BrCMTFrame):
-    def __br_read__(self, br: BinaryReader):
-        super().__br_read__(br)
-
-        self.distance = br.read_float()
-        self.rotation = read_quat_xyz_float(br, 1)[0]
+    FIELDS = BrCMTFrame.FIELDS + [('distance', 'f4', 1), ('rotation', 'f4', 3)]
 
     def __br_write__(self, br: 'BinaryReader', frame: CMTFrame):
         super().__br_write__(br, frame)
@@ -180,14 +246,55 @@ class BrCMTFrameDistRotXYZ(BrCMTFrame):
 
 
 class BrCMTFrameFocRoll(BrCMTFrame):
-    def __br_read__(self, br: BinaryReader):
-        super().__br_read__(br)
-
-        self.focus_point = br.read_float(3)
-        self.roll = br.read_float()
+    FIELDS = BrCMTFrame.FIELDS + [('focus_point', 'f4', 3), ('roll', 'f4', 1)]
 
     def __br_write__(self, br: 'BinaryReader', frame: CMTFrame):
         super().__br_write__(br, frame)
 
         br.write_float(frame.focus_point[:])
         br.write_float(frame.roll)
+
+
+# Clip range block after the frames, with the near and far clip distances of each frame
+CLIP_RANGE_FIELDS = [('clip_range', 'f4', 2)]
+
+# struct format characters of the NumPy type codes used in the fields
+__STRUCT_TYPES = {'f4': 'f', 'u4': 'I', 'i2': 'h'}
+
+
+def read_columns(br: BinaryReader, fields: List[Tuple[str, str, int]], count: int, endianness: Endian) -> Dict[str, list]:
+    """Reads count structs with the given fields in a single read, and returns the values of each field except padding.
+    With NumPy, each field is a float64 array of shape (count,) or (count, field count). Otherwise, each field is a list
+    of floats, or of tuples for fields with more than one value.
+    """
+    if HAS_NUMPY:
+        dtype = fields_dtype(fields, endianness)
+        nbytes = dtype.itemsize * count
+
+        data = br.read_view(nbytes) if isinstance(br, MappedBinaryReader) else br.read_bytes(nbytes)
+        table = np.frombuffer(data, dtype=dtype, count=count)
+
+        return {name: table[name].astype(np.float64) for name, _, _ in fields if name != 'padding'}
+
+    fmt = ('>' if endianness else '<') + ''.join(map(lambda x: f'{x[2]}{__STRUCT_TYPES[x[1]]}', fields))
+    data = br.read_bytes(struct.calcsize(fmt) * count)
+
+    # One list per value of the struct, each with the values of all structs
+    values = list(zip(*struct.iter_unpack(fmt, data))) or [()] * sum(map(lambda x: x[2], fields))
+
+    columns = dict()
+    offset = 0
+    for name, _, size in fields:
+        if name != 'padding':
+            columns[name] = list(values[offset]) if size == 1 else list(zip(*values[offset: offset + size]))
+
+        offset += size
+
+    return columns
+
+
+def fields_dtype(fields: List[Tuple[str, str, int]], endianness: Endian) -> 'np.dtype':
+    """Returns the NumPy structured dtype of the fields, in the given endianness."""
+    prefix = '>' if endianness else '<'
+    return np.dtype(list(map(lambda x: (x[0], prefix + x[1]) if x[2] == 1 else (x[0], prefix + x[1], x[2]), fields)))
+
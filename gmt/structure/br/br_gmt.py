@@ -1,12 +1,62 @@
+import struct
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
 from ...util import *
 from ..enums.gmt_enum import *
-from ..gmt import GMT, GMTCurve
+from ..gmt import GMT, GMTAnimation, GMTBone, GMTCurve
 from .br_gmt_anm_data import *
 from .br_rgg import BrRGGString
 
+# The animation data comes right after the header
+ANIMATION_DATA_START = 0x80
+
+
+def aligned_size(size: int, alignment: int) -> int:
+    """Returns the size after being padded to the given alignment, the same way BinaryReader.align() pads."""
+    return size + (-size % alignment)
+
+
+class GMTWriteProgress:
+    """Progress event passed to the progress callback of write_gmt and write_gmt_to_file.
+    A 'bone' event is sent after the animation data of each bone is written, and an 'animation' event after the last bone
+    of each animation.
+    """
+
+    kind: str
+    animation: str
+    bone: Optional[str]
+    index: int
+    count: int
+    data_size: int
+    bytes_written: int
+    total_bytes: int
+    elapsed: float
+
+    def __init__(self, kind, animation, bone, index, count, data_size, bytes_written, total_bytes, elapsed):
+        self.kind = kind
+        self.animation = animation
+        self.bone = bone
+        self.index = index
+        self.count = count
+        self.data_size = data_size
+        self.bytes_written = bytes_written
+        self.total_bytes = total_bytes
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        name = self.animation if self.bone is None else f'{self.animation}/{self.bone}'
+        return (f'{self.kind} {self.index + 1}/{self.count}: "{name}", data_size: {self.data_size}, '
+                f'written: {self.bytes_written}/{self.total_bytes}, elapsed: {self.elapsed:.3f} s')
+
 
 class BrGMT(BrStruct):
-    def __br_read__(self, br: BinaryReader):
+    def __br_read__(self, br: BinaryReader, lazy=False, animations: Iterable[Union[int, str]] = None,
+                     bones: Iterable[str] = None, curve_types: Iterable[GMTCurveType] = None):
+        """Reads the GMT tables, and the animation data of the curves that pass the filters.
+        Curves of animations that are not selected are not read at all, and curves of bones or types that are not selected
+        are read without their animation data, which is skipped.
+        """
         self.header: BrGMTHeader = br.read_struct(BrGMTHeader)
         header: BrGMTHeader = self.header
 
@@ -28,14 +78,64 @@ class BrGMT(BrStruct):
         br.seek(header.curve_groups_offset)
         self.curve_groups = br.read_struct(BrGMTGroup, header.curve_groups_count, header.version)
 
-        br.seek(header.curves_offset)
-        self.curves = br.read_struct(BrGMTCurve, header.curves_count, self.graphs, header.version)
+        self.selected_animations = self.__select_animations(animations)
+
+        if animations is None and bones is None and curve_types is None:
+            br.seek(header.curves_offset)
+            self.curves = br.read_struct(BrGMTCurve, header.curves_count, self.graphs, header.version, header.endianness, lazy)
+            return
+
+        bones = None if bones is None else set(bones)
+        curve_types = None if curve_types is None else set(curve_types)
+
+        # Only the curves of the selected animations are read, and the rest are left as None
+        self.curves = [None] * header.curves_count
+        for anm_index in self.selected_animations:
+            br_anm: BrGMTAnimation = self.animations[anm_index]
+            bone_group: BrGMTGroup = self.bone_groups[br_anm.bone_group_index]
+
+            for i in range(br_anm.curve_groups_count):
+                curve_group: BrGMTGroup = self.curve_groups[br_anm.curve_groups_index + i]
+                skip_bone = bones is not None and self.strings[bone_group.index + i].data not in bones
+
+                br.seek(header.curves_offset + curve_group.index * 0x10)
+                for curve_index in range(curve_group.index, curve_group.index + curve_group.count):
+                    self.curves[curve_index] = br.read_struct(BrGMTCurve, None, self.graphs, header.version, header.endianness,
+                                                              lazy or skip_bone, curve_types)
+
+    def __select_animations(self, animations: Iterable[Union[int, str]]) -> List[int]:
+        """Returns the indices of the animations with the given indices or names, in file order."""
+        if animations is None:
+            return list(range(len(self.animations)))
+
+        animations = set(animations)
+        names = list(map(lambda x: self.strings[x.name_index].data, self.animations))
 
-    def __br_write__(self, br: BinaryReader, gmt: GMT):
+        return [i for i, name in enumerate(names) if i in animations or name in animations]
+
+    def __br_write__(self, br: BinaryReader, gmt: GMT, compress_rotations=False, quantization_errors: Dict[Tuple[str, str, int], float] = None,
+                     share_graphs=False):
         br.set_endian(Endian.BIG)
 
-        graphs, bone_groups, curve_groups = list(), list(), list()
-        curve_groups_index = 0
+        self.prepare(gmt, compress_rotations, share_graphs)
+        self.stream(br.extend, quantization_errors)
+
+        br.seek(0, Whence.END)
+
+    def prepare(self, gmt: GMT, compress_rotations=False, share_graphs=False) -> int:
+        """First pass of writing. Computes the layout of every section from the GMT object, without encoding any values.
+        Returns the size of the file, including the padding at the end.
+        If share_graphs is True, curves with the same frames share a single graph even across animations.
+        """
+        self.gmt = gmt
+
+        # This allows us to reuse graphs when possible
+        self.graph_table = BrGMTGraphTable(share_graphs)
+
+        # Rotations can only be compressed in Dragon Engine files, which is also detected from the bones
+        vector_version = gmt.vector_version
+
+        bone_groups, curve_groups = list(), list()
         bone_strings = list()
 
         # The file is being written backwards
@@ -43,12 +143,12 @@ class BrGMT(BrStruct):
         # Then comes the curve groups, the bone groups, and the strings
         # And then the graphs, the graph offsets, and finally, the animation structs
 
-        # Header size
-        anm_data_start = 0x80
-
         # Curves and animation data
-        curve_br, anm_data_br = BinaryReader(endianness=Endian.BIG), BinaryReader(endianness=Endian.BIG)
-        anm_data_size_offset, graphs_index_count = list(), list()
+        self.curves: List[Tuple[GMTAnimation, GMTBone, BrGMTCurve]] = list()
+        self.bone_curves: List[Tuple[GMTAnimation, GMTBone, List[BrGMTCurve]]] = list()
+        self.anm_data_size_offset, self.graphs_index_count, self.curves_counts = list(), list(), list()
+        anm_graph_ranges = list()
+        anm_data_size = 0
         curves_index = 0
         for anm in gmt.animation_list:
             # Add the bone group (index, count)
@@ -57,187 +157,261 @@ class BrGMT(BrStruct):
             # Add the bone names
             bone_strings.extend(list(anm.bones.keys()))
 
-            anm_data_offset = anm_data_br.pos()
-            graphs_index = len(graphs)
+            anm_data_offset = anm_data_size
+            anm_curves_index = curves_index
 
-            # This allows us to reuse graphs when possible
-            graphs_dict: IterativeDict = IterativeDict()
+            self.graph_table.begin_animation()
 
             for bone in anm.bones.values():
-                print("Writing bone " + bone.name)
-                
+                curves = bone.curves_view
+
                 # Add the curve group (index, count)
-                curve_groups.append(BrGMTGroup(curves_index, len(bone.curves)))
-                curves_index += len(bone.curves)
-                for curve in bone.curves:
-                    curve_br.write_struct(BrGMTCurve(), curve, graphs_dict, anm_data_br, anm_data_start, gmt.version)
+                curve_groups.append(BrGMTGroup(curves_index, len(curves)))
+                curves_index += len(curves)
+                br_curves = list()
+                for curve in curves:
+                    br_curve = BrGMTCurve()
+                    br_curve.prepare(curve, self.graph_table, ANIMATION_DATA_START + anm_data_size, gmt.version, vector_version,
+                                     compress_rotations)
+                    anm_data_size += br_curve.data_size
+
+                    br_curves.append(br_curve)
+                    self.curves.append((anm, bone, br_curve))
+
+                self.bone_curves.append((anm, bone, br_curves))
+
+            # Graph indices are global, and each animation covers the range of graphs used by its curves
+            anm_graph_indices = list(map(lambda x: x[2].graph_index, self.curves[anm_curves_index:]))
+            if anm_graph_indices:
+                anm_graph_ranges.append((min(anm_graph_indices), max(anm_graph_indices) + 1))
+            else:
+                anm_graph_ranges.append((len(self.graph_table.graphs),) * 2)
 
-            # Since graphs are unique per animation, we reset the dictionary and add its items to the graphs list
-            graphs.extend(graphs_dict)
+            self.anm_data_size_offset.append((anm_data_size - anm_data_offset, ANIMATION_DATA_START + anm_data_offset))
+            self.graphs_index_count.append((anm_graph_ranges[-1][0], anm_graph_ranges[-1][1] - anm_graph_ranges[-1][0]))
+            self.curves_counts.append(curves_index - anm_curves_index)
 
-            anm_data_size_offset.append((anm_data_br.pos() - anm_data_offset, anm_data_start + anm_data_offset))
-            graphs_index_count.append((graphs_index, len(graphs) - graphs_index))
+        graphs = self.graph_table.graphs
 
-        # Align animation data buffer
-        anm_data_br.align(0x20)
+        # Offset of each graph in the graph data, with the end of the graph data as the last item
+        graph_data_pos = [0]
+        for graph in graphs:
+            graph_data_pos.append(graph_data_pos[-1] + graph.size())
 
-        # Curve groups
-        curve_groups_br = BinaryReader(endianness=Endian.BIG)
         for g in curve_groups:
-
             if(gmt.version > GMTVersion.ISHIN):
                 g.count = int(g.count * 1024)
 
-            curve_groups_br.write_struct(g)
+        # Add all anm and bone names to the strings list
+        strings = list(map(lambda x: BrRGGString(x.name), gmt.animation_list))
+        strings.extend(map(BrRGGString, bone_strings))
 
-        curve_groups_br.align(0x20)
+        self.graphs, self.bone_groups, self.curve_groups, self.strings = graphs, bone_groups, curve_groups, strings
 
-        # Bone groups
-        bone_groups_br = BinaryReader(endianness=Endian.BIG)
-        for g in bone_groups:
-            bone_groups_br.write_struct(g)
+        # Section sizes, aligned the same way as the sections are padded when streamed
+        self.anm_data_size = anm_data_size
+        anm_data_size = aligned_size(anm_data_size, 0x20)
+        curves_size = len(self.curves) * 0x10
+        curve_groups_size = aligned_size(len(curve_groups) * 0x4, 0x20)
+        bone_groups_size = aligned_size(len(bone_groups) * 0x4, 0x20)
+        strings_size = len(strings) * 0x20
+        graphs_data_size = aligned_size(graph_data_pos[-1], 0x20)
+        graphs_offsets_size = aligned_size(len(graphs) * 0x4, 0x20)
+        anm_size = len(gmt.animation_list) * 0x40
 
-        bone_groups_br.align(0x20)
+        # Calculate the section start offsets
+        self.curves_start = ANIMATION_DATA_START + anm_data_size
+        self.curve_groups_start = self.curves_start + curves_size
+        self.bone_groups_start = self.curve_groups_start + curve_groups_size
+        self.strings_start = self.bone_groups_start + bone_groups_size
+        self.graphs_data_start = self.strings_start + strings_size
+        self.graphs_offsets_start = self.graphs_data_start + graphs_data_size
+        self.anm_start = self.graphs_offsets_start + graphs_offsets_size
+
+        self.file_size = self.anm_start + anm_size
+
+        self.graph_offsets = list(map(lambda x: self.graphs_data_start + x, graph_data_pos[:-1]))
+        self.graph_data_size = graph_data_pos[-1]
+        self.graph_data_size_offset = list(map(lambda x: (graph_data_pos[x[1]] - graph_data_pos[x[0]],
+                                                          self.graphs_data_start + graph_data_pos[x[0]]), anm_graph_ranges))
+
+        return aligned_size(self.file_size, 0x1000)
+
+    def stream(self, write: Callable[[bytes], Any], quantization_errors: Dict[Tuple[str, str, int], float] = None,
+               progress: Callable[[GMTWriteProgress], Any] = None):
+        """Second pass of writing. Encodes each section and passes it to write in file order, right after it is encoded.
+        prepare() must be called first.
+        """
+        gmt = self.gmt
+        start_time = time.perf_counter()
+        total_bytes = aligned_size(self.file_size, 0x1000)
 
-        # Add all anm and bone names to the strings list
-        strings = list(map(lambda x: BrRGGString(x.name), gmt.animation_list))
-        strings.extend(map(BrRGGString, bone_strings))
+        # Header
+        br = BinaryReader(endianness=Endian.BIG)
+        br.write_str('GSGT')
 
-        # Strings
-        strings_br = BinaryReader(endianness=Endian.BIG)
-        for s in strings:
-            strings_br.write_struct(s)
+        # Use big endian by default (because it is guaranteed to be supported by all versions)
+        br.write_uint8(2)
+        br.write_uint8(1)
+
+        # Padding
+        br.write_uint16(0)
 
-        graph_data_start = anm_data_start + anm_data_br.size() + curve_br.size() + curve_groups_br.size() + \
-            bone_groups_br.size() + strings_br.size()
+        br.write_uint32(int(gmt.version))
 
-        # Graph data
-        graphs_offsets_br, graphs_data_br = BinaryReader(endianness=Endian.BIG), BinaryReader(endianness=Endian.BIG)
-        graph_data_size_offset = list()
+        # File size without padding
+        br.write_uint32(self.file_size)
+
+        br.write_struct(BrRGGString(gmt.name))
+
+        br.write_uint32(len(gmt.animation_list))
+        br.write_uint32(self.anm_start)
+        br.write_uint32(len(self.graphs))
+        br.write_uint32(self.graphs_offsets_start)
+        br.write_uint32(self.graphs_offsets_start - self.graphs_data_start)
+        br.write_uint32(self.graphs_data_start)
+        br.write_uint32(len(self.strings))
+        br.write_uint32(self.strings_start)
+        br.write_uint32(len(self.bone_groups))
+        br.write_uint32(self.bone_groups_start)
+        br.write_uint32(len(self.curve_groups))
+        br.write_uint32(self.curve_groups_start)
+        br.write_uint32(len(self.curves))
+        br.write_uint32(self.curves_start)
+        br.write_uint32(self.curves_start - ANIMATION_DATA_START)
+        br.write_uint32(ANIMATION_DATA_START)
+
+        # Padding
+        br.pad(0xC)
+
+        # Flags
+        if gmt.is_face_gmt:
+            br.write_uint32(0x07_21_03_01)
+        else:
+            br.write_uint32(0)
+
+        write(br.buffer())
+
+        # Animation data, encoded one curve at a time
+        pos = ANIMATION_DATA_START
+        bone_curves = iter(self.bone_curves)
+        for anm_index, anm in enumerate(gmt.animation_list):
+            anm_data_start = pos
+            for bone_index in range(len(anm.bones)):
+                _, bone, br_curves = next(bone_curves)
+                bone_data_start = pos
+
+                for curve_index, br_curve in enumerate(br_curves):
+                    br = BinaryReader(endianness=Endian.BIG)
+                    br_curve.write_values(br)
+
+                    if br.size() != br_curve.data_size:
+                        raise Exception(f'Unexpected animation data size for bone {bone.name}: '
+                                        f'Expected {br_curve.data_size}, got {br.size()}')
+
+                    if quantization_errors is not None and br_curve.quantization_error is not None:
+                        quantization_errors[(anm.name, bone.name, curve_index)] = br_curve.quantization_error
+
+                    write(br.buffer())
+                    pos += br_curve.data_size
+
+                if progress is not None:
+                    progress(GMTWriteProgress('bone', anm.name, bone.name, bone_index, len(anm.bones),
+                                              pos - bone_data_start, pos, total_bytes, time.perf_counter() - start_time))
+
+            if progress is not None:
+                progress(GMTWriteProgress('animation', anm.name, None, anm_index, len(gmt.animation_list),
+                                          pos - anm_data_start, pos, total_bytes, time.perf_counter() - start_time))
+
+        write(bytes(self.curves_start - ANIMATION_DATA_START - self.anm_data_size))
+
+        # Curves
+        br = BinaryReader(endianness=Endian.BIG)
+        for _, _, br_curve in self.curves:
+            br.write_struct(br_curve)
+
+        write(br.buffer())
+
+        # Curve groups
+        br = BinaryReader(endianness=Endian.BIG)
+        br.write_struct(self.curve_groups)
+        br.align(0x20)
+        write(br.buffer())
+
+        # Bone groups
+        br = BinaryReader(endianness=Endian.BIG)
+        br.write_struct(self.bone_groups)
+        br.align(0x20)
+        write(br.buffer())
+
+        # Strings
+        br = BinaryReader(endianness=Endian.BIG)
+        br.write_struct(self.strings)
+        write(br.buffer())
 
-        for index, count in graphs_index_count:
-            graph_data_offset = graphs_data_br.pos()
-            for i in range(index, index + count):
-                graphs_offsets_br.write_uint32(graph_data_start + graphs_data_br.size())
-                graphs_data_br.write_struct(graphs[i])
+        # Graph data
+        br = BinaryReader(endianness=Endian.BIG)
+        br.write_struct(self.graphs)
+        write(br.buffer())
 
-            graph_data_size_offset.append((graphs_data_br.pos() - graph_data_offset,
-                                           graph_data_start + graph_data_offset))
+        write(bytes(self.graphs_offsets_start - self.graphs_data_start - self.graph_data_size))
 
-        graphs_offsets_br.align(0x20)
-        graphs_data_br.align(0x20)
+        # Graph offsets
+        br = BinaryReader(endianness=Endian.BIG)
+        br.write_uint32(self.graph_offsets)
+        br.align(0x20)
+        write(br.buffer())
 
         # Animations
-        anm_br = BinaryReader(endianness=Endian.BIG)
+        br = BinaryReader(endianness=Endian.BIG)
+        curve_groups_index = 0
         for i, anm in enumerate(gmt.animation_list):
+            start_frame, end_frame = anm.get_frame_range()
+
             # start_frame
-            anm_br.write_uint32(anm.get_start_frame())
+            br.write_uint32(start_frame)
 
             # end_frame
-            anm_br.write_uint32(anm.get_end_frame())
+            br.write_uint32(end_frame)
 
             # index
-            anm_br.write_uint32(i)
+            br.write_uint32(i)
 
             # frame_rate
-            anm_br.write_float(anm.frame_rate)
+            br.write_float(anm.frame_rate)
 
             # name_index
-            anm_br.write_uint32(i)
+            br.write_uint32(i)
 
             # bone_group_index
-            anm_br.write_uint32(i)
+            br.write_uint32(i)
 
             # curve_groups_index
-            anm_br.write_uint32(curve_groups_index)
+            br.write_uint32(curve_groups_index)
             curve_groups_index += len(anm.bones)
 
             # curve_groups_count
-            anm_br.write_uint32(len(anm.bones))
+            br.write_uint32(len(anm.bones))
 
             # curves_count
-            anm_br.write_uint32(sum(map(lambda x: len(x.curves), anm.bones.values())))
+            br.write_uint32(self.curves_counts[i])
 
             # graphs_index and graphs_count
-            anm_br.write_uint32(graphs_index_count[i])
+            br.write_uint32(self.graphs_index_count[i])
 
             # animation_data_size and animation_data_offset
-            anm_br.write_uint32(anm_data_size_offset[i])
+            br.write_uint32(self.anm_data_size_offset[i])
 
             # graph_data_size and graph_data_size
-            anm_br.write_uint32(graph_data_size_offset[i])
+            br.write_uint32(self.graph_data_size_offset[i])
 
             # Padding
-            anm_br.write_uint32(0)
-
-        # Calculate the section start offsets
-        curves_start = anm_data_start + anm_data_br.size()
-        curve_groups_start = curves_start + curve_br.size()
-        bone_groups_start = curve_groups_start + curve_groups_br.size()
-        strings_start = bone_groups_start + bone_groups_br.size()
-        graphs_data_start = strings_start + strings_br.size()
-        graphs_offsets_start = graphs_data_start + graphs_data_br.size()
-        anm_start = graphs_offsets_start + graphs_offsets_br.size()
-
-        file_size = anm_start + anm_br.size()
-
-        # Header
-        br.write_str('GSGT')
-
-        # Use big endian by default (because it is guaranteed to be supported by all versions)
-        br.write_uint8(2)
-        br.write_uint8(1)
-
-        # Padding
-        br.write_uint16(0)
-
-        br.write_uint32(int(gmt.version))
-
-        # File size without padding
-        br.write_uint32(file_size)
-
-        br.write_struct(BrRGGString(gmt.name))
-
-        br.write_uint32(len(gmt.animation_list))
-        br.write_uint32(anm_start)
-        br.write_uint32(len(graphs))
-        br.write_uint32(graphs_offsets_start)
-        br.write_uint32(graphs_data_br.size())
-        br.write_uint32(graphs_data_start)
-        br.write_uint32(len(strings))
-        br.write_uint32(strings_start)
-        br.write_uint32(len(bone_groups))
-        br.write_uint32(bone_groups_start)
-        br.write_uint32(len(curve_groups))
-        br.write_uint32(curve_groups_start)
-        br.write_uint32(curves_index)
-        br.write_uint32(curves_start)
-        br.write_uint32(anm_data_br.size())
-        br.write_uint32(anm_data_start)
-
-        # Padding
-        br.pad(0xC)
-
-        # Flags
-        if gmt.is_face_gmt:
-            br.write_uint32(0x07_21_03_01)
-        else:
             br.write_uint32(0)
 
-        # Merge all of the buffers
-        br.extend(anm_data_br.buffer())
-        br.extend(curve_br.buffer())
-        br.extend(curve_groups_br.buffer())
-        br.extend(bone_groups_br.buffer())
-        br.extend(strings_br.buffer())
-        br.extend(graphs_data_br.buffer())
-        br.extend(graphs_offsets_br.buffer())
-        br.extend(anm_br.buffer())
-
-        br.seek(0, Whence.END)
+        write(br.buffer())
 
         # Align
-        br.align(0x1000)
+        write(bytes(aligned_size(self.file_size, 0x1000) - self.file_size))
 
 
 class BrGMTHeader(BrStruct):
@@ -307,24 +481,127 @@ class BrGMTAnimation(BrStruct):
 
 
 class BrGMTGraph(BrStruct):
-    def __init__(self, values=None):
+    def __init__(self, values=None, data: bytes = None):
         self.values = list() if values is None else values
 
+        # Values packed as big endian uint16, which are both written as is and used as the key for hashing
+        self.__data = data
+        self.__hash = None
+
+    @staticmethod
+    def from_frames(frames: Union[Sequence[int], 'np.ndarray']) -> 'BrGMTGraph':
+        """Creates a graph from a sequence or an array of frames, packing the frames once."""
+        if HAS_NUMPY and isinstance(frames, np.ndarray):
+            return BrGMTGraph(frames, frames.astype('>u2').tobytes())
+
+        return BrGMTGraph(frames, struct.pack(f'>{len(frames)}H', *frames))
+
     def __br_read__(self, br: BinaryReader):
         self.count = br.read_uint16()
         self.values = br.read_uint16(self.count)
         br.read_int16()  # Delimiter (0xFFFF)
 
-    def __br_write__(self, br: BinaryReader):
+    def __br_write__(self, br: BinaryReader, endianness=Endian.BIG):
+        """Writes the graph in the given endianness, which must be the one of the reader."""
         br.write_uint16(len(self.values))
-        br.write_uint16(self.values)
+
+        if endianness == Endian.BIG:
+            br.write_bytes(self.data())
+        else:
+            br.write_uint16(list(map(int, self.values)))
+
         br.write_int16(-1)
 
+    def data(self) -> bytes:
+        """Returns the values packed as big endian uint16."""
+        if self.__data is None:
+            self.__data = struct.pack(f'>{len(self.values)}H', *self.values)
+
+        return self.__data
+
+    def size(self) -> int:
+        """Returns the size of the written graph, including the count and the delimiter."""
+        return 4 + 2 * len(self.values)
+
     def __hash__(self) -> int:
-        return len(self.values) ^ sum(map(hash, self.values))
+        if self.__hash is None:
+            self.__hash = hash(self.data())
+
+        return self.__hash
 
     def __eq__(self, o: object) -> bool:
-        return isinstance(o, BrGMTGraph) and len(o.values) == len(self.values) and all(map(lambda x, y: x == y, o.values, self.values))
+        return isinstance(o, BrGMTGraph) and hash(o) == hash(self) and o.data() == self.data()
+
+
+class BrGMTGraphTable:
+    """Interns the graphs of the curves being written, so that curves with the same frames share a single graph.
+    Graphs are shared within each animation, or across all animations if share_across_animations is True.
+    """
+
+    graphs: List[BrGMTGraph]
+    curves_count: int
+    saved_bytes: int
+
+    def __init__(self, share_across_animations=False):
+        self.share_across_animations = share_across_animations
+        self.graphs = list()
+        self.curves_count = 0
+        self.saved_bytes = 0
+
+        self.__indices: Dict[BrGMTGraph, int] = dict()
+
+        # Frame arrays shared between curves (like the ones from read_gmt) are only packed once.
+        # The arrays are kept in the dict so their ids cannot be reused while interning
+        self.__array_indices: Dict[int, Tuple['np.ndarray', int]] = dict()
+
+    def load(self, graphs: List[BrGMTGraph], indices: Iterable[int]):
+        """Fills the table with existing graphs, such as the ones read from a file.
+        Only the graphs at the given indices are reused by intern, and new graphs are added after all existing ones.
+        """
+        self.graphs = list(graphs)
+        self.__indices = dict(map(lambda i: (self.graphs[i], i), indices))
+        self.__array_indices.clear()
+
+    def begin_animation(self):
+        """Starts interning the graphs of a new animation."""
+        if not self.share_across_animations:
+            self.__indices.clear()
+            self.__array_indices.clear()
+
+    def intern(self, frames: Union[Sequence[int], 'np.ndarray']) -> int:
+        """Returns the global index of the graph with the given frames, adding the graph if it does not exist yet."""
+        self.curves_count += 1
+
+        is_array = HAS_NUMPY and isinstance(frames, np.ndarray)
+        if is_array and id(frames) in self.__array_indices:
+            index = self.__array_indices[id(frames)][1]
+            self.saved_bytes += self.graphs[index].size()
+            return index
+
+        graph = BrGMTGraph.from_frames(frames)
+        index = self.__indices.get(graph)
+
+        if index is None:
+            index = self.__indices[graph] = len(self.graphs)
+            self.graphs.append(graph)
+        else:
+            self.saved_bytes += graph.size()
+
+        if is_array:
+            self.__array_indices[id(frames)] = (frames, index)
+
+        return index
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of curves and graphs, how many curves reuse an existing graph,
+        and the size of the graph data that was saved by reusing graphs.
+        """
+        return {
+            'curves': self.curves_count,
+            'graphs': len(self.graphs),
+            'shared_curves': self.curves_count - len(self.graphs),
+            'saved_bytes': self.saved_bytes,
+        }
 
 
 class BrGMTGroup(BrStruct):
@@ -349,7 +626,7 @@ class BrGMTGroup(BrStruct):
 
 
 class BrGMTCurve(BrStruct):
-    def __br_read__(self, br: BinaryReader, graphs, version):
+    def __br_read__(self, br: BinaryReader, graphs, version, endianness=Endian.BIG, lazy=False, curve_types=None):
         self.graph_index = br.read_uint32()
         self.animation_data_offset = br.read_uint32()
         self.format = GMTCurveFormat(br.read_uint32())
@@ -361,84 +638,136 @@ class BrGMTCurve(BrStruct):
         self.type = GMTCurveType(channel_type & 0xFFFF)
 
         self.graph = graphs[self.graph_index]
-        count = self.graph.count
+        self.version = version
+        self.endianness = endianness
+
+        # Lazy curves only read the curve struct, and their values are read later with read_values
+        # Curves with types that are not selected are never decoded
+        self.values = None if lazy or (curve_types is not None and self.type not in curve_types) else self.read_values(br)
+
+    def read_values(self, br: BinaryReader):
+        """Reads the animation data of this curve.
+        Returns an (N, C) array when NumPy is available, and a list of tuples otherwise.
+        """
+        read_values, read_values_array = self.__get_value_readers(self.version)
         with br.seek_to(self.animation_data_offset):
-            if self.format == GMTCurveFormat.ROT_QUAT_XYZ_FLOAT:
-                self.values = read_quat_xyz_float(br, count)
-            elif self.format == GMTCurveFormat.ROT_XYZW_SHORT:
-                if version > GMTVersion.KENZAN:
-                    self.values = read_quat_scaled(br, count)
-                else:
-                    self.values = read_quat_half_float(br, count)
-            elif self.format == GMTCurveFormat.LOC_CHANNEL:
-                self.values = read_loc_channel(br, count)
-            elif self.format == GMTCurveFormat.LOC_XYZ:
-                self.values = read_loc_all(br, count)
-            elif self.format in [GMTCurveFormat.ROT_XW_FLOAT, GMTCurveFormat.ROT_YW_FLOAT, GMTCurveFormat.ROT_ZW_FLOAT]:
-                self.values = read_quat_channel_float(br, count)
-            elif self.format in [GMTCurveFormat.ROT_XW_SHORT, GMTCurveFormat.ROT_YW_SHORT, GMTCurveFormat.ROT_ZW_SHORT]:
-                if version > GMTVersion.KENZAN:
-                    self.values = read_quat_channel_scaled(br, count)
-                else:
-                    self.values = read_quat_channel_half_float(br, count)
-            elif self.format == GMTCurveFormat.PATTERN_HAND:
-                self.values = read_pattern_short(br, count)
-            elif self.format == GMTCurveFormat.PATTERN_UNK:
-                self.values = read_bytes(br, count)
-            elif self.format == GMTCurveFormat.ROT_QUAT_XYZ_INT:
-                self.values = read_quat_xyz_int(br, count)
-            else:
-                self.values = read_bytes(br, count)
+            if HAS_NUMPY:
+                return read_values_array(br, self.graph.count, self.endianness)
 
-    #Known as Animation Segment in the template
-    def __br_write__(self, br: BinaryReader, curve: GMTCurve, graphs_dict: IterativeDict, anm_data_br: BinaryReader, anm_data_start: int, version: GMTVersion):
-        frames, values = zip(*map(lambda x: (x.frame, x.value), curve.keyframes))
+            return read_values(br, self.graph.count)
 
-        # graph_index
-        br.write_uint32(graphs_dict.get_or_next(BrGMTGraph(frames)))
+    def __get_value_readers(self, version) -> Tuple[Callable, Callable]:
+        if self.format == GMTCurveFormat.ROT_QUAT_XYZ_FLOAT:
+            return (read_quat_xyz_float, read_quat_xyz_float_array)
+        elif self.format == GMTCurveFormat.ROT_XYZW_SHORT:
+            if version > GMTVersion.KENZAN:
+                return (read_quat_scaled, read_quat_scaled_array)
+            else:
+                return (read_quat_half_float, read_quat_half_float_array)
+        elif self.format == GMTCurveFormat.LOC_CHANNEL:
+            return (read_loc_channel, read_loc_channel_array)
+        elif self.format == GMTCurveFormat.LOC_XYZ:
+            return (read_loc_all, read_loc_all_array)
+        elif self.format in [GMTCurveFormat.ROT_XW_FLOAT, GMTCurveFormat.ROT_YW_FLOAT, GMTCurveFormat.ROT_ZW_FLOAT]:
+            return (read_quat_channel_float, read_quat_channel_float_array)
+        elif self.format in [GMTCurveFormat.ROT_XW_SHORT, GMTCurveFormat.ROT_YW_SHORT, GMTCurveFormat.ROT_ZW_SHORT]:
+            if version > GMTVersion.KENZAN:
+                return (read_quat_channel_scaled, read_quat_channel_scaled_array)
+            else:
+                return (read_quat_channel_half_float, read_quat_channel_half_float_array)
+        elif self.format == GMTCurveFormat.PATTERN_HAND:
+            return (read_pattern_short, read_pattern_short_array)
+        elif self.format == GMTCurveFormat.PATTERN_UNK:
+            return (read_bytes, read_bytes_array)
+        elif self.format == GMTCurveFormat.ROT_QUAT_XYZ_INT:
+            return (read_quat_xyz_int, read_quat_xyz_int_array)
+        else:
+            return (read_bytes, read_bytes_array)
+
+    def prepare(self, curve: GMTCurve, graph_table: BrGMTGraphTable, animation_data_offset: int, version: GMTVersion,
+                vector_version: GMTVectorVersion, compress_rotations=False):
+        """Sets up the curve struct for writing, and computes the size of its animation data without encoding it.
+        The vector version is the one of the whole GMT (see GMT.vector_version). Rotations are only compressed for DRAGON_VECTOR.
+        """
+        # Max angular error of the written rotation values, only set for ROT_QUAT_XYZ_INT
+        self.quantization_error = None
+
+        if curve.is_array_backed():
+            frames, values = curve.get_arrays()
+        else:
+            frames, values = zip(*map(lambda x: (x.frame, x.value), curve.keyframes))
 
-        # animation_data_offset
-        br.write_uint32(anm_data_start + anm_data_br.size())
+        self.graph_index = graph_table.intern(frames)
+        self.animation_data_offset = animation_data_offset
+        self.channel = curve.channel
+        self.type = curve.type
+        self.values = values
+
+        count = len(values)
+        components = values.shape[1] if HAS_NUMPY and isinstance(values, np.ndarray) else len(values[0])
 
-        # format
         if curve.type == GMTCurveType.LOCATION:
             if curve.channel == GMTCurveChannel.ALL:
-                br.write_uint32(int(GMTCurveFormat.LOC_XYZ))
-                write_loc_all(anm_data_br, values)
+                self.format = GMTCurveFormat.LOC_XYZ
+                self.__write_values = write_loc_all
             else:
-                br.write_uint32(int(GMTCurveFormat.LOC_CHANNEL))
-                write_loc_channel(anm_data_br, values)
+                self.format = GMTCurveFormat.LOC_CHANNEL
+                self.__write_values = write_loc_channel
+
+            self.data_size = 4 * count * components
         elif curve.type == GMTCurveType.ROTATION:
+            if curve.channel == GMTCurveChannel.ALL and compress_rotations and vector_version == GMTVectorVersion.DRAGON_VECTOR:
+                self.format = GMTCurveFormat.ROT_QUAT_XYZ_INT
+                self.__write_values = write_quat_xyz_int
+                self.data_size = 0x10 + 4 * count
+                return
+            elif curve.channel == GMTCurveChannel.ALL:
+                self.format = GMTCurveFormat.ROT_XYZW_SHORT
+            elif curve.channel == GMTCurveChannel.XW:
+                self.format = GMTCurveFormat.ROT_XW_SHORT
+            elif curve.channel == GMTCurveChannel.YW:
+                self.format = GMTCurveFormat.ROT_YW_SHORT
+            elif curve.channel == GMTCurveChannel.ZW:
+                self.format = GMTCurveFormat.ROT_ZW_SHORT
+            else:
+                raise Exception(f'Incompatible channel value: {curve.channel}')
+
             if curve.channel == GMTCurveChannel.ALL:
-                br.write_uint32(int(GMTCurveFormat.ROT_XYZW_SHORT))
-                if version > GMTVersion.KENZAN:
-                    write_quat_scaled(anm_data_br, values)
-                else:
-                    write_quat_half_float(anm_data_br, values)
+                self.__write_values = write_quat_scaled if version > GMTVersion.KENZAN else write_quat_half_float
             else:
-                if curve.channel == GMTCurveChannel.XW:
-                    br.write_uint32(int(GMTCurveFormat.ROT_XW_SHORT))
-                elif curve.channel == GMTCurveChannel.YW:
-                    br.write_uint32(int(GMTCurveFormat.ROT_YW_SHORT))
-                elif curve.channel == GMTCurveChannel.ZW:
-                    br.write_uint32(int(GMTCurveFormat.ROT_ZW_SHORT))
-                else:
-                    pass
-
-                if version > GMTVersion.KENZAN:
-                    write_quat_channel_scaled(anm_data_br, values)
-                else:
-                    write_quat_channel_half_float(anm_data_br, values)
+                self.__write_values = write_quat_channel_scaled if version > GMTVersion.KENZAN else write_quat_channel_half_float
+
+            self.data_size = 2 * count * components
         elif curve.type == GMTCurveType.PATTERN_HAND:
-            br.write_uint32(int(GMTCurveFormat.PATTERN_HAND))
-            write_pattern_short(anm_data_br, values)
+            self.format = GMTCurveFormat.PATTERN_HAND
+            self.__write_values = write_pattern_short
+            self.data_size = 2 * count * components
         elif curve.type in [GMTCurveType.PATTERN_UNK, GMTCurveType.PATTERN_FACE]:
-            br.write_uint32(int(GMTCurveFormat.PATTERN_UNK))
-            write_bytes(anm_data_br, values)
+            self.format = GMTCurveFormat.PATTERN_UNK
+            self.__write_values = write_bytes
+            self.data_size = aligned_size(count * components, 4)
         else:
-            pass
+            raise Exception(f'Unsupported curve type: {curve.type}')
+
+    def write_values(self, br: BinaryReader):
+        """Encodes the animation data of a prepared curve."""
+        if self.format == GMTCurveFormat.ROT_QUAT_XYZ_INT:
+            self.quantization_error = self.__write_values(br, self.values)
+        else:
+            self.__write_values(br, self.values)
+
+    #Known as Animation Segment in the template
+    def __br_write__(self, br: BinaryReader):
+        # graph_index
+        br.write_uint32(self.graph_index)
+
+        # animation_data_offset
+        br.write_uint32(self.animation_data_offset)
+
+        # format
+        br.write_uint32(int(self.format))
 
-        value = (curve.channel << 16) | int(curve.type)
+        value = (self.channel << 16) | int(self.type)
         value = int(value)
         # channel_type
         br.write_uint32(value)
@@ -7,21 +7,59 @@ from ...util import *
 
 
 # Common
+def __group(values: Tuple, size: int) -> List[Tuple]:
+    """Splits a flat tuple of values into a list of tuples with the given size."""
+    return list(zip(*[iter(values)] * size))
+
+
+def __read_array(br: BinaryReader, dtype: str, count: int, size: int, endianness: Endian) -> 'np.ndarray':
+    """Reads count * size values of the given NumPy dtype in a single read and returns them as a native (count, size) array.
+    If the reader is a MappedBinaryReader with keep_views set, a read-only view in the file's endianness is returned instead.
+    """
+    nbytes = count * size * np.dtype(dtype).itemsize
+
+    if isinstance(br, MappedBinaryReader):
+        array = np.frombuffer(br.read_view(nbytes), dtype=('>' if endianness else '<') + dtype).reshape(count, size)
+
+        if br.keep_views:
+            return array
+    else:
+        array = np.frombuffer(br.read_bytes(nbytes), dtype=('>' if endianness else '<') + dtype).reshape(count, size)
+
+    return array.astype('=' + dtype)
+
+
+def __flatten(values: List[Tuple[float]]) -> list:
+    """Flattens a list of value tuples or an (N, C) array into a single list."""
+    if HAS_NUMPY and isinstance(values, np.ndarray):
+        return values.ravel().tolist()
+
+    return list(chain(*values))
+
+
 def __write_float_tuples(br: BinaryReader, values: List[Tuple[float]]):
-    br.write_float(list(chain(*values)))
+    br.write_float(__flatten(values))
 
 
 def __write_half_float_tuples(br: BinaryReader, values: List[Tuple[float]]):
-    br.write_half_float(list(chain(*values)))
+    br.write_half_float(__flatten(values))
 
 
 def __write_quat_scaled(br: BinaryReader, values: List[Tuple[float]]):
-    br.write_int16(list(map(lambda x: int(x * 16_384), chain(*values))))
+    if HAS_NUMPY:
+        # Truncate towards zero like int() does
+        br.write_int16(np.trunc(np.asarray(values, dtype=np.float64) * 16_384).astype(np.int64).ravel().tolist())
+    else:
+        br.write_int16(list(map(lambda x: int(x * 16_384), __flatten(values))))
 
 
 # LOC_XYZ
 def read_loc_all(br: BinaryReader, count):
-    return list(map(lambda _: br.read_float(3), range(count)))
+    return __group(br.read_float(count * 3), 3)
+
+
+def read_loc_all_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'f4', count, 3, endianness)
 
 
 def write_loc_all(br: BinaryReader, values: List[Tuple[float]]):
@@ -30,7 +68,11 @@ def write_loc_all(br: BinaryReader, values: List[Tuple[float]]):
 
 # LOC_CHANNEL
 def read_loc_channel(br: BinaryReader, count):
-    return list(map(lambda _: br.read_float(1), range(count)))
+    return __group(br.read_float(count), 1)
+
+
+def read_loc_channel_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'f4', count, 1, endianness)
 
 
 def write_loc_channel(br: BinaryReader, values: List[Tuple[float]]):
@@ -39,19 +81,29 @@ def write_loc_channel(br: BinaryReader, values: List[Tuple[float]]):
 
 # ROT_QUAT_XYZ_FLOAT
 def read_quat_xyz_float(br: BinaryReader, count):
-    values = [None] * count
+    values = __group(br.read_float(count * 3), 3)
 
-    for i in range(count):
-        xyz = br.read_float(3)
+    for i, xyz in enumerate(values):
         w = 1.0 - sum(map(lambda a: a ** 2, xyz))
         values[i] = (*xyz, (sqrt(w) if w > 0 else 0))
 
     return values
 
 
+def read_quat_xyz_float_array(br: BinaryReader, count, endianness: Endian):
+    xyz = __read_array(br, 'f4', count, 3, endianness).astype(np.float64)
+    w = 1.0 - (xyz[:, 0] ** 2 + xyz[:, 1] ** 2 + xyz[:, 2] ** 2)
+
+    return np.column_stack((xyz, np.sqrt(np.maximum(w, 0.0))))
+
+
 # ROT_XYZW_SHORT (KENZAN)
 def read_quat_half_float(br: BinaryReader, count):
-    return list(map(lambda _: br.read_half_float(4), range(count)))
+    return __group(br.read_half_float(count * 4), 4)
+
+
+def read_quat_half_float_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'f2', count, 4, endianness).astype(np.float32)
 
 
 def write_quat_half_float(br: BinaryReader, values: List[Tuple[float]]):
@@ -60,7 +112,11 @@ def write_quat_half_float(br: BinaryReader, values: List[Tuple[float]]):
 
 # ROT_XYZW_SHORT
 def read_quat_scaled(br: BinaryReader, count):
-    return list(map(lambda _: tuple([(x / 16_384) for x in br.read_int16(4)]), range(count)))
+    return __group([(x / 16_384) for x in br.read_int16(count * 4)], 4)
+
+
+def read_quat_scaled_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'i2', count, 4, endianness) / np.float32(16_384)
 
 
 def write_quat_scaled(br: BinaryReader, values: List[Tuple[float]]):
@@ -69,12 +125,20 @@ def write_quat_scaled(br: BinaryReader, values: List[Tuple[float]]):
 
 # ROT_XW_FLOAT
 def read_quat_channel_float(br: BinaryReader, count):
-    return list(map(lambda _: br.read_float(2), range(count)))
+    return __group(br.read_float(count * 2), 2)
+
+
+def read_quat_channel_float_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'f4', count, 2, endianness)
 
 
 # ROT_XW_SHORT (KENZAN)
 def read_quat_channel_half_float(br: BinaryReader, count):
-    return list(map(lambda _: br.read_half_float(2), range(count)))
+    return __group(br.read_half_float(count * 2), 2)
+
+
+def read_quat_channel_half_float_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'f2', count, 2, endianness).astype(np.float32)
 
 
 def write_quat_channel_half_float(br: BinaryReader, values: List[Tuple[float]]):
@@ -83,7 +147,11 @@ def write_quat_channel_half_float(br: BinaryReader, values: List[Tuple[float]]):
 
 # ROT_XW_SHORT
 def read_quat_channel_scaled(br: BinaryReader, count):
-    return list(map(lambda _: tuple([(x / 16_384) for x in br.read_int16(2)]), range(count)))
+    return __group([(x / 16_384) for x in br.read_int16(count * 2)], 2)
+
+
+def read_quat_channel_scaled_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'i2', count, 2, endianness) / np.float32(16_384)
 
 
 def write_quat_channel_scaled(br: BinaryReader, values: List[Tuple[float]]):
@@ -91,26 +159,27 @@ def write_quat_channel_scaled(br: BinaryReader, values: List[Tuple[float]]):
 
 
 # ROT_QUAT_XYZ_INT
+# Masks and multipliers for the three packed 10-bit components, taken straight out of decompiled code
+QUAT_XYZ_INT_MASKS = (0x3FF00000, 0x000FFC00, 0x000003FF)
+QUAT_XYZ_INT_MULTIPLIERS = struct.unpack(">fff", b'\x30\x80\x00\x00\x35\x80\x00\x00\x3A\x80\x00\x00')
+
+# Indices of the stored components for each value of the omitted axis index
+QUAT_XYZ_INT_INDICES = ((1, 2, 3), (0, 2, 3), (0, 1, 3), (0, 1, 2))
+
+
 def read_quat_xyz_int(br: BinaryReader, count):
     base_quaternion = [(x / 32_768) for x in br.read_int16(4)]
     scale_quaternion = [(x / 32_768) for x in br.read_uint16(4)]
 
     values = [None] * count
 
-    for i in range(count):
-        f = br.read_uint32()
+    for i, f in enumerate(br.read_uint32(count)):
         axis_index = f & 3
         f = f >> 2
 
-        indices = [0, 1, 2, 3]
-        indices.pop(axis_index)
-
-        v123 = (0x3FF00000, 0x000FFC00, 0x000003FF)
-        m123 = struct.unpack(">fff", b'\x30\x80\x00\x00\x35\x80\x00\x00\x3A\x80\x00\x00')
-
         # A lengthy calculation taken straight out of decompiled code
-        a123 = list(map(lambda v, m, l: (float(f & v) * m *
-                                         scale_quaternion[l]) + base_quaternion[l], v123, m123, indices))
+        a123 = list(map(lambda v, m, l: (float(f & v) * m * scale_quaternion[l]) + base_quaternion[l],
+                        QUAT_XYZ_INT_MASKS, QUAT_XYZ_INT_MULTIPLIERS, QUAT_XYZ_INT_INDICES[axis_index]))
         a4 = 1.0 - sum(map(lambda a: a ** 2, a123))
 
         a123.insert(axis_index, sqrt(a4) if a4 > 0 else 0)
@@ -119,20 +188,119 @@ def read_quat_xyz_int(br: BinaryReader, count):
     return values
 
 
+def read_quat_xyz_int_array(br: BinaryReader, count, endianness: Endian):
+    base_quaternion = np.array(br.read_int16(4)) / 32_768
+    scale_quaternion = np.array(br.read_uint16(4)) / 32_768
+
+    packed = __read_array(br, 'u4', count, 1, endianness)[:, 0]
+
+    return __decode_quat_xyz_int(base_quaternion, scale_quaternion, packed)
+
+
+def write_quat_xyz_int(br: BinaryReader, values: List[Tuple[float]]) -> float:
+    """Quantizes the quaternions and writes them. Returns the max angular error in radians. Requires NumPy."""
+    base_quaternion, scale_quaternion, packed, error = quantize_quat_xyz_int(values)
+
+    br.write_int16(base_quaternion)
+    br.write_uint16(scale_quaternion)
+    br.write_uint32(packed)
+
+    return error
+
+
+def quantize_quat_xyz_int(values: List[Tuple[float]]) -> Tuple[List[int], List[int], List[int], float]:
+    """Quantizes (x, y, z, w) quaternions into the ROT_QUAT_XYZ_INT format.
+    The component with the largest magnitude is omitted from each quaternion, and the other three are stored as
+    10-bit fields relative to a base and scale quaternion that are chosen to cover the range of the whole curve.
+    Returns the base quaternion, the scale quaternion, the packed values and the max angular error in radians. Requires NumPy.
+    """
+    if not HAS_NUMPY:
+        raise Exception('ROT_QUAT_XYZ_INT encoding requires NumPy')
+
+    quats = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    count = len(quats)
+
+    norms = np.linalg.norm(quats, axis=1)[:, np.newaxis]
+    quats = quats / np.where(norms > 0, norms, 1.0)
+
+    # The omitted component is always reconstructed as positive, so flip the quaternion when it is negative
+    rows = np.arange(count)
+    axis_index = np.argmax(np.abs(quats), axis=1)
+    quats *= np.where(quats[rows, axis_index] < 0, -1.0, 1.0)[:, np.newaxis]
+
+    indices = np.array(QUAT_XYZ_INT_INDICES, dtype=np.intp)[axis_index]
+    stored = quats[rows[:, np.newaxis], indices]
+
+    # Range of each component over the keyframes where it is stored
+    is_stored = np.ones(quats.shape, dtype=bool)
+    is_stored[rows, axis_index] = False
+    low = np.where(is_stored, quats, np.inf).min(axis=0, initial=np.inf)
+    high = np.where(is_stored, quats, -np.inf).max(axis=0, initial=-np.inf)
+    low = np.where(np.isfinite(low), low, 0.0)
+    high = np.where(np.isfinite(high), high, low)
+
+    # 10-bit fields reach at most 1023 / 1024 of the scale
+    base_quaternion = np.clip(np.floor(low * 32_768), -32_768, 32_767)
+    scale_quaternion = np.clip(np.ceil((high - base_quaternion / 32_768) * (1024 / 1023) * 32_768), 0, 65_535)
+
+    base = (base_quaternion / 32_768)[indices]
+    scale = (scale_quaternion / 32_768)[indices]
+    fields = np.rint(np.divide((stored - base) * 1024, scale, out=np.zeros_like(stored), where=scale > 0))
+    fields = np.clip(fields, 0, 1023).astype(np.uint32)
+
+    packed = (((fields[:, 0] << 20) | (fields[:, 1] << 10) | fields[:, 2]) << 2) | axis_index.astype(np.uint32)
+
+    # Measure the error on the values exactly as they will be decoded
+    decoded = __decode_quat_xyz_int(base_quaternion / 32_768, scale_quaternion / 32_768, packed)
+    decoded /= np.linalg.norm(decoded, axis=1)[:, np.newaxis]
+    dots = np.clip(np.abs(np.sum(quats * decoded, axis=1)), 0.0, 1.0)
+    error = float(2 * np.arccos(dots).max()) if count else 0.0
+
+    return (base_quaternion.astype(np.int64).tolist(), scale_quaternion.astype(np.int64).tolist(), packed.tolist(), error)
+
+
+def __decode_quat_xyz_int(base_quaternion: 'np.ndarray', scale_quaternion: 'np.ndarray', packed: 'np.ndarray') -> 'np.ndarray':
+    count = len(packed)
+    axis_index = (packed & 3).astype(np.intp)
+    packed = packed >> 2
+
+    # Same operations and order as the scalar path, so that the results are identical
+    a123 = np.column_stack([(packed & v) * m for v, m in zip(QUAT_XYZ_INT_MASKS, QUAT_XYZ_INT_MULTIPLIERS)])
+    indices = np.array(QUAT_XYZ_INT_INDICES, dtype=np.intp)[axis_index]
+    a123 = a123 * scale_quaternion[indices] + base_quaternion[indices]
+
+    a4 = 1.0 - (a123[:, 0] ** 2 + a123[:, 1] ** 2 + a123[:, 2] ** 2)
+
+    rows = np.arange(count)[:, np.newaxis]
+    values = np.empty((count, 4))
+    values[rows, indices] = a123
+    values[rows[:, 0], axis_index] = np.sqrt(np.maximum(a4, 0.0))
+
+    return values
+
+
 # PATTERN_HAND
 def read_pattern_short(br: BinaryReader, count):
-    return list(map(lambda _: br.read_int16(2), range(count)))
+    return __group(br.read_int16(count * 2), 2)
+
+
+def read_pattern_short_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'i2', count, 2, endianness)
 
 
 def write_pattern_short(br: BinaryReader, values: List[Tuple[float]]):
-    br.write_int16(list(chain(*values)))
+    br.write_int16(__flatten(values))
 
 
 # PATTERN_UNK
 def read_bytes(br: BinaryReader, count):
-    return list(map(lambda _: br.read_int8(1), range(count)))
+    return __group(br.read_int8(count), 1)
+
+
+def read_bytes_array(br: BinaryReader, count, endianness: Endian):
+    return __read_array(br, 'i1', count, 1, endianness)
 
 
 def write_bytes(br: BinaryReader, values: List[Tuple[float]]):
-    br.write_int8(list(chain(*values)))
+    br.write_int8(__flatten(values))
     br.align(4)
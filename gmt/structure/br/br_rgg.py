@@ -1,7 +1,54 @@
+import sys
+import threading
+from typing import Dict
+
 from ...util import *
 
 RGG_ENCODING = 'cp932'
 
+
+class RGGStringTable:
+    """Thread-safe table of decoded strings, keyed by the raw bytes of their string field.
+    Bone and animation names repeat across many files, so each distinct name is decoded once, and every read of it
+    returns the same interned str object.
+    """
+
+    def __init__(self, max_size=1 << 16):
+        """Creates a string table.
+        :param max_size: Max number of strings in the table. Strings read after it is full are decoded without being added
+        """
+        self.max_size = max_size
+
+        self.__strings: Dict[bytes, str] = dict()
+        self.__lock = threading.Lock()
+
+    def decode(self, raw: bytes) -> str:
+        """Returns the string of a null-padded string field."""
+        string = self.__strings.get(raw)
+        if string is not None:
+            return string
+
+        string = sys.intern(raw.split(b'\x00', 1)[0].decode(RGG_ENCODING))
+
+        with self.__lock:
+            if len(self.__strings) < self.max_size:
+                # Another thread may have added the same string in the meantime
+                string = self.__strings.setdefault(raw, string)
+
+        return string
+
+    def clear(self):
+        with self.__lock:
+            self.__strings.clear()
+
+    def __len__(self) -> int:
+        return len(self.__strings)
+
+
+# Shared by all readers
+RGG_STRINGS = RGGStringTable()
+
+
 class BrRGGString(BrStruct):
     data: str
 
@@ -10,7 +57,7 @@ class BrRGGString(BrStruct):
 
     def __br_read__(self, br: BinaryReader):
         self.checksum = br.read_uint16()
-        self.data = br.read_str(30, RGG_ENCODING)
+        self.data = RGG_STRINGS.decode(br.read_bytes(30))
 
     def __br_write__(self, br: BinaryReader):
         string = self.data[:30].encode(RGG_ENCODING)
@@ -1,11 +1,14 @@
-from typing import List, Optional, Tuple
-
-from mathutils import Euler, Quaternion, Vector
+import math
+from typing import List, Optional, Sequence, Tuple
 
+from ..util.vector_math import (MIN_DISTANCE, Vector, dot, euler_z_to_quat, invert_quat, multiply_quat, normalize,
+                                quat_to_euler_z, rotate_vector, to_quaternion, to_vector, track_quat)
 from .enums.cmt_enum import *
 
 
 class CMT:
+    __slots__ = ('version', 'animation_list')
+
     version: CMTVersion
     animation_list: List['CMTAnimation']
 
@@ -26,6 +29,8 @@ class CMT:
 
 
 class CMTAnimation:
+    __slots__ = ('frame_rate', 'frames')
+
     frame_rate: float
     frames: List['CMTFrame']
 
@@ -38,6 +43,8 @@ class CMTAnimation:
 
 
 class CMTFrame:
+    __slots__ = ('location', 'fov', 'focus_point', 'roll', 'clip_range')
+
     location: Vector
     fov: float
 
@@ -51,36 +58,44 @@ class CMTFrame:
         self.fov = fov
         self.clip_range = None
 
-    def from_dist_rotation(self, distance: float, rotation: Quaternion, invert_roll=False):
+    def from_dist_rotation(self, distance: float, rotation: Sequence[float], invert_roll=False):
+        """Sets the focus point and the roll from a distance and a (w, x, y, z) rotation, like a mathutils.Quaternion."""
+        # Zero rotations stay zero, so that they leave the focus point on the camera
+        rotation = normalize(rotation)
+
         # Track axis is Z
-        forward: Vector = rotation @ Vector((0.0, 0.0, 1.0))
-        forward.length = max(distance, 0.001)   # Avoid having a 0 length vector
+        forward = rotate_vector(rotation, (0.0, 0.0, 1.0))
+        distance = max(distance, MIN_DISTANCE)   # Avoid having a 0 length vector
+        forward = tuple(map(lambda x: x * distance, forward))
 
-        self.focus_point = self.location + forward
+        self.focus_point = to_vector(tuple(map(lambda x, y: x + y, self.location, forward)))
 
         # The invert_roll argument should be True only when operating in a space other than the CMT space
         if invert_roll:
-            self.roll = (forward.to_track_quat('Z', 'Y').inverted() @ rotation).to_euler().z
+            self.roll = quat_to_euler_z(multiply_quat(invert_quat(track_quat(forward, 'Z', 'Y')), rotation))
         else:
-            self.roll = rotation.to_euler().z
+            self.roll = quat_to_euler_z(rotation)
 
-    def to_dist_rotation(self, invert_roll=False) -> Tuple[float, Quaternion]:
-        forward: Vector = self.focus_point - self.location
-        dist = forward.length
+    def to_dist_rotation(self, invert_roll=False) -> Tuple[float, Sequence[float]]:
+        """Returns the distance to the focus point and the (w, x, y, z) rotation, as a mathutils.Quaternion if
+        mathutils is available.
+        """
+        forward = tuple(map(lambda x, y: float(x) - float(y), self.focus_point, self.location))
+        dist = math.sqrt(dot(forward, forward))
 
-        forward.normalize()
+        forward = normalize(forward)
 
         if invert_roll:
-            rotation = forward.to_track_quat('Z', 'Y')
-            rotation = rotation @ Euler((0, 0, self.roll)).to_quaternion()
+            rotation = track_quat(forward, 'Z', 'Y')
+            rotation = multiply_quat(rotation, euler_z_to_quat(self.roll))
         else:
             # For some reason, this operation only works properly in Blender space
             # So we just convert the vector here to that space and then convert the rotation back to CMT space
-            forward = Vector((-forward.x, forward.z, forward.y))
+            forward = (-forward[0], forward[2], forward[1])
 
-            rotation = forward.to_track_quat('Y', 'Z')
-            rotation = rotation @ Euler((0, 0, self.roll)).to_quaternion()
+            rotation = track_quat(forward, 'Y', 'Z')
+            rotation = multiply_quat(rotation, euler_z_to_quat(self.roll))
 
-            rotation = Quaternion((rotation.w, -rotation.x, rotation.z, rotation.y))
+            rotation = (rotation[0], -rotation[1], rotation[3], rotation[2])
 
-        return (dist, rotation)
+        return (dist, to_quaternion(rotation))
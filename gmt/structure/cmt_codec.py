@@ -0,0 +1,162 @@
+from itertools import repeat
+from typing import List, Optional, Tuple
+
+from ..util.interpolation import normalize
+from ..util.numpy_compat import np
+from ..util.quaternion import quat_multiply, quat_rotate
+from ..util.vector_math import (GIMBAL_EPSILON, MIN_DISTANCE, TRACK_EPSILON, TRACK_HALF_TURN, TRACK_HALF_TURN_COSINE,
+                                vector_type)
+from .cmt import CMTAnimation, CMTFrame
+
+
+class CMTFrameArrays:
+    """Frames of a CMT animation as column arrays, in the focus point and roll representation of CMTFrame.
+    Converting between this and the (distance, rotation) representation of the other frame formats is done for all
+    frames at once, and gives the same results as CMTFrame.from_dist_rotation and CMTFrame.to_dist_rotation within
+    float precision. Rotations are (x, y, z, w), like they are stored in the file. Requires NumPy.
+    """
+
+    locations: 'np.ndarray'
+    fovs: 'np.ndarray'
+    focus_points: 'np.ndarray'
+    rolls: 'np.ndarray'
+    clip_ranges: Optional['np.ndarray']
+
+    def __init__(self, locations, fovs, focus_points, rolls, clip_ranges=None):
+        self.locations = locations
+        self.fovs = fovs
+        self.focus_points = focus_points
+        self.rolls = rolls
+        self.clip_ranges = clip_ranges
+
+    def __len__(self) -> int:
+        return len(self.fovs)
+
+    @classmethod
+    def from_animation(cls, anm: CMTAnimation) -> 'CMTFrameArrays':
+        frames = anm.frames
+
+        locations = np.array(list(map(lambda x: x.location[:], frames)), dtype=np.float64).reshape(-1, 3)
+        fovs = np.array(list(map(lambda x: x.fov, frames)), dtype=np.float64)
+        focus_points = np.array(list(map(lambda x: x.focus_point[:], frames)), dtype=np.float64).reshape(-1, 3)
+        rolls = np.array(list(map(lambda x: x.roll, frames)), dtype=np.float64)
+
+        clip_ranges = None
+        if anm.has_clip_range():
+            clip_ranges = np.array(list(map(lambda x: x.clip_range or (0.1, 10000), frames)), dtype=np.float64)
+
+        return cls(locations, fovs, focus_points, rolls, clip_ranges)
+
+    @classmethod
+    def from_dist_rotations(cls, locations: 'np.ndarray', fovs: 'np.ndarray', distances: 'np.ndarray',
+                            rotations: 'np.ndarray', clip_ranges: 'np.ndarray' = None) -> 'CMTFrameArrays':
+        """Creates the frames from (distance, rotation) frames, as read from the ROT_FLOAT (with a distance of 1),
+        DIST_ROT_SHORT and DIST_ROT_XYZ formats.
+        """
+        locations = np.asarray(locations, dtype=np.float64)
+        focus_points, rolls = dist_rotation_to_focus_roll(locations, distances, rotations)
+
+        return cls(locations, np.asarray(fovs, dtype=np.float64), focus_points, rolls, clip_ranges)
+
+    def to_dist_rotations(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Returns the distance to the focus point and the rotation of each frame."""
+        return focus_roll_to_dist_rotation(self.locations, self.focus_points, self.rolls)
+
+    def to_frames(self) -> List[CMTFrame]:
+        """Creates a CMTFrame for each frame, with mathutils vectors if mathutils is available."""
+        vector = vector_type()
+        clip_ranges = map(tuple, self.clip_ranges.tolist()) if self.clip_ranges is not None else repeat(None)
+
+        frames = list()
+        for location, fov, focus_point, roll, clip_range in zip(self.locations.tolist(), self.fovs.tolist(),
+                                                                self.focus_points.tolist(), self.rolls.tolist(), clip_ranges):
+            frame = CMTFrame(vector(location), fov)
+            frame.focus_point = vector(focus_point)
+            frame.roll = roll
+            frame.clip_range = clip_range
+            frames.append(frame)
+
+        return frames
+
+
+def dist_rotation_to_focus_roll(locations: 'np.ndarray', distances: 'np.ndarray', rotations: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+    """Vectorized CMTFrame.from_dist_rotation, for arrays of locations (N, 3), distances (N,) and rotations (N, 4).
+    Returns the focus points and the rolls.
+    """
+    rotations = normalize(np.asarray(rotations, dtype=np.float64))
+
+    forward = quat_rotate(rotations, np.array((0.0, 0.0, 1.0)))
+    forward *= np.maximum(np.asarray(distances, dtype=np.float64), MIN_DISTANCE)[:, np.newaxis]
+
+    # Zero quaternions do not rotate anything, so they leave the focus point on the camera
+    forward[~rotations.any(axis=1)] = 0.0
+
+    return (locations + forward, __euler_z(rotations))
+
+
+def focus_roll_to_dist_rotation(locations: 'np.ndarray', focus_points: 'np.ndarray', rolls: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+    """Vectorized CMTFrame.to_dist_rotation, for arrays of locations (N, 3), focus points (N, 3) and rolls (N,).
+    Returns the distances and the rotations.
+    """
+    forward = np.asarray(focus_points, dtype=np.float64) - locations
+    distances = np.linalg.norm(forward, axis=1)
+
+    # Same as CMTFrame.to_dist_rotation, the track quaternion is computed in Blender space and converted back
+    forward = normalize(forward)
+    track = __track_quat_y_z(np.column_stack((-forward[:, 0], forward[:, 2], forward[:, 1])))
+
+    half_rolls = np.asarray(rolls, dtype=np.float64) * 0.5
+    roll_rotations = np.column_stack((np.zeros((len(half_rolls), 2)), np.sin(half_rolls), np.cos(half_rolls)))
+
+    rotations = quat_multiply(track, roll_rotations)
+
+    return (distances, np.column_stack((-rotations[:, 0], rotations[:, 2], rotations[:, 1], rotations[:, 3])))
+
+
+def __track_quat_y_z(vectors: 'np.ndarray') -> 'np.ndarray':
+    """Vectorized mathutils.Vector.to_track_quat('Y', 'Z'), which follows Blender's vec_to_quat."""
+    x, y, z = vectors.T
+    length = np.linalg.norm(vectors, axis=1)
+    safe_length = np.where(length > 0.0, length, 1.0)
+
+    # Rotate the Y axis onto the vector, around the axis perpendicular to both
+    parallel = np.abs(x) + np.abs(z) < TRACK_EPSILON
+    normal = normalize(np.column_stack((z, np.zeros_like(x), np.where(parallel, 1.0, -x))))
+    cosine = y / safe_length
+    half_angle = 0.5 * np.where(cosine <= TRACK_HALF_TURN_COSINE, TRACK_HALF_TURN, np.arccos(np.clip(cosine, -1.0, 1.0)))
+    q = np.column_stack((normal * np.sin(half_angle)[:, np.newaxis], np.cos(half_angle)))
+
+    # Then rotate around the vector, so that the Z axis points up as much as possible
+    qx, qy, qz, qw = q.T
+    up_angle = 0.5 * np.arctan2(2 * (qw * qy + qx * qz), 1 - 2 * (qx * qx + qy * qy))
+    q2 = np.column_stack((vectors * (np.sin(up_angle) / safe_length)[:, np.newaxis], np.cos(up_angle)))
+
+    q = quat_multiply(q2, q)
+    q[length == 0.0] = (0.0, 0.0, 0.0, 1.0)
+
+    return q
+
+
+def __euler_z(q: 'np.ndarray') -> 'np.ndarray':
+    """Vectorized Z angle of mathutils.Quaternion.to_euler() with the default XYZ order, for normalized quaternions.
+    Like Blender, the solution with the smallest angles is chosen out of the two possible ones.
+    """
+    x, y, z, w = q.T
+
+    m00 = 1 - 2 * (y * y + z * z)
+    m01 = 2 * (w * z + x * y)
+    m02 = 2 * (x * z - w * y)
+    m12 = 2 * (w * x + y * z)
+    m22 = 1 - 2 * (x * x + y * y)
+
+    cy = np.hypot(m00, m01)
+
+    euler1 = np.abs(np.arctan2(m12, m22)) + np.abs(np.arctan2(-m02, cy))
+    euler2 = np.abs(np.arctan2(-m12, -m22)) + np.abs(np.arctan2(-m02, -cy))
+
+    z1 = np.arctan2(m01, m00)
+    z2 = np.arctan2(-m01, -m00)
+
+    rolls = np.where(euler1 + np.abs(z1) > euler2 + np.abs(z2), z2, z1)
+
+    return np.where(cy > GIMBAL_EPSILON, rolls, 0.0)
@@ -1,20 +1,55 @@
 from itertools import chain
-from typing import Dict, List, Optional, Tuple, Union
+from mmap import mmap
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
+from ..util.interpolation import INTERPOLATORS, keyframe_indices
+from ..util.numpy_compat import np
 from .enums.gmt_enum import *
 
 
 class GMT:
+    __slots__ = ('name', 'version', 'is_face_gmt', 'animation_list', 'mapped_file')
+
     name: str
     version: GMTVersion
     is_face_gmt: bool
     animation_list: List['GMTAnimation']
 
+    # Memory-mapped file that curve values may reference, only set when read with mmap
+    mapped_file: Optional[mmap]
+
     def __init__(self, name, version):
         self.name = name
         self.version = version
         self.is_face_gmt = False
         self.animation_list = list()
+        self.mapped_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Closes the memory-mapped file this GMT was read from, if there is one.
+        Lazily read curves are decoded and values that are views into the file are copied first,
+        so the GMT stays usable after closing.
+        """
+        if self.mapped_file is not None:
+            for anm in self.animation_list:
+                for bone in anm.bones.values():
+                    for curve in bone.curves_view:
+                        curve.materialize()
+                        curve.copy_arrays()
+
+            self.mapped_file.close()
+            self.mapped_file = None
+
+    def materialize(self):
+        """Decodes the values of all lazily read curves."""
+        for anm in self.animation_list:
+            anm.materialize()
 
     @property
     def animation(self) -> Optional['GMTAnimation']:
@@ -45,7 +80,21 @@ class GMT:
         return str(self)
 
 
+# Values of bones without a curve when sampling an animation
+REST_VALUES = {
+    GMTCurveType.LOCATION: (0.0, 0.0, 0.0),
+    GMTCurveType.ROTATION: (0.0, 0.0, 0.0, 1.0),
+}
+
+DEFAULT_INTERPOLATION = {
+    GMTCurveType.LOCATION: 'lerp',
+    GMTCurveType.ROTATION: 'slerp',
+}
+
+
 class GMTAnimation:
+    __slots__ = ('name', 'frame_rate', 'end_frame', 'bones')
+
     name: str
     frame_rate: float
     end_frame: int
@@ -58,10 +107,69 @@ class GMTAnimation:
         self.bones = dict()
 
     def get_start_frame(self):
-        return max(0, min(0xFF_FF_FF_FF, *map(lambda c: c.get_start_frame(), chain(*map(lambda x: x.curves, self.bones.values())))))
+        """Returns the first frame of the curves with keyframes, or 0 if there are none."""
+        return min(map(GMTCurve.get_start_frame, self.__curves()), default=0)
 
     def get_end_frame(self):
-        return max(0, *map(lambda c: c.get_end_frame(), chain(*map(lambda x: x.curves, self.bones.values()))))
+        return max(map(GMTCurve.get_end_frame, self.__curves()), default=0)
+
+    def get_frame_range(self) -> Tuple[int, int]:
+        """Returns the start and end frames of this animation, going over the curves of all bones only once.
+        Both are 0 if no curve has keyframes.
+        """
+        curves = tuple(self.__curves())
+
+        return (min(map(GMTCurve.get_start_frame, curves), default=0),
+                max(map(GMTCurve.get_end_frame, curves), default=0))
+
+    def __curves(self) -> Iterator['GMTCurve']:
+        # Curves without keyframes do not have a start frame, so they are left out
+        curves = chain.from_iterable(map(lambda x: x.curves_view, self.bones.values()))
+        return filter(lambda x: x.keyframe_count() != 0, curves)
+
+    def sample(self, frames: Union[range, Sequence[float], 'np.ndarray'] = None, curve_type=GMTCurveType.ROTATION,
+               bone_names: List[str] = None, method: str = None) -> 'np.ndarray':
+        """Evaluates the location or rotation curves of many bones at once.
+        Returns an array with shape (F, B, C), with bones in the order of bone_names, or of the bones dict if not given.
+        Bones that do not exist or do not have a curve of the given type use the rest value: (0, 0, 0) for locations,
+        and (0, 0, 0, 1) for rotations.
+        :param frames: Frames to sample, which can be fractional. Defaults to every frame from the start frame to the end frame
+        :param curve_type: GMTCurveType.LOCATION or GMTCurveType.ROTATION
+        :param bone_names: Names of the bones to sample
+        :param method: See GMTCurve.sample
+        :return: The sampled values. Requires NumPy
+        """
+        if curve_type not in REST_VALUES:
+            raise Exception(f'Unsupported curve type for sampling: {curve_type}')
+
+        if frames is None:
+            start_frame, end_frame = self.get_frame_range()
+            frames = range(start_frame, end_frame + 1)
+
+        frames = np.asarray(frames, dtype=np.float64)
+        bone_names = list(self.bones) if bone_names is None else bone_names
+
+        rest_value = np.array(REST_VALUES[curve_type], dtype=np.float64)
+        rest = (np.broadcast_to(rest_value, (len(frames), len(rest_value))),) * 2 + (np.zeros(len(frames)),)
+
+        samples = list()
+        for name in bone_names:
+            bone = self.bones.get(name)
+            curve = None if bone is None else bone.location if curve_type == GMTCurveType.LOCATION else bone.rotation
+
+            samples.append(curve.get_sample_keyframes(frames) if curve is not None and curve.keyframe_count() else rest)
+
+        # Interpolate all bones at once, with the bones as the second axis
+        prev_values, next_values, factors = map(lambda x: np.stack(x, axis=1), zip(*samples)) if samples else \
+            (np.zeros((len(frames), 0, len(rest_value))),) * 2 + (np.zeros((len(frames), 0)),)
+
+        return INTERPOLATORS[method or DEFAULT_INTERPOLATION[curve_type]](prev_values, next_values, factors)
+
+    def materialize(self):
+        """Decodes the values of all lazily read curves in this animation."""
+        for bone in self.bones.values():
+            for curve in bone.curves_view:
+                curve.materialize()
 
     def is_face_anm(self):
         """This is not a very concrete method, but animations with names in this format \"f{num}_param{x}__{xy}\"
@@ -79,28 +187,25 @@ class GMTAnimation:
 
 
 class GMTBone:
+    __slots__ = ('name', '__curve_dict', '__curves_view')
+
     name: str
 
     __curve_dict: Dict[GMTCurveType, 'GMTCurve']
 
+    # Flat tuple of all curves, rebuilt on the next access after the curves are modified
+    __curves_view: Optional[Tuple['GMTCurve', ...]]
+
     def __init__(self, name):
         self.name = name
         self.__curve_dict = dict()
+        self.__curves_view = None
 
     # Curves
     @property
     def curves(self) -> List['GMTCurve']:
         """Returns a copied list containing the curves for this bone. Modifying this does not modify the internal curves dict."""
-        result = list()
-
-        for value in self.__curve_dict.values():
-            # For pattern curves
-            if hasattr(value, '__iter__'):
-                result.extend(value)
-            else:
-                result.append(value)
-
-        return result
+        return list(self.curves_view)
 
     @curves.setter
     def curves(self, val: List['GMTCurve']):
@@ -112,6 +217,42 @@ class GMTBone:
             if pat in self.__curve_dict:
                 self.__curve_dict[pat] = [x for x in val if x.type == pat]
 
+        self.__curves_view = None
+
+    @property
+    def curves_view(self) -> Tuple['GMTCurve', ...]:
+        """Returns a cached tuple containing the curves for this bone, in the same order as curves.
+        The tuple is rebuilt after any curve property is set. Pattern lists that are modified in place after getting
+        them from a pattern property are also picked up, as getting the list invalidates the cache.
+        """
+        if self.__curves_view is None:
+            result = list()
+
+            for value in self.__curve_dict.values():
+                if isinstance(value, GMTCurve):
+                    result.append(value)
+                elif value is not None:
+                    # For pattern curves
+                    result.extend(value)
+
+            self.__curves_view = tuple(result)
+
+        return self.__curves_view
+
+    @property
+    def curve_count(self) -> int:
+        """Returns the number of curves for this bone."""
+        return len(self.curves_view)
+
+    def __set_curve(self, type: GMTCurveType, val):
+        self.__curve_dict[type] = val
+        self.__curves_view = None
+
+    def __get_patterns(self, type: GMTCurveType) -> List['GMTCurve']:
+        # The returned list can be modified by the caller, so the view has to be rebuilt
+        self.__curves_view = None
+        return self.__curve_dict.get(type)
+
     # Location curve
     @property
     def location(self) -> 'GMTCurve':
@@ -119,7 +260,7 @@ class GMTBone:
 
     @location.setter
     def location(self, val: 'GMTCurve'):
-        self.__curve_dict[GMTCurveType.LOCATION] = val
+        self.__set_curve(GMTCurveType.LOCATION, val)
 
     # Rotation curve
     @property
@@ -128,34 +269,34 @@ class GMTBone:
 
     @rotation.setter
     def rotation(self, val: 'GMTCurve'):
-        self.__curve_dict[GMTCurveType.ROTATION] = val
+        self.__set_curve(GMTCurveType.ROTATION, val)
 
     # Hand patterns
     @property
     def patterns_hand(self) -> List['GMTCurve']:
-        return self.__curve_dict.get(GMTCurveType.PATTERN_HAND)
+        return self.__get_patterns(GMTCurveType.PATTERN_HAND)
 
     @patterns_hand.setter
     def patterns_hand(self, val: List['GMTCurve']):
-        self.__curve_dict[GMTCurveType.PATTERN_HAND] = val
+        self.__set_curve(GMTCurveType.PATTERN_HAND, val)
 
     # Face patterns
     @property
     def patterns_face(self) -> List['GMTCurve']:
-        return self.__curve_dict.get(GMTCurveType.PATTERN_FACE)
+        return self.__get_patterns(GMTCurveType.PATTERN_FACE)
 
     @patterns_face.setter
     def patterns_face(self, val: List['GMTCurve']):
-        self.__curve_dict[GMTCurveType.PATTERN_FACE] = val
+        self.__set_curve(GMTCurveType.PATTERN_FACE, val)
 
     # Unknown patterns
     @property
     def patterns_unk(self) -> List['GMTCurve']:
-        return self.__curve_dict.get(GMTCurveType.PATTERN_UNK)
+        return self.__get_patterns(GMTCurveType.PATTERN_UNK)
 
     @patterns_unk.setter
     def patterns_unk(self, val: List['GMTCurve']):
-        self.__curve_dict[GMTCurveType.PATTERN_UNK] = val
+        self.__set_curve(GMTCurveType.PATTERN_UNK, val)
 
     # @property
     # def other_curves(self) -> List['GMTCurve']:
@@ -163,51 +304,204 @@ class GMTBone:
 
 
 class GMTCurve:
+    __slots__ = ('type', 'channel', '__keyframes', '__frames', '__values', '__load_values')
+
     type: GMTCurveType
     channel: GMTCurveChannel
-    keyframes: List['GMTKeyframe']
+
+    __keyframes: Optional[List['GMTKeyframe']]
+    __frames: Optional['np.ndarray']
+    __values: Optional['np.ndarray']
+    __load_values: Optional[Callable[[], Any]]
 
     def __init__(self, type, channel=GMTCurveChannel.ALL):
         self.type = type
         self.channel = channel
-        self.keyframes = list()
+        self.__keyframes = list()
+        self.__frames = None
+        self.__values = None
+        self.__load_values = None
+
+    # Keyframes
+    @property
+    def keyframes(self) -> List['GMTKeyframe']:
+        """Returns the keyframes of this curve.
+        If the curve is array-backed, the keyframes are created on the first access and replace the arrays as the curve's storage.
+        """
+        self.__load()
+
+        if self.__keyframes is None:
+            self.__keyframes = list(map(GMTKeyframe, self.__frames.tolist(), map(tuple, self.__values.tolist())))
+            self.__frames = self.__values = None
+
+        return self.__keyframes
+
+    @keyframes.setter
+    def keyframes(self, val: List['GMTKeyframe']):
+        self.__keyframes = val
+        self.__frames = self.__values = None
+        self.__load_values = None
+
+    def is_array_backed(self) -> bool:
+        """Returns True if the keyframes are stored as arrays and have not been converted to GMTKeyframe objects yet."""
+        self.__load()
+
+        return self.__keyframes is None
+
+    def is_loaded(self) -> bool:
+        """Returns False if the curve was read lazily and its values have not been decoded yet."""
+        return self.__load_values is None
+
+    def materialize(self):
+        """Decodes the values of a lazily read curve. Does nothing if the values are already loaded."""
+        self.__load()
+
+    def get_arrays(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Returns the keyframes as a tuple of a frame array with shape (N,) and a value array with shape (N, C).
+        The returned arrays are the curve's storage if the curve is array-backed, and should not be modified in place.
+        Requires NumPy.
+        """
+        self.__load()
+
+        if self.__keyframes is None:
+            return (self.__frames, self.__values)
+
+        frames = np.array([kf.frame for kf in self.__keyframes], dtype=np.uint16)
+        values = np.array([kf.value for kf in self.__keyframes])
+
+        return (frames, values if values.ndim == 2 else values[:, np.newaxis])
+
+    def set_arrays(self, frames: 'np.ndarray', values: 'np.ndarray'):
+        """Replaces the keyframes with a frame array with shape (N,) and a value array with shape (N, C).
+        A value array with shape (N,) is treated as a single channel. The arrays are stored without copying. Requires NumPy.
+        """
+        if len(frames) != len(values):
+            raise Exception(f'Frame and value counts do not match: {len(frames)} != {len(values)}')
+
+        self.__keyframes = None
+        self.__frames = frames
+        self.__values = values if values.ndim == 2 else values[:, np.newaxis]
+        self.__load_values = None
+
+    def set_lazy(self, frames: Sequence[int], load_values: Callable[[], Any]):
+        """Sets the frames of the curve, and a function that will be called to decode the values the first time they are needed.
+        load_values should return an (N, C) array if frames is an array, or a list of value tuples otherwise.
+        """
+        self.__keyframes = None
+        self.__frames = frames
+        self.__values = None
+        self.__load_values = load_values
+
+    def __load(self):
+        # Another thread may finish loading the same curve in the meantime, which resets the attributes
+        load_values, frames = self.__load_values, self.__frames
+        if load_values is not None:
+            values = load_values()
+
+            if np is not None and isinstance(values, np.ndarray):
+                self.set_arrays(frames, values)
+            else:
+                self.keyframes = list(map(GMTKeyframe, frames, values))
+
+    def copy_arrays(self):
+        """Replaces the arrays of an array-backed curve with native-endian copies if they do not own their data,
+        so that they no longer reference the buffer they were read from.
+        """
+        if self.__keyframes is None and self.__values is not None:
+            if not self.__frames.flags.owndata:
+                self.__frames = self.__frames.astype(self.__frames.dtype.newbyteorder('='))
+
+            if not self.__values.flags.owndata:
+                self.__values = self.__values.astype(self.__values.dtype.newbyteorder('='))
 
     def get_start_frame(self):
-        return self.keyframes[0].frame if len(self.keyframes) else 0
+        if self.__keyframes is None:
+            return int(self.__frames[0]) if len(self.__frames) else 0
+
+        return self.__keyframes[0].frame if len(self.__keyframes) else 0
 
     def get_end_frame(self):
-        return self.keyframes[-1].frame if len(self.keyframes) else 0
+        if self.__keyframes is None:
+            return int(self.__frames[-1]) if len(self.__frames) else 0
+
+        return self.__keyframes[-1].frame if len(self.__keyframes) else 0
+
+    def keyframe_count(self) -> int:
+        """Returns the number of keyframes, without creating GMTKeyframe objects or decoding lazily read values."""
+        return len(self.__frames) if self.__keyframes is None else len(self.__keyframes)
+
+    def sample(self, frames: Union[Sequence[float], 'np.ndarray'], method: str = None) -> 'np.ndarray':
+        """Evaluates the curve at the given frames, which can be fractional. Frames outside of the keyframes are clamped.
+        Returns an array with shape (F, C). Partial location and rotation channels are expanded to all components, the same way
+        as fill_channels does, but without modifying the curve.
+        :param frames: Frames to sample
+        :param method: One of 'step', 'lerp', 'nlerp' or 'slerp'. Defaults to slerp for rotations, lerp for locations,
+        and step for patterns
+        :return: The sampled values. Requires NumPy
+        """
+        prev_values, next_values, factors = self.get_sample_keyframes(np.asarray(frames, dtype=np.float64))
+
+        return INTERPOLATORS[method or DEFAULT_INTERPOLATION.get(self.type, 'step')](prev_values, next_values, factors)
+
+    def get_sample_keyframes(self, frames: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """Finds the keyframes surrounding each frame using a binary search.
+        Returns the values of the previous and next keyframes with all components, and the interpolation factor between them.
+        """
+        if not self.keyframe_count():
+            raise Exception('Cannot sample a curve without keyframes')
+
+        keyframe_frames, values = self.get_arrays()
 
-    def fill_channels(self):
         if self.channel != GMTCurveChannel.ALL:
-            if self.type == GMTCurveType.LOCATION:
-                if self.channel == GMTCurveChannel.X:
-                    for kf in self.keyframes:
-                        kf.value = (kf.value[0], 0.0, 0.0)
-                elif self.channel == GMTCurveChannel.Y:
-                    for kf in self.keyframes:
-                        kf.value = (0.0, kf.value[0], 0.0)
-                elif self.channel == GMTCurveChannel.Z:
-                    for kf in self.keyframes:
-                        kf.value = (0.0, 0.0, kf.value[0])
-                else:
-                    raise Exception(f'Incompatible channel value: {self.channel}')
-
-                self.channel = GMTCurveChannel.ALL
-            elif self.type == GMTCurveType.ROTATION:
-                if self.channel == GMTCurveChannel.XW:
-                    for kf in self.keyframes:
-                        kf.value = (kf.value[0], 0.0, 0.0, kf.value[1])
-                elif self.channel == GMTCurveChannel.YW:
-                    for kf in self.keyframes:
-                        kf.value = (0.0, kf.value[0], 0.0, kf.value[1])
-                elif self.channel == GMTCurveChannel.ZW:
-                    for kf in self.keyframes:
-                        kf.value = (0.0, 0.0, kf.value[0], kf.value[1])
-                else:
-                    raise Exception(f'Incompatible channel value: {self.channel}')
-
-                self.channel = GMTCurveChannel.ALL
+            columns, default = self.__get_channel_columns()
+
+            full_values = np.zeros((len(values), len(default)))
+            full_values[:, columns] = values
+            values = full_values
+
+        prev, following, factors = keyframe_indices(keyframe_frames, frames)
+
+        return (values[prev], values[following], factors)
+
+    def fill_channels(self):
+        if self.channel != GMTCurveChannel.ALL and self.type in [GMTCurveType.LOCATION, GMTCurveType.ROTATION]:
+            self.__fill_channels(*self.__get_channel_columns())
+            self.channel = GMTCurveChannel.ALL
+
+    def __get_channel_columns(self) -> Tuple[Tuple[int], Tuple[float]]:
+        """Returns the columns of the components of a partial channel in a full value, and the default full value."""
+        if self.type == GMTCurveType.LOCATION:
+            if self.channel == GMTCurveChannel.X:
+                return ((0,), (0.0, 0.0, 0.0))
+            elif self.channel == GMTCurveChannel.Y:
+                return ((1,), (0.0, 0.0, 0.0))
+            elif self.channel == GMTCurveChannel.Z:
+                return ((2,), (0.0, 0.0, 0.0))
+        elif self.type == GMTCurveType.ROTATION:
+            if self.channel == GMTCurveChannel.XW:
+                return ((0, 3), (0.0, 0.0, 0.0, 0.0))
+            elif self.channel == GMTCurveChannel.YW:
+                return ((1, 3), (0.0, 0.0, 0.0, 0.0))
+            elif self.channel == GMTCurveChannel.ZW:
+                return ((2, 3), (0.0, 0.0, 0.0, 0.0))
+
+        raise Exception(f'Incompatible channel value: {self.channel}')
+
+    def __fill_channels(self, columns: Tuple[int], default: Tuple[float]):
+        """Expands each value to the length of default, placing the existing components at the given columns."""
+        self.__load()
+
+        if self.__keyframes is None:
+            values = np.zeros((len(self.__values), len(default)))
+            values[:, columns] = self.__values
+            self.__values = values
+        else:
+            for kf in self.__keyframes:
+                value = list(default)
+                for column, component in zip(columns, kf.value):
+                    value[column] = component
+
+                kf.value = tuple(value)
 
     @classmethod
     def new_location_curve(cls) -> 'GMTCurve':
@@ -223,6 +517,8 @@ class GMTCurve:
 
 
 class GMTKeyframe:
+    __slots__ = ('frame', 'value')
+
     frame: int
     value: Tuple[Union[int, float]]
 
@@ -2,6 +2,8 @@ from typing import List, Tuple
 
 
 class IFA:
+    __slots__ = ('bone_list',)
+
     bone_list: List['IFABone']
 
     def __init__(self, bone_list=None):
@@ -9,6 +11,8 @@ class IFA:
 
 
 class IFABone:
+    __slots__ = ('name', 'parent_name', 'location', 'rotation')
+
     name: str
     parent_name: str
 
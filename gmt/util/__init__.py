@@ -1,2 +1,4 @@
 from .binary_reader.binary_reader import *
 from .iterative_dict import IterativeDict
+from .mapped_binary_reader import MappedBinaryReader
+from .numpy_compat import HAS_NUMPY, np
@@ -0,0 +1,74 @@
+from typing import Tuple
+
+from .numpy_compat import np
+
+# Above this dot product, the angle between two quaternions is small enough for slerp to be replaced by nlerp
+SLERP_DOT_THRESHOLD = 0.9995
+
+
+def keyframe_indices(frames: 'np.ndarray', sample_frames: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """Finds the keyframes surrounding each sample frame using a binary search on the sorted keyframe frames.
+    Returns the indices of the previous and next keyframes, and the interpolation factor between them.
+    Sample frames outside of the keyframes are clamped to the first or last keyframe.
+    """
+    last = len(frames) - 1
+    prev = np.clip(np.searchsorted(frames, sample_frames, side='right') - 1, 0, last)
+    following = np.minimum(prev + 1, last)
+
+    prev_frames = frames[prev].astype(np.float64)
+    span = frames[following].astype(np.float64) - prev_frames
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(span > 0, (sample_frames - prev_frames) / span, 0.0)
+
+    return (prev, following, np.clip(t, 0.0, 1.0))
+
+
+def step(a: 'np.ndarray', b: 'np.ndarray', t: 'np.ndarray') -> 'np.ndarray':
+    """Holds the previous value until the next keyframe."""
+    return np.where((t < 1.0)[..., np.newaxis], a, b)
+
+
+def lerp(a: 'np.ndarray', b: 'np.ndarray', t: 'np.ndarray') -> 'np.ndarray':
+    """Linearly interpolates between arrays of values with shape (..., C), with t having shape (...)."""
+    return a + (b - a) * t[..., np.newaxis]
+
+
+def nlerp(a: 'np.ndarray', b: 'np.ndarray', t: 'np.ndarray') -> 'np.ndarray':
+    """Linearly interpolates between arrays of quaternions, taking the shortest path, and normalizes the result."""
+    b = np.where((np.sum(a * b, axis=-1) < 0.0)[..., np.newaxis], -b, b)
+
+    return normalize(lerp(a, b, t))
+
+
+def slerp(a: 'np.ndarray', b: 'np.ndarray', t: 'np.ndarray') -> 'np.ndarray':
+    """Spherically interpolates between arrays of quaternions with shape (..., 4), taking the shortest path.
+    Quaternions that are very close to each other are interpolated with nlerp instead.
+    """
+    dot = np.sum(a * b, axis=-1)
+    b = np.where((dot < 0.0)[..., np.newaxis], -b, b)
+    dot = np.abs(dot)
+
+    close = dot > SLERP_DOT_THRESHOLD
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.where(close, 1.0, np.sin(theta))
+
+    weight_a = np.where(close, 1.0 - t, np.sin((1.0 - t) * theta) / sin_theta)
+    weight_b = np.where(close, t, np.sin(t * theta) / sin_theta)
+
+    return normalize(a * weight_a[..., np.newaxis] + b * weight_b[..., np.newaxis])
+
+
+def normalize(q: 'np.ndarray') -> 'np.ndarray':
+    """Normalizes an array of vectors with shape (..., C), leaving zero length vectors as they are."""
+    length = np.linalg.norm(q, axis=-1, keepdims=True)
+
+    return q / np.where(length > 0.0, length, 1.0)
+
+
+INTERPOLATORS = {
+    'step': step,
+    'lerp': lerp,
+    'nlerp': nlerp,
+    'slerp': slerp,
+}
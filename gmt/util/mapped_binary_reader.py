@@ -0,0 +1,26 @@
+from .binary_reader.binary_reader import BinaryReader, Endian, Whence
+
+
+class MappedBinaryReader(BinaryReader):
+    """A read-only BinaryReader that reads directly from an existing buffer (such as an mmap) instead of copying it.\n
+    If keep_views is True, array readers will return views into the buffer instead of copies where possible.
+    """
+    keep_views: bool
+
+    def __init__(self, buffer, endianness: Endian = Endian.LITTLE, encoding='utf-8', keep_views=False):
+        super().__init__(endianness=endianness, encoding=encoding)
+
+        # BinaryReader always copies the buffer it is given, so replace it after construction
+        self._BinaryReader__buf = memoryview(buffer)
+        self.keep_views = keep_views
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Views returned by read_view stay valid after releasing this one
+        self._BinaryReader__buf.release()
+
+    def read_view(self, size) -> memoryview:
+        """Returns a memoryview of the given size from the current position, without copying."""
+        pos = self.pos()
+        self.seek(size, Whence.CUR)
+
+        return self._BinaryReader__buf[pos: pos + size]
@@ -0,0 +1,7 @@
+try:
+    import numpy as np
+except ImportError:
+    # NumPy ships with Blender, but it is not required for using the library elsewhere
+    np = None
+
+HAS_NUMPY = np is not None
@@ -0,0 +1,35 @@
+from .numpy_compat import np
+
+# All quaternions are (x, y, z, w), the same order as GMT rotation values
+
+
+def quat_multiply(a: 'np.ndarray', b: 'np.ndarray') -> 'np.ndarray':
+    """Multiplies arrays of quaternions with shape (..., 4). The result rotates by b first, then by a."""
+    ax, ay, az, aw = np.moveaxis(a, -1, 0)
+    bx, by, bz, bw = np.moveaxis(b, -1, 0)
+
+    return np.stack((
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+        aw * bw - ax * bx - ay * by - az * bz,
+    ), axis=-1)
+
+
+def quat_rotate(q: 'np.ndarray', v: 'np.ndarray') -> 'np.ndarray':
+    """Rotates an array of vectors with shape (..., 3) by an array of unit quaternions with shape (..., 4)."""
+    xyz, w = q[..., :3], q[..., 3:]
+    t = 2.0 * np.cross(xyz, v)
+
+    return v + w * t + np.cross(xyz, t)
+
+
+def quat_to_matrix(q: 'np.ndarray') -> 'np.ndarray':
+    """Converts an array of unit quaternions with shape (..., 4) to rotation matrices with shape (..., 3, 3)."""
+    x, y, z, w = np.moveaxis(q, -1, 0)
+
+    return np.stack((
+        np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)), axis=-1),
+        np.stack((2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)), axis=-1),
+        np.stack((2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)), axis=-1),
+    ), axis=-2)
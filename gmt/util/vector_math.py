@@ -0,0 +1,284 @@
+"""Pure-Python replacement for the parts of mathutils used by CMT frames.
+
+mathutils is only available inside Blender (or with the bpy module), so the library does not import it when it is
+imported itself. The first vector or quaternion that is created tries to import it once, and the results are
+mathutils types if it is available, or the read-only Vector and Quaternion types of this module otherwise.
+Functions of this module accept both, as well as any other sequence of floats.
+
+Quaternions are (w, x, y, z), like mathutils.Quaternion. The math follows Blender's, but is done in double precision.
+"""
+
+import math
+import operator
+from functools import lru_cache
+from importlib import import_module
+from typing import Sequence, Tuple
+
+# Same threshold as Blender's vec_to_quat, below which the track vector is considered parallel to the track axis
+TRACK_EPSILON = 1e-4
+
+# Same threshold as Blender's mat3_normalized_to_eul2, below which the Euler angles are in gimbal lock
+GIMBAL_EPSILON = 16 * 1.1920928955078125e-07
+
+# Angle of a vector opposite the track axis. Blender's acos is single precision, where it is slightly more than pi, so
+# the w of the half turn is slightly negative. That sign decides the up rotation when the track axis is Z
+TRACK_HALF_TURN = 3.1415927410125732
+
+# Largest cosine that is -1 in single precision, below which a vector is opposite the track axis for Blender
+TRACK_HALF_TURN_COSINE = -1.0 + 2 ** -25
+
+# Min distance between the camera and its focus point, to avoid having a 0 length vector
+MIN_DISTANCE = 0.001
+
+
+class Vector(tuple):
+    """Read-only 3D vector, used instead of mathutils.Vector when mathutils is not available."""
+
+    __slots__ = ()
+
+    def __new__(cls, values: Sequence[float] = (0.0, 0.0, 0.0)):
+        return super().__new__(cls, map(float, values))
+
+    @property
+    def x(self) -> float:
+        return self[0]
+
+    @property
+    def y(self) -> float:
+        return self[1]
+
+    @property
+    def z(self) -> float:
+        return self[2]
+
+    @property
+    def length(self) -> float:
+        return math.sqrt(dot(self, self))
+
+    def normalized(self) -> 'Vector':
+        return Vector(normalize(self))
+
+    def __add__(self, other: Sequence[float]) -> 'Vector':
+        return Vector(map(operator.add, self, other))
+
+    def __sub__(self, other: Sequence[float]) -> 'Vector':
+        return Vector(map(operator.sub, self, other))
+
+    def __mul__(self, scalar: float) -> 'Vector':
+        return Vector(map(lambda x: x * scalar, self))
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> 'Vector':
+        return Vector(map(operator.neg, self))
+
+    def __repr__(self) -> str:
+        return f'Vector({tuple(self)})'
+
+
+class Quaternion(tuple):
+    """Read-only (w, x, y, z) quaternion, used instead of mathutils.Quaternion when mathutils is not available."""
+
+    __slots__ = ()
+
+    def __new__(cls, values: Sequence[float] = (1.0, 0.0, 0.0, 0.0)):
+        return super().__new__(cls, map(float, values))
+
+    @property
+    def w(self) -> float:
+        return self[0]
+
+    @property
+    def x(self) -> float:
+        return self[1]
+
+    @property
+    def y(self) -> float:
+        return self[2]
+
+    @property
+    def z(self) -> float:
+        return self[3]
+
+    def normalized(self) -> 'Quaternion':
+        return Quaternion(normalize_quat(self))
+
+    def inverted(self) -> 'Quaternion':
+        return Quaternion(invert_quat(self))
+
+    def __matmul__(self, other: Sequence[float]):
+        """Multiplies by another quaternion, or rotates a 3D vector."""
+        if len(other) == 3:
+            return Vector(rotate_vector(self, other))
+
+        return Quaternion(multiply_quat(self, other))
+
+    def __repr__(self) -> str:
+        return f'Quaternion({tuple(self)})'
+
+
+@lru_cache(maxsize=None)
+def get_mathutils():
+    """Returns the mathutils module, or None if it is not available. The import is only attempted on the first call."""
+    try:
+        return import_module('mathutils')
+    except ImportError:
+        return None
+
+
+def vector_type() -> type:
+    """Returns mathutils.Vector if mathutils is available, or Vector otherwise."""
+    mathutils = get_mathutils()
+    return Vector if mathutils is None else mathutils.Vector
+
+
+def quaternion_type() -> type:
+    """Returns mathutils.Quaternion if mathutils is available, or Quaternion otherwise."""
+    mathutils = get_mathutils()
+    return Quaternion if mathutils is None else mathutils.Quaternion
+
+
+def has_mathutils() -> bool:
+    """Returns True if mathutils is available. Imports it on the first call."""
+    return get_mathutils() is not None
+
+
+def to_vector(values: Sequence[float]):
+    """Creates a mathutils.Vector if mathutils is available, or a Vector otherwise."""
+    return vector_type()(values)
+
+
+def to_quaternion(values: Sequence[float]):
+    """Creates a mathutils.Quaternion if mathutils is available, or a Quaternion otherwise."""
+    return quaternion_type()(values)
+
+
+def dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def normalize(v: Sequence[float]) -> Tuple[float, ...]:
+    """Returns the vector scaled to a length of 1, or the zero vector unchanged."""
+    length = math.sqrt(dot(v, v))
+    return tuple(map(lambda x: x / length, v)) if length > 0.0 else tuple(map(float, v))
+
+
+def normalize_quat(q: Sequence[float]) -> Tuple[float, float, float, float]:
+    """Returns the quaternion scaled to a length of 1. Like Blender, a zero quaternion becomes (0, 1, 0, 0)."""
+    length = math.sqrt(dot(q, q))
+    return tuple(map(lambda x: x / length, q)) if length > 0.0 else (0.0, 1.0, 0.0, 0.0)
+
+
+def invert_quat(q: Sequence[float]) -> Tuple[float, float, float, float]:
+    length_squared = dot(q, q)
+    if length_squared == 0.0:
+        return tuple(map(float, q))
+
+    w, x, y, z = q
+    return (w / length_squared, -x / length_squared, -y / length_squared, -z / length_squared)
+
+
+def multiply_quat(a: Sequence[float], b: Sequence[float]) -> Tuple[float, float, float, float]:
+    """Multiplies two quaternions. The result rotates by b first, then by a."""
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+
+    return (aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw)
+
+
+def rotate_vector(q: Sequence[float], v: Sequence[float]) -> Tuple[float, float, float]:
+    """Rotates a 3D vector by a quaternion. Like mathutils, non unit quaternions also scale the vector."""
+    w, x, y, z = q
+    vx, vy, vz = v
+
+    # q * v * conjugate(q), expanded
+    tw = -x * vx - y * vy - z * vz
+    tx = w * vx + y * vz - z * vy
+    ty = w * vy + z * vx - x * vz
+    tz = w * vz + x * vy - y * vx
+
+    return (-tw * x + tx * w - ty * z + tz * y,
+            -tw * y + ty * w - tz * x + tx * z,
+            -tw * z + tz * w - tx * y + ty * x)
+
+
+def euler_z_to_quat(angle: float) -> Tuple[float, float, float, float]:
+    """Same as Euler((0, 0, angle)).to_quaternion()."""
+    return (math.cos(angle * 0.5), 0.0, 0.0, math.sin(angle * 0.5))
+
+
+def quat_to_euler_z(q: Sequence[float]) -> float:
+    """Same as Quaternion.to_euler().z with the default XYZ order. Like Blender, the solution with the smallest angles
+    is chosen out of the two possible ones.
+    """
+    w, x, y, z = normalize_quat(q)
+
+    m00 = 1 - 2 * (y * y + z * z)
+    m01 = 2 * (w * z + x * y)
+    m02 = 2 * (x * z - w * y)
+    m12 = 2 * (w * x + y * z)
+    m22 = 1 - 2 * (x * x + y * y)
+
+    cy = math.hypot(m00, m01)
+    if cy <= GIMBAL_EPSILON:
+        return 0.0
+
+    z1 = math.atan2(m01, m00)
+    z2 = math.atan2(-m01, -m00)
+
+    euler1 = abs(math.atan2(m12, m22)) + abs(math.atan2(-m02, cy)) + abs(z1)
+    euler2 = abs(math.atan2(-m12, -m22)) + abs(math.atan2(-m02, -cy)) + abs(z2)
+
+    return z2 if euler1 > euler2 else z1
+
+
+def track_quat(v: Sequence[float], track: str, up: str) -> Tuple[float, float, float, float]:
+    """Same as Vector.to_track_quat, for the positive X, Y and Z axes. Follows Blender's vec_to_quat.
+    :param v: The vector to point the track axis to
+    :param track: Track axis, 'X', 'Y' or 'Z'
+    :param up: Up axis, 'X', 'Y' or 'Z'. Must be different from the track axis
+    :return: The rotation as a (w, x, y, z) tuple
+    """
+    axis, up_axis = 'XYZ'.index(track), 'XYZ'.index(up)
+    if axis == up_axis:
+        raise Exception(f'Track and up axis cannot be the same: {track}')
+
+    x, y, z = map(float, v)
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0.0:
+        return (1.0, 0.0, 0.0, 0.0)
+
+    # Rotate the track axis onto the vector, around the axis perpendicular to both
+    if axis == 0:
+        normal = (0.0, 1.0 if abs(y) + abs(z) < TRACK_EPSILON else -z, y)
+    elif axis == 1:
+        normal = (z, 0.0, 1.0 if abs(x) + abs(z) < TRACK_EPSILON else -x)
+    else:
+        normal = (1.0 if abs(x) + abs(y) < TRACK_EPSILON else -y, x, 0.0)
+
+    cosine = (x, y, z)[axis] / length
+    half_angle = 0.5 * (TRACK_HALF_TURN if cosine <= TRACK_HALF_TURN_COSINE else math.acos(min(1.0, cosine)))
+    sin_half = math.sin(half_angle)
+    nx, ny, nz = normalize(normal)
+    qw, qx, qy, qz = (math.cos(half_angle), nx * sin_half, ny * sin_half, nz * sin_half)
+
+    # Then rotate around the vector, so that the up axis points up as much as possible
+    fx = 2 * (qx * qz + qw * qy)
+    fy = 2 * (qy * qz - qw * qx)
+    fz = 1 - 2 * (qx * qx + qy * qy)
+
+    up_angle = {
+        (0, 1): 0.5 * math.atan2(fz, fy),
+        (0, 2): -0.5 * math.atan2(fy, fz),
+        (1, 0): -0.5 * math.atan2(fz, fx),
+        (1, 2): 0.5 * math.atan2(fx, fz),
+        (2, 0): 0.5 * math.atan2(-fy, -fx),
+        (2, 1): -0.5 * math.atan2(-fx, -fy),
+    }[(axis, up_axis)]
+
+    sin_up = math.sin(up_angle) / length
+    return multiply_quat((math.cos(up_angle), x * sin_up, y * sin_up, z * sin_up), (qw, qx, qy, qz))
+
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from ..benchmarks.generators import build_gmt
+from ..gmt.batch import find_root, reencode, run_batch
+from ..gmt.gmt_writer import write_gmt
+from ..gmt.structure.enums.gmt_enum import GMTCurveFormat, GMTVersion
+
+
+def test_reencode_keeps_subdirectories(tmp_path):
+    source = tmp_path / 'source'
+    data = write_gmt(build_gmt(GMTVersion.YAKUZA5, 2, 5, GMTCurveFormat.ROT_XYZW_SHORT))
+
+    # Files with the same name in different subdirectories
+    for directory in ('a', os.path.join('b', 'c')):
+        os.makedirs(source / directory)
+        with open(source / directory / 'anm.gmt', 'wb') as f:
+            f.write(data)
+
+    output = str(tmp_path / 'output')
+    transform = lambda x: reencode(x, output, source_root=find_root(str(source)))
+
+    results = list(run_batch(str(source), transform, workers=0))
+
+    assert all(map(lambda x: x.ok, results))
+    assert sorted(map(lambda x: x.result, results)) == [os.path.join(output, 'a', 'anm.gmt'),
+                                                       os.path.join(output, 'b', 'c', 'anm.gmt')]
+    assert all(map(os.path.isfile, map(lambda x: x.result, results)))
+
+
+def test_find_root():
+    assert find_root(os.path.join('source', '**', '*.gmt')) == 'source'
+    assert find_root(os.path.join('source', 'a', '*.gmt')) == os.path.join('source', 'a')
+    assert find_root('*.gmt') == os.curdir
+
+
+@pytest.mark.parametrize('chunk_size', [0, -1])
+def test_run_batch_rejects_empty_chunks(chunk_size):
+    with pytest.raises(ValueError):
+        next(run_batch(['anm.gmt'], os.path.basename, workers=0, chunk_size=chunk_size))
+
+
+def exit_on_crash(path: str) -> str:
+    # Kills the worker process without raising an exception in it
+    if 'crash' in path:
+        os._exit(1)
+
+    return path
+
+
+def test_run_batch_survives_dead_worker():
+    files = [f'file_{i}.gmt' for i in range(6)] + ['crash.gmt']
+
+    results = list(run_batch(files, exit_on_crash, workers=2, chunk_size=1))
+
+    assert sorted(map(lambda x: x.path, results)) == sorted(files)
+
+    crashed = next(filter(lambda x: x.path == 'crash.gmt', results))
+    assert not crashed.ok and 'BrokenProcessPool' in crashed.error
+
+    # Files that completed before the pool broke keep their results
+    assert all(map(lambda x: x.result == x.path, filter(lambda x: x.ok, results)))
+
+
+def unpicklable_result(path: str):
+    # Lambdas cannot be pickled back to the main process
+    return lambda: path
+
+
+def test_run_batch_unpicklable_result():
+    results = list(run_batch(['a.gmt', 'b.gmt'], unpicklable_result, workers=1))
+
+    assert len(results) == 2 and not any(map(lambda x: x.ok, results))
@@ -0,0 +1,114 @@
+import struct
+from math import sqrt
+
+import numpy as np
+import pytest
+
+from ..gmt.structure.br import br_cmt
+from ..gmt.structure.br.br_cmt import BrCMTAnimation
+from ..gmt.structure.enums.cmt_enum import CMTFormat
+from ..gmt.util import BinaryReader, Endian, MappedBinaryReader
+
+COUNT = 23
+HEADER_SIZE = 0x10
+
+# Layout of each frame format, as read frame by frame before the frame tables were decoded in bulk
+FRAME_LAYOUTS = {
+    CMTFormat.ROT_FLOAT: '3f f 4f',
+    CMTFormat.DIST_ROT_SHORT: '3f f f I 4h',
+    CMTFormat.DIST_ROT_XYZ: '3f f f 3f',
+    CMTFormat.FOC_ROLL: '3f f 3f f',
+}
+
+ENDIANS = [Endian.LITTLE, Endian.BIG]
+
+
+def random_frame(frame_format: CMTFormat, rng) -> tuple:
+    values = list(rng.uniform(-10.0, 10.0, size=4))
+
+    if frame_format == CMTFormat.ROT_FLOAT:
+        values.extend(rng.uniform(-1.0, 1.0, size=4))
+    elif frame_format == CMTFormat.DIST_ROT_SHORT:
+        values.extend((rng.uniform(0.0, 10.0), 0, *rng.integers(-16_384, 16_385, size=4).tolist()))
+    elif frame_format == CMTFormat.DIST_ROT_XYZ:
+        values.extend((rng.uniform(0.0, 10.0), *rng.uniform(-0.6, 0.6, size=3)))
+    else:
+        values.extend(rng.uniform(-10.0, 10.0, size=4))
+
+    return tuple(values)
+
+
+def encode_animation(frame_format: CMTFormat, clip_range: bool, endianness: Endian, seed=0) -> bytes:
+    rng = np.random.default_rng(seed)
+    prefix = '>' if endianness else '<'
+    anm_format = frame_format | CMTFormat.CLIP_RANGE if clip_range else frame_format
+
+    data = struct.pack(prefix + 'fIII', 30.0, COUNT, HEADER_SIZE, int(anm_format))
+    data += b''.join(struct.pack(prefix + FRAME_LAYOUTS[frame_format], *random_frame(frame_format, rng)) for _ in range(COUNT))
+
+    if clip_range:
+        data += struct.pack(f'{prefix}{COUNT * 2}f', *rng.uniform(0.1, 1000.0, size=COUNT * 2))
+
+    return data
+
+
+def read_frames(data: bytes, frame_format: CMTFormat, clip_range: bool, endianness: Endian) -> dict:
+    """Reads the frames one by one, the same way as the per-frame readers did."""
+    prefix = '>' if endianness else '<'
+    layout = prefix + FRAME_LAYOUTS[frame_format]
+    columns = {'locations': [], 'fovs': [], 'distances': [], 'rotations': [], 'focus_points': [], 'rolls': []}
+
+    for values in struct.iter_unpack(layout, data[HEADER_SIZE: HEADER_SIZE + struct.calcsize(layout) * COUNT]):
+        columns['locations'].append(values[:3])
+        columns['fovs'].append(values[3])
+
+        if frame_format == CMTFormat.ROT_FLOAT:
+            columns['rotations'].append(values[4:8])
+        elif frame_format == CMTFormat.DIST_ROT_SHORT:
+            columns['distances'].append(values[4])
+            columns['rotations'].append(tuple(map(lambda x: x / 16_384, values[6:10])))
+        elif frame_format == CMTFormat.DIST_ROT_XYZ:
+            w = 1.0 - sum(map(lambda a: a ** 2, values[5:8]))
+            columns['distances'].append(values[4])
+            columns['rotations'].append((*values[5:8], sqrt(w) if w > 0 else 0))
+        else:
+            columns['focus_points'].append(values[4:7])
+            columns['rolls'].append(values[7])
+
+    columns = {name: (values or None) for name, values in columns.items()}
+
+    columns['clip_ranges'] = None
+    if clip_range:
+        offset = HEADER_SIZE + struct.calcsize(layout) * COUNT
+        columns['clip_ranges'] = list(struct.iter_unpack(prefix + '2f', data[offset: offset + COUNT * 8]))
+
+    return columns
+
+
+@pytest.mark.parametrize('has_numpy', [True, False], ids=['numpy', 'struct'])
+@pytest.mark.parametrize('reader', [BinaryReader, MappedBinaryReader], ids=lambda x: x.__name__)
+@pytest.mark.parametrize('endianness', ENDIANS, ids=lambda x: x.name)
+@pytest.mark.parametrize('clip_range', [False, True], ids=['frames', 'clip_range'])
+@pytest.mark.parametrize('frame_format', list(FRAME_LAYOUTS), ids=lambda x: x.name)
+def test_read_columns_matches_frame_layout(monkeypatch, frame_format, clip_range, endianness, reader, has_numpy):
+    monkeypatch.setattr(br_cmt, 'HAS_NUMPY', has_numpy)
+
+    data = encode_animation(frame_format, clip_range, endianness)
+    expected = read_frames(data, frame_format, clip_range, endianness)
+
+    with reader(data, endianness) as br:
+        br_anm: BrCMTAnimation = br.read_struct(BrCMTAnimation, None, endianness)
+
+    assert br_anm.frame_count == COUNT and br_anm.format & 0xFFFF == frame_format
+
+    for name, values in expected.items():
+        column = getattr(br_anm, name)
+
+        if values is None:
+            assert column is None, name
+            continue
+
+        assert isinstance(column, np.ndarray) == has_numpy, name
+
+        # Values are compared bit for bit
+        assert np.asarray(column, dtype=np.float64).tobytes() == np.asarray(values, dtype=np.float64).tobytes(), name
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from ..benchmarks.generators import build_gmt
+from ..gmt.gmt_patcher import GMTPatcher
+from ..gmt.gmt_writer import write_gmt
+from ..gmt.structure.br.br_gmt import BrGMT
+from ..gmt.structure.br.br_gmt_anm_data import quantize_quat_xyz_int
+from ..gmt.structure.enums.gmt_enum import GMTCurveFormat, GMTCurveType, GMTVectorVersion, GMTVersion
+from ..gmt.structure.gmt import GMTBone, GMTCurve
+from ..gmt.util import MappedBinaryReader
+
+
+def build_vector_gmt(version: GMTVersion, vector_version: GMTVectorVersion):
+    gmt = build_gmt(version, 3, 10)
+
+    # Old vector files are detected by their scale bone
+    if vector_version == GMTVectorVersion.OLD_VECTOR:
+        for anm in gmt.animation_list:
+            bone = anm.bones.pop(next(iter(anm.bones)))
+            bone.name = 'scale'
+            anm.bones[bone.name] = bone
+
+    assert gmt.vector_version == vector_version
+    return gmt
+
+
+def rotation_formats(data):
+    with MappedBinaryReader(data) as br:
+        br_gmt: BrGMT = br.read_struct(BrGMT)
+
+    return set(map(lambda x: x.format, filter(lambda x: x.type == GMTCurveType.ROTATION, br_gmt.curves)))
+
+
+@pytest.mark.parametrize('version, vector_version, compressed', [
+    (GMTVersion.YAKUZA5, GMTVectorVersion.NO_VECTOR, False),
+    (GMTVersion.ISHIN, GMTVectorVersion.OLD_VECTOR, False),
+    (GMTVersion.ISHIN, GMTVectorVersion.DRAGON_VECTOR, True),
+    (GMTVersion.DE2, GMTVectorVersion.OLD_VECTOR, False),
+    (GMTVersion.DE2, GMTVectorVersion.DRAGON_VECTOR, True),
+], ids=lambda x: getattr(x, 'name', str(x)))
+def test_compress_rotations_follows_vector_version(version, vector_version, compressed):
+    gmt = build_vector_gmt(version, vector_version)
+    data = write_gmt(gmt, compress_rotations=True)
+
+    assert (GMTCurveFormat.ROT_QUAT_XYZ_INT in rotation_formats(data)) == compressed
+
+    # The patcher detects the vector version from the file
+    patcher = GMTPatcher(write_gmt(gmt))
+    assert patcher.vector_version == vector_version
+
+    bone = next(iter(gmt.animation_list[0].bones.values()))
+    curve = next(filter(lambda x: x.type == GMTCurveType.ROTATION, bone.curves))
+    patcher.replace_curve(0, bone.name, curve, compress_rotations=True)
+
+    assert (GMTCurveFormat.ROT_QUAT_XYZ_INT in rotation_formats(patcher.to_bytes())) == compressed
+
+
+class MultiRotationBone(GMTBone):
+    """Bone with several full rotation curves, which GMTBone only allows one of, but the file format does not."""
+
+    def __init__(self, name, curves):
+        super().__init__(name)
+        self.rotation_curves = tuple(curves)
+
+    @property
+    def curves_view(self):
+        return self.rotation_curves
+
+
+def test_quantization_errors_per_curve():
+    gmt = build_gmt(GMTVersion.DE2, 2, 30, animations=2)
+    frames = np.arange(30, dtype=np.uint16)
+
+    # Two rotation curves with different ranges, so that they are quantized with different errors
+    curves = list()
+    for speed in (0.05, 0.5):
+        angles = frames * speed
+        curve = GMTCurve(GMTCurveType.ROTATION)
+        curve.set_arrays(frames, np.column_stack((np.sin(angles), np.zeros((30, 2)), np.cos(angles))))
+        curves.append(curve)
+
+    anm = gmt.animation_list[1]
+    anm.bones['multi'] = MultiRotationBone('multi', curves)
+
+    errors = dict()
+    write_gmt(gmt, compress_rotations=True, quantization_errors=errors)
+
+    expected_errors = list(map(lambda x: quantize_quat_xyz_int(x.get_arrays()[1])[3], curves))
+    assert errors[(anm.name, 'multi', 0)] == expected_errors[0]
+    assert errors[(anm.name, 'multi', 1)] == expected_errors[1]
+    assert expected_errors[0] != expected_errors[1]
+
+    # Every other bone has one quantized rotation curve, at its index in the bone's curves
+    for a in gmt.animation_list:
+        for bone in a.bones.values():
+            for i, curve in enumerate(bone.curves_view):
+                assert ((a.name, bone.name, i) in errors) == (curve.type == GMTCurveType.ROTATION)
+
+    assert len(errors) == sum(map(lambda x: len(x.bones), gmt.animation_list)) + 1
+
+
+def test_empty_animation_start_frame():
+    gmt = build_gmt(GMTVersion.DE2, 2, 10, animations=3)
+
+    # One animation without bones, and one with a bone without curves
+    gmt.animation_list[0].bones.clear()
+    gmt.animation_list[1].bones = {'empty': GMTBone('empty')}
+
+    # The last animation starts after frame 0, so that its start frame is not the same as the default
+    anm = gmt.animation_list[2]
+    for bone in anm.bones.values():
+        for curve in bone.curves_view:
+            frames, values = curve.get_arrays()
+            curve.set_arrays(frames + 5, values)
+
+    for empty_anm in gmt.animation_list[:2]:
+        assert empty_anm.get_start_frame() == 0
+        assert empty_anm.get_frame_range() == (0, 0)
+
+    with MappedBinaryReader(write_gmt(gmt)) as br:
+        br_gmt: BrGMT = br.read_struct(BrGMT)
+
+    assert list(map(lambda x: x.start_frame, br_gmt.animations)) == [0, 0, 5]
+
+    # Curves without keyframes do not move the start frame of the others
+    next(iter(anm.bones.values())).location = GMTCurve(GMTCurveType.LOCATION)
+
+    assert anm.get_start_frame() == 5
+    assert anm.get_frame_range() == (5, 14)
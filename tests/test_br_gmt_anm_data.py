@@ -0,0 +1,179 @@
+import numpy as np
+import pytest
+
+from ..gmt.structure.br.br_gmt_anm_data import *
+from ..gmt.structure.enums.gmt_enum import GMTCurveFormat
+from ..gmt.util import BinaryReader, Endian, MappedBinaryReader
+
+COUNT = 37
+
+# Per-keyframe and bulk reader of each curve format, with the dtype and number of components of its values
+READERS = [
+    ('LOC_XYZ', read_loc_all, read_loc_all_array, 'f4', 3),
+    ('LOC_CHANNEL', read_loc_channel, read_loc_channel_array, 'f4', 1),
+    ('ROT_QUAT_XYZ_FLOAT', read_quat_xyz_float, read_quat_xyz_float_array, 'f4', 3),
+    ('ROT_XYZW_SHORT/KENZAN', read_quat_half_float, read_quat_half_float_array, 'f2', 4),
+    ('ROT_XYZW_SHORT', read_quat_scaled, read_quat_scaled_array, 'i2', 4),
+    ('ROT_XW_FLOAT', read_quat_channel_float, read_quat_channel_float_array, 'f4', 2),
+    ('ROT_XW_SHORT/KENZAN', read_quat_channel_half_float, read_quat_channel_half_float_array, 'f2', 2),
+    ('ROT_XW_SHORT', read_quat_channel_scaled, read_quat_channel_scaled_array, 'i2', 2),
+    ('PATTERN_HAND', read_pattern_short, read_pattern_short_array, 'i2', 2),
+    ('PATTERN_UNK', read_bytes, read_bytes_array, 'i1', 1),
+]
+
+ENDIANS = [Endian.LITTLE, Endian.BIG]
+
+
+def random_values(dtype: str, components: int, seed: int) -> 'np.ndarray':
+    rng = np.random.default_rng(seed)
+
+    if dtype.startswith('i'):
+        info = np.iinfo(dtype)
+        return rng.integers(info.min, info.max, size=(COUNT, components), endpoint=True).astype(dtype)
+
+    # Keep the squared sum below 1, so that the reconstructed w of ROT_QUAT_XYZ_FLOAT is not always 0
+    return rng.uniform(-0.57, 0.57, size=(COUNT, components)).astype(dtype)
+
+
+def encode(values: 'np.ndarray', endianness: Endian) -> bytes:
+    return values.astype(values.dtype.newbyteorder('>' if endianness else '<')).tobytes()
+
+
+def read_both(read_values, read_values_array, data: bytes, count: int, endianness: Endian):
+    with BinaryReader(data, endianness) as br:
+        values = read_values(br, count)
+
+    with BinaryReader(data, endianness) as br:
+        array = read_values_array(br, count, endianness)
+
+    with MappedBinaryReader(data, endianness) as br:
+        mapped = read_values_array(br, count, endianness)
+
+    return values, array, mapped
+
+
+def assert_bit_identical(values, array):
+    expected = np.asarray(values, dtype=np.float64).reshape(array.shape)
+    actual = array.astype(np.float64)
+
+    assert expected.tobytes() == actual.tobytes()
+
+
+def test_every_format_is_covered():
+    covered = set(map(lambda x: x[0].split('/')[0], READERS)) | {'ROT_QUAT_XYZ_INT'}
+    formats = set(GMTCurveFormat.__members__) - {'ROT_YW_FLOAT', 'ROT_ZW_FLOAT', 'ROT_YW_SHORT', 'ROT_ZW_SHORT'}
+
+    assert formats <= covered
+
+
+@pytest.mark.parametrize('endianness', ENDIANS, ids=lambda x: x.name)
+@pytest.mark.parametrize('name, read_values, read_values_array, dtype, components', READERS,
+                         ids=list(map(lambda x: x[0], READERS)))
+def test_array_reader_matches_keyframe_reader(name, read_values, read_values_array, dtype, components, endianness):
+    values = random_values(dtype, components, len(name))
+    data = encode(values, endianness)
+
+    keyframes, array, mapped = read_both(read_values, read_values_array, data, COUNT, endianness)
+
+    assert len(keyframes) == COUNT and all(map(lambda x: len(x) == array.shape[1], keyframes))
+    assert array.shape == mapped.shape == (COUNT, 4 if name == 'ROT_QUAT_XYZ_FLOAT' else components)
+    assert array.dtype.isnative and mapped.dtype.isnative
+
+    assert_bit_identical(keyframes, array)
+    assert_bit_identical(keyframes, mapped)
+
+
+@pytest.mark.parametrize('endianness', ENDIANS, ids=lambda x: x.name)
+def test_array_reader_matches_keyframe_reader_quat_xyz_int(endianness):
+    rng = np.random.default_rng(0)
+    base = rng.integers(-32_768, 0, size=4).astype('i2')
+    scale = rng.integers(0, 65_536, size=4).astype('u2')
+    packed = rng.integers(0, 2 ** 32, size=COUNT).astype('u4')
+
+    data = encode(base, endianness) + encode(scale, endianness) + encode(packed, endianness)
+    keyframes, array, mapped = read_both(read_quat_xyz_int, read_quat_xyz_int_array, data, COUNT, endianness)
+
+    assert_bit_identical(keyframes, array)
+    assert_bit_identical(keyframes, mapped)
+
+
+def quat_xyz_int_data(base, scale, packed, endianness=Endian.LITTLE) -> bytes:
+    return (encode(np.array(base, dtype='i2'), endianness) + encode(np.array(scale, dtype='u2'), endianness) +
+            encode(np.array(packed, dtype='u4'), endianness))
+
+
+# Every omitted axis, with the 10-bit fields empty, full, and at the boundaries between them
+QUAT_XYZ_INT_EDGE_CASES = [
+    ((field_a << 22) | (field_b << 12) | (field_c << 2) | axis_index)
+    for axis_index in range(4)
+    for field_a, field_b, field_c in [(0, 0, 0), (1023, 1023, 1023), (1023, 0, 1), (1, 1023, 0), (512, 511, 513)]
+] + [0xFFFFFFFF, 0xFFFFFFFC, 0x00000003, 0x80000000]
+
+QUAT_XYZ_INT_HEADERS = [
+    # Zero scale: every stored component is the base
+    ((-16_384, 0, 8_192, 32_767), (0, 0, 0, 0)),
+    # Full range: the stored components can exceed 1, and the omitted one is clamped to 0
+    ((-32_768, -32_768, -32_768, -32_768), (65_535, 65_535, 65_535, 65_535)),
+    # Narrow range around the identity
+    ((-512, -512, -512, 32_000), (1_024, 1_024, 1_024, 768)),
+]
+
+
+@pytest.mark.parametrize('count', [0, 1, 4, len(QUAT_XYZ_INT_EDGE_CASES)])
+@pytest.mark.parametrize('header', QUAT_XYZ_INT_HEADERS, ids=['zero_scale', 'full_range', 'identity'])
+@pytest.mark.parametrize('endianness', ENDIANS, ids=lambda x: x.name)
+def test_quat_xyz_int_edge_cases(header, count, endianness):
+    data = quat_xyz_int_data(*header, QUAT_XYZ_INT_EDGE_CASES[:count], endianness)
+    keyframes, array, mapped = read_both(read_quat_xyz_int, read_quat_xyz_int_array, data, count, endianness)
+
+    assert array.shape == (count, 4)
+
+    assert_bit_identical(keyframes, array)
+    assert_bit_identical(keyframes, mapped)
+
+
+def test_quat_xyz_int_axis_cycle():
+    # The omitted axis changes on every keyframe, so each row uses different base and scale components
+    packed = [(((i * 97) % 1024) << 22) | (((i * 389) % 1024) << 12) | (((i * 733) % 1024) << 2) | (i % 4)
+              for i in range(256)]
+    data = quat_xyz_int_data((-20_000, -10_000, 0, 10_000), (20_000, 30_000, 40_000, 50_000), packed)
+
+    keyframes, array, mapped = read_both(read_quat_xyz_int, read_quat_xyz_int_array, data, len(packed), Endian.LITTLE)
+
+    assert_bit_identical(keyframes, array)
+    assert_bit_identical(keyframes, mapped)
+
+
+def random_quaternions(count: int, seed: int) -> 'np.ndarray':
+    # Small rotations with random signs, so that every component is the largest one on some keyframes
+    rng = np.random.default_rng(seed)
+    quats = rng.normal(size=(count, 4))
+    quats[np.arange(count), np.arange(count) % 4] += 3.0 * np.where(np.arange(count) % 8 < 4, 1.0, -1.0)
+
+    return quats / np.linalg.norm(quats, axis=1)[:, np.newaxis]
+
+
+@pytest.mark.parametrize('count', [1, 2, 64])
+@pytest.mark.parametrize('endianness', ENDIANS, ids=lambda x: x.name)
+def test_quat_xyz_int_round_trip(count, endianness):
+    quats = random_quaternions(count, count)
+    base, scale, packed, error = quantize_quat_xyz_int(quats)
+
+    with BinaryReader(endianness=endianness) as br:
+        assert write_quat_xyz_int(br, quats) == error
+        data = bytes(br.buffer())
+
+    assert data == quat_xyz_int_data(base, scale, packed, endianness)
+    assert list(map(lambda x: x & 3, packed)) == np.argmax(np.abs(quats), axis=1).tolist()
+
+    keyframes, array, mapped = read_both(read_quat_xyz_int, read_quat_xyz_int_array, data, count, endianness)
+
+    assert_bit_identical(keyframes, array)
+    assert_bit_identical(keyframes, mapped)
+
+    # The decoded rotations are the same as the original ones, within the reported error
+    decoded = array / np.linalg.norm(array, axis=1)[:, np.newaxis]
+    angles = 2 * np.arccos(np.clip(np.abs(np.sum(quats * decoded, axis=1)), 0.0, 1.0))
+
+    assert angles.max() <= error + 1e-9
+    assert error < 0.01
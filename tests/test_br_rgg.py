@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..benchmarks.generators import build_gmt
+from ..gmt.gmt_reader import read_gmt
+from ..gmt.gmt_writer import write_gmt
+from ..gmt.structure.br.br_rgg import RGG_ENCODING, RGG_STRINGS, RGGStringTable
+from ..gmt.structure.enums.gmt_enum import GMTVersion
+
+READS = 64
+WORKERS = 8
+
+
+def gmt_names(gmt):
+    return [gmt.name] + [name for anm in gmt.animation_list for name in [anm.name, *anm.bones]]
+
+
+def test_concurrent_reads_share_interned_strings():
+    gmt = build_gmt(GMTVersion.DE2, 20, 5, animations=3)
+
+    # Non-ASCII names go through the same table
+    gmt.animation_list[0].name = 'アニメーション'
+
+    data = write_gmt(gmt)
+    expected = gmt_names(gmt)
+
+    RGG_STRINGS.clear()
+    with ThreadPoolExecutor(WORKERS) as executor:
+        names = list(executor.map(lambda _: gmt_names(read_gmt(data)), range(READS)))
+
+    assert all(map(lambda x: x == expected, names))
+
+    # Every read returns the same object for each name
+    for i in range(len(expected)):
+        assert len(set(map(lambda x: id(x[i]), names))) == 1
+
+    assert len(RGG_STRINGS) == len(set(expected))
+
+
+def test_full_table_still_decodes_from_threads():
+    table = RGGStringTable(max_size=10)
+    raw_strings = [f'bone_{i:03}'.encode(RGG_ENCODING).ljust(30, b'\x00') for i in range(50)]
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        strings = list(executor.map(table.decode, raw_strings * 8))
+
+    assert strings == [f'bone_{i:03}' for i in range(50)] * 8
+    assert len(table) == 10
+
+    table.clear()
+    assert len(table) == 0
@@ -0,0 +1,152 @@
+import math
+
+import numpy as np
+import pytest
+
+from ..gmt.structure.cmt import CMTFrame
+from ..gmt.structure.cmt_codec import CMTFrameArrays, dist_rotation_to_focus_roll, focus_roll_to_dist_rotation
+from ..gmt.util.vector_math import TRACK_EPSILON, multiply_quat
+
+ATOL = 1e-7
+
+SQRT_HALF = math.sqrt(0.5)
+
+
+def gimbal_lock_rotation(x_angle: float, z_angle: float):
+    """Returns the (x, y, z, w) rotation of the XYZ Euler angles (x_angle, pi / 2, z_angle)."""
+    w, x, y, z = multiply_quat((math.cos(z_angle / 2), 0.0, 0.0, math.sin(z_angle / 2)),
+                               multiply_quat((SQRT_HALF, 0.0, SQRT_HALF, 0.0), (math.cos(x_angle / 2), math.sin(x_angle / 2), 0.0, 0.0)))
+    return (x, y, z, w)
+
+
+# (x, y, z, w) rotations that are edge cases of the conversion
+EDGE_ROTATIONS = [
+    (0.0, 0.0, 0.0, 1.0),
+    # Zero quaternion, which leaves the focus point on the camera
+    (0.0, 0.0, 0.0, 0.0),
+    # Forward vector along the Z axis, which is parallel to the Y axis in Blender space
+    (0.0, 1.0, 0.0, 0.0),
+    (0.0, 0.0, 1.0, 0.0),
+    # Gimbal lock, and rotations on both sides of it
+    (0.0, SQRT_HALF, 0.0, SQRT_HALF),
+    (0.0, -SQRT_HALF, 0.0, SQRT_HALF),
+    gimbal_lock_rotation(0.2, 0.7),
+    gimbal_lock_rotation(-0.4, 1.3),
+    (0.3, SQRT_HALF, 0.1, SQRT_HALF),
+    (0.0, math.sin(math.pi / 4 - 1e-3), 0.0, math.cos(math.pi / 4 - 1e-3)),
+    (0.0, math.sin(math.pi / 4 + 1e-3), 0.0, math.cos(math.pi / 4 + 1e-3)),
+    # Not normalized
+    (0.0, 0.0, 2.0, 2.0),
+]
+
+# Forward vectors (focus point - location) that are edge cases of the inverse conversion
+EDGE_FORWARDS = [
+    # Zero length
+    (0.0, 0.0, 0.0),
+    # Parallel and close to parallel to the Y axis in Blender space
+    (0.0, 0.0, 3.0),
+    (0.0, 0.0, -3.0),
+    (TRACK_EPSILON / 4, 0.0, 1.0),
+    (-TRACK_EPSILON / 4, 0.0, -1.0),
+    (TRACK_EPSILON * 4, 0.0, 1.0),
+    # Straight up and down
+    (0.0, 5.0, 0.0),
+    (0.0, -5.0, 0.0),
+]
+
+
+def random_rotations(count: int, rng) -> 'np.ndarray':
+    rotations = rng.normal(size=(count, 4))
+    return rotations / np.linalg.norm(rotations, axis=1)[:, np.newaxis]
+
+
+def frame_inputs(frame_format: str, seed=0):
+    """Returns the locations, distances and (x, y, z, w) rotations of frames, as read from the given format."""
+    rng = np.random.default_rng(seed)
+    rotations = np.concatenate((random_rotations(40, rng), EDGE_ROTATIONS))
+    count = len(rotations)
+
+    locations = rng.uniform(-10.0, 10.0, size=(count, 3))
+    distances = rng.uniform(0.0, 5.0, size=count)
+    distances[:3] = (0.0, 1e-4, -1.0)
+
+    if frame_format == 'ROT_FLOAT':
+        distances = np.ones(count)
+    elif frame_format == 'DIST_ROT_SHORT':
+        rotations = np.trunc(rotations * 16_384) / 16_384
+    elif frame_format == 'DIST_ROT_XYZ':
+        # Only x, y and z are stored, and w is reconstructed as positive
+        rotations = rotations * np.where(rotations[:, 3] < 0, -1.0, 1.0)[:, np.newaxis]
+        rotations[:, 3] = np.sqrt(np.maximum(1.0 - np.sum(rotations[:, :3] ** 2, axis=1), 0.0))
+
+    return locations, distances, rotations
+
+
+@pytest.mark.parametrize('frame_format', ['ROT_FLOAT', 'DIST_ROT_SHORT', 'DIST_ROT_XYZ'])
+def test_dist_rotation_to_focus_roll(frame_format):
+    locations, distances, rotations = frame_inputs(frame_format)
+
+    focus_points, rolls = dist_rotation_to_focus_roll(locations, distances, rotations)
+
+    for i in range(len(locations)):
+        frame = CMTFrame(tuple(locations[i]), 0.0)
+        frame.from_dist_rotation(distances[i], (rotations[i, 3], *rotations[i, :3]))
+
+        np.testing.assert_allclose(focus_points[i], tuple(frame.focus_point), rtol=0, atol=ATOL, err_msg=str(rotations[i]))
+        np.testing.assert_allclose(rolls[i], frame.roll, rtol=0, atol=ATOL, err_msg=str(rotations[i]))
+
+
+def test_gimbal_lock_has_no_roll():
+    _, rolls = dist_rotation_to_focus_roll(np.zeros((4, 3)), np.ones(4), np.array(EDGE_ROTATIONS[4:8]))
+
+    assert rolls.tolist() == [0.0] * 4
+
+
+@pytest.mark.parametrize('frame_format', ['ROT_FLOAT', 'DIST_ROT_SHORT', 'DIST_ROT_XYZ', 'FOC_ROLL'])
+def test_focus_roll_to_dist_rotation(frame_format):
+    rng = np.random.default_rng(1)
+
+    if frame_format == 'FOC_ROLL':
+        # Focus points and rolls as stored in the file
+        locations = rng.uniform(-10.0, 10.0, size=(40 + len(EDGE_FORWARDS), 3))
+        focus_points = locations + np.concatenate((rng.uniform(-5.0, 5.0, size=(40, 3)), EDGE_FORWARDS))
+        rolls = rng.uniform(-math.pi, math.pi, size=len(locations))
+    else:
+        # Focus points and rolls converted from the format, as written back to it
+        locations, distances, rotations = frame_inputs(frame_format, 2)
+        focus_points, rolls = dist_rotation_to_focus_roll(locations, distances, rotations)
+
+    distances, rotations = focus_roll_to_dist_rotation(locations, focus_points, rolls)
+
+    for i in range(len(locations)):
+        frame = CMTFrame(tuple(locations[i]), 0.0)
+        frame.focus_point = tuple(focus_points[i])
+        frame.roll = rolls[i]
+
+        distance, rotation = frame.to_dist_rotation()
+
+        np.testing.assert_allclose(distances[i], distance, rtol=0, atol=ATOL)
+        np.testing.assert_allclose(rotations[i], (*rotation[1:], rotation[0]), rtol=0, atol=ATOL,
+                                   err_msg=str(focus_points[i] - locations[i]))
+
+
+def test_frame_arrays_match_frames():
+    locations, distances, rotations = frame_inputs('DIST_ROT_SHORT', 3)
+    fovs = np.linspace(0.2, 1.2, len(locations))
+    clip_ranges = np.column_stack((np.full(len(locations), 0.1), np.linspace(100.0, 1000.0, len(locations))))
+
+    arrays = CMTFrameArrays.from_dist_rotations(locations, fovs, distances, rotations, clip_ranges)
+    frames = arrays.to_frames()
+
+    assert len(arrays) == len(frames) == len(locations)
+
+    for i, frame in enumerate(frames):
+        expected = CMTFrame(tuple(locations[i]), fovs[i])
+        expected.from_dist_rotation(distances[i], (rotations[i, 3], *rotations[i, :3]))
+
+        # Frames hold mathutils vectors when it is available, which are single precision
+        np.testing.assert_allclose(tuple(frame.location), locations[i], rtol=1e-6)
+        np.testing.assert_allclose(tuple(frame.focus_point), tuple(expected.focus_point), rtol=1e-6, atol=ATOL)
+        np.testing.assert_allclose(frame.roll, expected.roll, rtol=0, atol=ATOL)
+
+        assert frame.fov == fovs[i] and frame.clip_range == tuple(clip_ranges[i])
@@ -0,0 +1,81 @@
+import struct
+
+import numpy as np
+
+from ..benchmarks.generators import build_gmt
+from ..gmt.gmt_patcher import GMTPatcher
+from ..gmt.gmt_reader import read_gmt
+from ..gmt.gmt_writer import write_gmt
+from ..gmt.structure.br.br_gmt import BrGMT, BrGMTCurve
+from ..gmt.structure.enums.gmt_enum import GMTCurveFormat, GMTCurveType, GMTVersion
+from ..gmt.structure.gmt import GMTCurve
+from ..gmt.util import MappedBinaryReader
+from .test_gmt_reader import assert_same_curves, curve_arrays
+
+# Size of the values of the formats written for the test GMT
+VALUE_SIZES = {GMTCurveFormat.LOC_XYZ: (4, 3), GMTCurveFormat.ROT_XYZW_SHORT: (2, 4)}
+
+
+def swap(buffer: bytearray, offset: int, fmt: str, count=1):
+    values = struct.unpack_from(f'>{count}{fmt}', buffer, offset)
+    struct.pack_into(f'<{count}{fmt}', buffer, offset, *values)
+
+
+def to_little_endian(data: bytes) -> bytearray:
+    """Converts a GMT written by write_gmt, which is always big endian, to little endian."""
+    with MappedBinaryReader(data) as br:
+        br_gmt: BrGMT = br.read_struct(BrGMT)
+
+    header = br_gmt.header
+    buffer = bytearray(data)
+
+    buffer[5] = 0
+    swap(buffer, 0x08, 'I', 2)
+    swap(buffer, 0x10, 'H')
+    swap(buffer, 0x30, 'I', 16)
+
+    swap(buffer, header.animations_offset, 'I', 16 * header.animations_count)
+
+    graph_offsets = struct.unpack_from(f'>{header.graphs_count}I', buffer, header.graphs_offset)
+    swap(buffer, header.graphs_offset, 'I', header.graphs_count)
+    for offset, graph in zip(graph_offsets, br_gmt.graphs):
+        swap(buffer, offset, 'H', graph.count + 2)
+
+    for i in range(header.strings_count):
+        swap(buffer, header.strings_offset + i * 0x20, 'H')
+
+    swap(buffer, header.bone_groups_offset, 'H', 2 * header.bone_groups_count)
+    swap(buffer, header.curve_groups_offset, 'H', 2 * header.curve_groups_count)
+    swap(buffer, header.curves_offset, 'I', 4 * header.curves_count)
+
+    for br_curve in br_gmt.curves:
+        br_curve: BrGMTCurve
+        size, components = VALUE_SIZES[br_curve.format]
+        swap(buffer, br_curve.animation_data_offset, 'I' if size == 4 else 'H', br_curve.graph.count * components)
+
+    return buffer
+
+
+def test_patch_little_endian_file():
+    gmt = build_gmt(GMTVersion.DE2, 3, 10)
+    big_endian = write_gmt(gmt)
+    data = to_little_endian(big_endian)
+
+    assert_same_curves(curve_arrays(read_gmt(data)), curve_arrays(read_gmt(big_endian)))
+
+    # Frames that are not used by any curve yet, so that a new graph is appended
+    frames = np.array([0, 2, 7, 9], dtype=np.uint16)
+    values = np.array([[0.0, 0.0, 0.0, 1.0], [0.0, 0.5, 0.0, 0.5], [0.5, 0.0, 0.0, 0.5], [0.0, 0.0, 0.0, 1.0]])
+
+    curve = GMTCurve(GMTCurveType.ROTATION)
+    curve.set_arrays(frames, values)
+
+    patcher = GMTPatcher(data)
+    patcher.replace_curve(0, 'center_c_n', curve)
+    patched = read_gmt(patcher.to_bytes())
+
+    bone = patched.animation_list[0].bones['center_c_n']
+    patched_frames, patched_values = next(filter(lambda x: x.type == GMTCurveType.ROTATION, bone.curves)).get_arrays()
+
+    np.testing.assert_array_equal(patched_frames, frames)
+    np.testing.assert_allclose(patched_values, values, atol=1 / 16_384)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from ..benchmarks.generators import build_gmt, encode_gmt, gmt_formats
+from ..gmt.gmt_reader import read_gmt
+from ..gmt.structure.enums.gmt_enum import GMTVersion
+
+# Iterating a flag enum skips members with multiple bits set
+VERSIONS = list(GMTVersion.__members__.values())
+
+CASES = [(version, curve_format) for version in VERSIONS for curve_format in gmt_formats(version)]
+
+
+def curve_arrays(gmt):
+    return [(anm.name, bone.name, int(curve.type), int(curve.channel), *curve.get_arrays())
+            for anm in gmt.animation_list for bone in anm.bones.values() for curve in bone.curves]
+
+
+def assert_same_curves(actual, expected):
+    assert len(actual) == len(expected)
+
+    for a, e in zip(actual, expected):
+        assert a[:4] == e[:4]
+        np.testing.assert_array_equal(a[4], e[4])
+        np.testing.assert_array_equal(a[5], e[5])
+
+
+@pytest.mark.parametrize('version, curve_format', CASES, ids=lambda x: x.name)
+def test_lazy_read_matches_eager_read(version, curve_format):
+    data = encode_gmt(build_gmt(version, 3, 12, curve_format, animations=2), curve_format)
+
+    eager = read_gmt(data)
+    lazy = read_gmt(data, lazy=True)
+
+    curves = [curve for anm in lazy.animation_list for bone in anm.bones.values() for curve in bone.curves]
+    assert curves and not any(map(lambda x: x.is_loaded(), curves))
+
+    assert_same_curves(curve_arrays(lazy), curve_arrays(eager))
+    assert all(map(lambda x: x.is_loaded(), curves))
+
+
+@pytest.mark.parametrize('copy_values', [True, False])
+def test_lazy_read_from_mapped_file(tmp_path, copy_values):
+    path = tmp_path / 'lazy.gmt'
+    path.write_bytes(encode_gmt(build_gmt(GMTVersion.DE2, 3, 12)))
+
+    expected = curve_arrays(read_gmt(str(path)))
+
+    with read_gmt(str(path), use_mmap=True, copy_values=copy_values, lazy=True) as gmt:
+        gmt.materialize()
+        assert_same_curves(curve_arrays(gmt), expected)
@@ -0,0 +1,152 @@
+import math
+import sys
+
+import numpy as np
+import pytest
+
+from ..benchmarks.generators import build_cmt
+from ..gmt import gmt_reader
+from ..gmt.gmt_reader import read_cmt
+from ..gmt.gmt_writer import write_cmt
+from ..gmt.structure.br import br_cmt
+from ..gmt.structure.cmt import CMTFrame
+from ..gmt.structure.enums.cmt_enum import CMTVersion
+from ..gmt.util.vector_math import (Quaternion, Vector, get_mathutils, has_mathutils, quat_to_euler_z, to_quaternion,
+                                    to_vector, track_quat, vector_type)
+
+# Results of mathutils in Blender, which is single precision
+ATOL = 1e-6
+
+SQRT_HALF = math.sqrt(0.5)
+
+# (vector, track axis, up axis, Vector(vector).to_track_quat(track, up))
+TRACK_QUATS = [
+    ((1, 2, 3), 'Y', 'Z', (0.8698511123657227, 0.4365462064743042, -0.10305457562208176, -0.20534397661685944)),
+    ((1, 2, 3), 'Z', 'Y', (0.21807070076465607, 0.07232952862977982, 0.3063927888870239, 0.9237624406814575)),
+    ((1, 2, 3), 'X', 'Z', (0.7602777481079102, 0.23581427335739136, -0.3815554082393646, 0.46987754106521606)),
+    ((1, 2, 3), 'Z', 'X', (0.4989994168281555, -0.26779720187187195, -0.1655077189207077, -0.8073979616165161)),
+    ((1, 2, 3), 'X', 'Y', (0.37085163593292236, 0.7043434381484985, 0.062453195452690125, 0.6020539999008179)),
+    ((1, 2, 3), 'Y', 'X', (0.5422070622444153, 0.16348466277122498, -0.6879481673240662, -0.45388489961624146)),
+    ((-0.3, 0.5, -0.8), 'Y', 'Z', (0.8590087294578552, -0.43686428666114807, -0.12100441753864288, 0.23793168365955353)),
+    ((-0.3, 0.5, -0.8), 'Z', 'Y', (0.08268007636070251, 0.25380614399909973, -0.9163206219673157, -0.29850125312805176)),
+    # Parallel and opposite to the track axis
+    ((0, 1, 0), 'Y', 'Z', (1.0, 0.0, 0.0, 0.0)),
+    ((0, -1, 0), 'Y', 'Z', (-4.371138828673793e-08, 0.0, 0.0, 1.0)),
+    ((0, -1, 0), 'Z', 'Y', (0.7071067690849304, 0.7071067690849304, 0.0, 0.0)),
+    ((0, 0, 1), 'Z', 'Y', (-4.371138828673793e-08, 0.0, 0.0, 1.0)),
+    ((0, 0, 1), 'X', 'Y', (0.4999999701976776, 0.4999999701976776, -0.4999999701976776, 0.4999999701976776)),
+    ((0, 0, -2), 'Y', 'Z', (0.7071067690849304, -0.7071067690849304, 0.0, 0.0)),
+    ((0, 0, -2), 'Z', 'Y', (1.910685465164705e-15, -4.371138828673793e-08, -1.0, 4.371138828673793e-08)),
+    ((0, 0, -2), 'Z', 'X', (-3.0908619663705394e-08, 0.7071067690849304, 0.7071067690849304, -3.0908619663705394e-08)),
+    ((1, 0, 0), 'Z', 'X', (-3.0908619663705394e-08, -0.7071067690849304, -3.0908619663705394e-08, -0.7071067690849304)),
+    ((1, 0, 0), 'Y', 'X', (0.4999999701976776, -0.4999999701976776, -0.4999999701976776, -0.4999999701976776)),
+    # Zero length
+    ((0, 0, 0), 'Y', 'Z', (1.0, 0.0, 0.0, 0.0)),
+]
+
+# ((w, x, y, z), Quaternion(q).to_euler().z)
+EULER_Z = [
+    ((1, 0, 0, 0), 0.0),
+    ((0.5, 0.5, 0.5, 0.5), 1.570796251296997),
+    ((0.9, 0.1, -0.3, 0.2), 0.41012734174728394),
+    ((0.2, -0.4, 0.1, 0.8), 2.65163516998291),
+    ((0.3, 0.6, -0.2, -0.7), -1.6914197206497192),
+    # Not normalized
+    ((2, 0, 0, 2), 1.570796251296997),
+    # Gimbal lock
+    ((SQRT_HALF, 0, SQRT_HALF, 0), 0.0),
+    ((0.4666785579241014, -0.5312354690472778, 0.4666785579241014, 0.5312354690472778), 0.0),
+    # Zero quaternion
+    ((0, 0, 0, 0), 0.0),
+]
+
+
+@pytest.fixture
+def no_mathutils(monkeypatch):
+    """Makes mathutils unavailable, even if it can be imported."""
+    monkeypatch.setitem(sys.modules, 'mathutils', None)
+    get_mathutils.cache_clear()
+
+    yield
+
+    get_mathutils.cache_clear()
+
+
+@pytest.mark.parametrize('vector, track, up, expected', TRACK_QUATS,
+                         ids=list(map(lambda x: f'{x[0]}-{x[1]}{x[2]}', TRACK_QUATS)))
+def test_track_quat(vector, track, up, expected):
+    np.testing.assert_allclose(track_quat(vector, track, up), expected, rtol=0, atol=ATOL)
+
+
+@pytest.mark.parametrize('q, expected', EULER_Z, ids=str)
+def test_quat_to_euler_z(q, expected):
+    assert quat_to_euler_z(q) == pytest.approx(expected, abs=ATOL)
+
+
+def test_same_axes():
+    with pytest.raises(Exception):
+        track_quat((1, 2, 3), 'Y', 'Y')
+
+
+def test_fallback_types(no_mathutils):
+    assert not has_mathutils()
+    assert vector_type() is Vector
+
+    v = to_vector((3, 0, 4))
+    q = to_quaternion((SQRT_HALF, 0, 0, SQRT_HALF))
+
+    assert type(v) is Vector and type(q) is Quaternion
+    assert v.length == 5.0 and v.normalized() == pytest.approx((0.6, 0.0, 0.8))
+    assert (v + v) - v == v and -v * 2 == (-6.0, 0.0, -8.0)
+
+    # A quarter turn around Z
+    assert q @ (1, 0, 0) == pytest.approx((0.0, 1.0, 0.0))
+    assert q @ q.inverted() == pytest.approx((1.0, 0.0, 0.0, 0.0))
+
+
+def test_cmt_frame_round_trip(no_mathutils):
+    frame = CMTFrame(to_vector((3 * math.cos(0.161), 1.5, 3 * math.sin(0.161))), 0.6)
+    frame.focus_point = to_vector((0.032, 1.4, 0.197))
+    frame.roll = 0.008
+
+    distance, rotation = frame.to_dist_rotation()
+    frame.from_dist_rotation(distance, rotation)
+
+    # Same frame converted with mathutils in Blender
+    np.testing.assert_allclose(frame.focus_point, (0.029821395874023438, 1.40000319480896, 0.22045597434043884), rtol=0, atol=ATOL)
+    assert frame.roll == pytest.approx(-0.003069403348490596, abs=ATOL)
+
+
+def read_write(monkeypatch, data: bytes, has_numpy: bool):
+    # Without NumPy, frames are converted one by one with the functions of vector_math
+    monkeypatch.setattr(gmt_reader, 'HAS_NUMPY', has_numpy)
+    monkeypatch.setattr(br_cmt, 'HAS_NUMPY', has_numpy)
+
+    cmt = read_cmt(data)
+    return cmt, write_cmt(cmt)
+
+
+@pytest.mark.parametrize('version', list(CMTVersion.__members__.values()), ids=lambda x: x.name)
+def test_cmt_round_trip_without_mathutils(no_mathutils, monkeypatch, version):
+    data = write_cmt(build_cmt(version, 40, clip_range=True))
+
+    cmt, written = read_write(monkeypatch, data, False)
+    expected, expected_written = read_write(monkeypatch, data, True)
+
+    assert sys.modules['mathutils'] is None
+
+    # The frames converted by vector_math are the same as the ones converted by the vectorized codec
+    for frame, expected_frame in zip(cmt.animation_list[0].frames, expected.animation_list[0].frames):
+        assert type(frame.location) is Vector and type(frame.focus_point) is Vector
+
+        assert frame.location == expected_frame.location and frame.fov == expected_frame.fov
+        assert frame.clip_range == expected_frame.clip_range
+        np.testing.assert_allclose(frame.focus_point, expected_frame.focus_point, rtol=0, atol=1e-9)
+        assert frame.roll == pytest.approx(expected_frame.roll, abs=1e-9)
+
+    # And so are the frames written back
+    assert written == expected_written
+
+    # Focus points and rolls are stored as they are, so they survive the round trip exactly
+    if version == CMTVersion.YAKUZA5:
+        assert written == data